@@ -0,0 +1,118 @@
+"""
+Load test GET /events: open many concurrent subscribers against a running server, write change events into its
+database and report how long each event took to reach every subscriber.
+
+Usage:
+    python benchmarks/events.py --url http://localhost:8000 --db willtheywinfastapi.db --subscribers 1000 --events 50
+
+Events are inserted straight into the catalog_event table of the server's sqlite database, the same table the write
+routes record to, so the run needs no credentials and doesn't touch the catalog itself.
+"""
+import argparse
+import asyncio
+import sqlite3
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def subscriber(client: httpx.AsyncClient, sent: Dict[int, float], latencies: List[float], expected: int,
+                     connected: asyncio.Event, counter: List[int], total: int) -> int:
+    received = 0
+    async with client.stream('GET', '/events') as response:
+        response.raise_for_status()
+        counter[0] += 1
+        if counter[0] == total:
+            connected.set()
+        async for line in response.aiter_lines():
+            if not line.startswith('id: '):
+                continue
+            event_id = int(line[4:])
+            if event_id in sent:
+                latencies.append(time.perf_counter() - sent[event_id])
+                received += 1
+                if received == expected:
+                    return received
+    return received
+
+
+def insert_event(conn: sqlite3.Connection) -> int:
+    cursor = conn.execute(
+        'INSERT INTO catalog_event (entity, entity_id, op, created_at) VALUES (?, ?, ?, ?)',
+        ('team', 0, 'updated', datetime.utcnow().isoformat(sep=' ')),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+async def run(url: str, db: str, subscribers: int, events: int, interval: float, timeout: float) -> Dict:
+    sent: Dict[int, float] = {}
+    latencies: List[float] = []
+    connected = asyncio.Event()
+    counter = [0]
+
+    limits = httpx.Limits(max_connections=subscribers, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=None) as client:
+        tasks = [
+            asyncio.create_task(subscriber(client, sent, latencies, events, connected, counter, subscribers))
+            for _ in range(subscribers)
+        ]
+        await asyncio.wait_for(connected.wait(), timeout)
+        # Give the brokers a poll to pick up their starting position.
+        await asyncio.sleep(2)
+
+        conn = sqlite3.connect(db)
+        start = time.perf_counter()
+        for _ in range(events):
+            event_id = insert_event(conn)
+            sent[event_id] = time.perf_counter()
+            await asyncio.sleep(interval)
+        conn.close()
+
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    delivered = len(latencies)
+    return {
+        'subscribers': subscribers,
+        'events': events,
+        'delivered': delivered,
+        'missing': subscribers * events - delivered,
+        'deliveries_per_s': delivered / elapsed,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--db', default='willtheywinfastapi.db', help="the server's sqlite database")
+    parser.add_argument('--subscribers', type=int, default=500)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.1, help='seconds between events')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.db, args.subscribers, args.events, args.interval, args.timeout))
+    for key, value in result.items():
+        print(f'{key:<18}{value:>12.2f}' if isinstance(value, float) else f'{key:<18}{value:>12}')
+
+
+if __name__ == '__main__':
+    main()
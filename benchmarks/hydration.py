@@ -0,0 +1,140 @@
+"""
+Compare the catalog read path through ORM instances and the read models (how the routes used to load and render
+/sports, /sports/{id}, /teams and /teams/{id}) with the Core rows -> SportRecord / TeamRecord path in
+src/db/repository.py. Reports mean latency per call, query to rendered json, and the peak memory one call allocates.
+
+Usage:
+    python benchmarks/hydration.py --db willtheywinfastapi.db --iterations 1000
+
+Needs a seeded database (see scripts/setup.sh).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import parse_obj_as
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import repository  # noqa: E402
+from src.db.db import create_async_db_engine, get_session_with_engine  # noqa: E402
+from src.db.models.related import SportReadWithTeams  # noqa: E402
+from src.db.models.sport import Sport  # noqa: E402
+from src.db.models.team import Team, TeamReadWithSport  # noqa: E402
+
+
+def render(content) -> bytes:
+    # As JSONResponse renders
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+
+async def orm_sports(session):
+    result = await session.execute(
+        select(Sport).options(selectinload(Sport.teams)).execution_options(populate_existing=True)
+    )
+    return render(jsonable_encoder(parse_obj_as(List[SportReadWithTeams], result.scalars().all())))
+
+
+async def orm_sport(session, sport_id):
+    result = await session.execute(select(Sport).where(Sport.id == sport_id).options(selectinload(Sport.teams)))
+    return render(jsonable_encoder(SportReadWithTeams.from_orm(result.scalar())))
+
+
+async def orm_teams(session):
+    result = await session.execute(select(Team).join(Sport).options(selectinload(Team.sport)))
+    return render(jsonable_encoder(parse_obj_as(List[TeamReadWithSport], result.scalars().all())))
+
+
+async def orm_team(session, team_id):
+    result = await session.execute(
+        select(Team).join(Sport).where(Team.id == team_id).options(selectinload(Team.sport))
+    )
+    return render(jsonable_encoder(TeamReadWithSport.from_orm(result.scalar())))
+
+
+async def records_sports(session):
+    return render([sport.dict_with_teams() for sport in await repository._get_sports(session)])
+
+
+async def records_sport(session, sport_id):
+    return render((await repository._get_sport(session, sport_id)).dict_with_teams())
+
+
+async def records_teams(session):
+    return render([team.dict_with_sport() for team in await repository._get_teams(session)])
+
+
+async def records_team(session, team_id):
+    return render((await repository._get_team(session, team_id)).dict_with_sport())
+
+
+async def call(engine, fn: Callable, *args):
+    async with get_session_with_engine(engine) as session:
+        return await fn(session, *args)
+
+
+async def measure(engine, fn: Callable, args: tuple, iterations: int) -> tuple:
+    """(mean us per call, peak KiB allocated by one call)"""
+    for _ in range(10):
+        await call(engine, fn, *args)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await call(engine, fn, *args)
+    latency = (time.perf_counter() - start) / iterations * 1e6
+
+    tracemalloc.start()
+    try:
+        await call(engine, fn, *args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return latency, peak / 1024
+
+
+async def run(db: str, iterations: int, sport_id: int, team_id: int) -> List[tuple]:
+    engine = create_async_db_engine(f'sqlite+aiosqlite:///{db}', pool_size=1)
+    cases = [
+        ('sports', orm_sports, records_sports, ()),
+        ('sport', orm_sport, records_sport, (sport_id,)),
+        ('teams', orm_teams, records_teams, ()),
+        ('team', orm_team, records_team, (team_id,)),
+    ]
+    results = []
+    try:
+        for name, orm_fn, records_fn, args in cases:
+            assert json.loads(await call(engine, orm_fn, *args)) == json.loads(await call(engine, records_fn, *args))
+            results.append((name, *await measure(engine, orm_fn, args, iterations),
+                            *await measure(engine, records_fn, args, iterations)))
+    finally:
+        await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='willtheywinfastapi.db')
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--sport-id', type=int, default=1)
+    parser.add_argument('--team-id', type=int, default=1)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.db, args.iterations, args.sport_id, args.team_id))
+    header = f"{'route':<10}{'orm us':>10}{'records us':>12}{'orm peak KiB':>14}{'records peak KiB':>18}"
+    print(header)
+    print('-' * len(header))
+    for name, orm_us, orm_kib, records_us, records_kib in results:
+        print(f'{name:<10}{orm_us:>10.1f}{records_us:>12.1f}{orm_kib:>14.1f}{records_kib:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+#!/usr/bin/env bash
+# Show the latency effect of connection reuse between nginx and the app.
+#
+# Runs the route suite straight against gunicorn with a new connection per request (what nginx did before the
+# upstream keepalive pool), straight against gunicorn reusing connections (what the pool does now), and end to end
+# through nginx. Intended to run in the compose stack, see docker-compose-loadtest.yml.
+set -e
+
+API_URL=${API_URL:-http://localhost:80}
+NGINX_URL=${NGINX_URL:-https://localhost}
+
+echo " -- api direct, new connection per request -- "
+python benchmarks/routes.py --url "$API_URL" --no-keepalive "$@"
+
+echo " -- api direct, reused connections -- "
+python benchmarks/routes.py --url "$API_URL" "$@"
+
+echo " -- through nginx -- "
+python benchmarks/routes.py --url "$NGINX_URL" --insecure "$@"
@@ -0,0 +1,147 @@
+"""
+Microbenchmark the catalog read queries: statements built inline per call, as the routes used to, against the module
+level statements in src/db/repository.py. Reports the mean time per call, and the statement construction cost alone.
+
+Usage:
+    python benchmarks/queries.py --db willtheywinfastapi.db --iterations 2000
+
+Needs a seeded database (see scripts/setup.sh), the team named by --team-name should exist.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import repository  # noqa: E402
+from src.db.db import create_async_db_engine, get_session_with_engine  # noqa: E402
+from src.db.models.sport import Sport  # noqa: E402
+from src.db.models.team import Team  # noqa: E402
+
+
+def inline_sports():
+    return select(Sport).options(selectinload(Sport.teams)).execution_options(populate_existing=True)
+
+
+def inline_sport(sport_id):
+    return (
+        select(Sport, Team)
+        .join(Team, Team.sport_id == Sport.id, isouter=True)
+        .where(Sport.id == sport_id)
+        .options(selectinload(Sport.teams))
+    )
+
+
+def inline_teams():
+    return select(Team, Sport).join(Sport).options(selectinload(Team.sport))
+
+
+def inline_team(team_id):
+    return select(Team, Sport).join(Sport).where(Team.id == team_id).options(selectinload(Team.sport))
+
+
+def inline_team_by_name(name):
+    return select(Team).where(Team.name == name)
+
+
+def cases(sport_id: int, team_id: int, team_name: str) -> Dict[str, Dict[str, Callable]]:
+    """name: {'inline': async fn(session), 'repository': async fn(session)}"""
+
+    async def scalar(session, statement):
+        return (await session.execute(statement)).scalar()
+
+    async def scalars(session, statement):
+        return (await session.execute(statement)).scalars().all()
+
+    return {
+        'sports': {
+            'inline': lambda session: scalars(session, inline_sports()),
+            'repository': lambda session: repository._get_sports(session),
+        },
+        'sport': {
+            'inline': lambda session: scalar(session, inline_sport(sport_id)),
+            'repository': lambda session: repository._get_sport(session, sport_id),
+        },
+        'teams': {
+            'inline': lambda session: scalars(session, inline_teams()),
+            'repository': lambda session: repository._get_teams(session),
+        },
+        'team': {
+            'inline': lambda session: scalar(session, inline_team(team_id)),
+            'repository': lambda session: repository._get_team(session, team_id),
+        },
+        'team_by_name': {
+            'inline': lambda session: scalars(session, inline_team_by_name(team_name)),
+            'repository': lambda session: repository._get_teams_by_name(session, team_name),
+        },
+        'ask': {
+            'inline': lambda session: session.get(Team, team_id),
+            'repository': lambda session: repository.get_team_row(session, team_id),
+        },
+    }
+
+
+def construction_us(iterations: int, sport_id: int, team_id: int, team_name: str) -> float:
+    """Mean microseconds to build and cache key one of each inline statement."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for statement in (inline_sports(), inline_sport(sport_id), inline_teams(), inline_team(team_id),
+                          inline_team_by_name(team_name)):
+            statement._generate_cache_key()
+    return (time.perf_counter() - start) / iterations / 5 * 1e6
+
+
+async def time_case(engine, fn: Callable, iterations: int) -> float:
+    # A new session per call like a request, so nothing is answered from a previous call's identity map.
+    for _ in range(10):
+        async with get_session_with_engine(engine) as session:
+            await fn(session)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        async with get_session_with_engine(engine) as session:
+            await fn(session)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(db: str, iterations: int, sport_id: int, team_id: int, team_name: str) -> List[tuple]:
+    engine = create_async_db_engine(f'sqlite+aiosqlite:///{db}', pool_size=1)
+    results = []
+    try:
+        for name, fns in cases(sport_id, team_id, team_name).items():
+            inline = await time_case(engine, fns['inline'], iterations)
+            repo = await time_case(engine, fns['repository'], iterations)
+            results.append((name, inline, repo))
+    finally:
+        await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='willtheywinfastapi.db')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--sport-id', type=int, default=1)
+    parser.add_argument('--team-id', type=int, default=1)
+    parser.add_argument('--team-name', default='flames')
+    args = parser.parse_args()
+
+    print(f'statement construction + cache key: '
+          f'{construction_us(args.iterations, args.sport_id, args.team_id, args.team_name):.1f} us per statement\n')
+
+    results = asyncio.run(run(args.db, args.iterations, args.sport_id, args.team_id, args.team_name))
+    header = f"{'query':<16}{'inline us':>12}{'repository us':>16}{'change':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, inline, repo in results:
+        print(f'{name:<16}{inline:>12.1f}{repo:>16.1f}{(repo - inline) / inline:>10.1%}')
+
+
+if __name__ == '__main__':
+    main()
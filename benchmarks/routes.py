@@ -0,0 +1,113 @@
+"""
+Load test the api routes against a running server and report throughput and latency per route.
+
+Usage:
+    python benchmarks/routes.py --url http://localhost:8000 --concurrency 32 --requests 2000
+
+The catalog routes need a seeded database (see scripts/setup.sh).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+DEFAULT_ROUTES = [
+    '/ping',
+    '/sports',
+    '/sports/1',
+    '/teams',
+    '/teams/1',
+    '/teams/name/flames',
+    '/teams/1/ask',
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def bench_route(client: httpx.AsyncClient, route: str, concurrency: int, total: int) -> Dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.get(route)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'route': route,
+        'requests': total,
+        'errors': errors,
+        'rps': total / elapsed,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+async def run(url: str, routes: List[str], concurrency: int, total: int, keepalive: bool, verify: bool) -> List[Dict]:
+    # With keepalive off every request opens (and tears down) its own connection.
+    limits = httpx.Limits(
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency if keepalive else 0,
+    )
+    headers = {} if keepalive else {'Connection': 'close'}
+    async with httpx.AsyncClient(base_url=url, limits=limits, headers=headers, verify=verify, timeout=30) as client:
+        # Warm up each route so the first connection and lazy app setup are not counted.
+        for route in routes:
+            await client.get(route)
+
+        return [await bench_route(client, route, concurrency, total) for route in routes]
+
+
+def print_results(results: List[Dict]) -> None:
+    header = f"{'route':<24}{'reqs':>8}{'errs':>6}{'req/s':>10}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(
+            f"{r['route']:<24}{r['requests']:>8}{r['errors']:>6}{r['rps']:>10.1f}{r['mean_ms']:>10.2f}"
+            f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per route')
+    parser.add_argument('--route', action='append', dest='routes', help='route to hit, may be repeated')
+    parser.add_argument('--no-keepalive', action='store_true', help='open a new connection for every request')
+    parser.add_argument('--insecure', action='store_true', help='skip tls certificate verification')
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run(args.url, args.routes or DEFAULT_ROUTES, args.concurrency, args.requests, not args.no_keepalive,
+            not args.insecure)
+    )
+    print_results(results)
+
+
+if __name__ == '__main__':
+    main()
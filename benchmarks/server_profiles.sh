@@ -0,0 +1,34 @@
+#!/usr/bin/env bash
+# Compare the old hardcoded gunicorn command line against conf/gunicorn_conf.py on the route suite.
+#
+# Usage (from the project root, with DATABASE_URL pointing at a seeded database):
+#   benchmarks/server_profiles.sh [extra benchmarks/routes.py args]
+set -e
+
+PORT=${PORT:-8089}
+URL="http://127.0.0.1:$PORT"
+
+run_profile() {
+  local name=$1
+  shift
+  echo " -- $name -- "
+  gunicorn "$@" src.main:app &
+  local pid=$!
+  # wait for the workers to come up
+  for _ in $(seq 50); do
+    curl -sf "$URL/ping" > /dev/null && break
+    sleep 0.2
+  done
+  python benchmarks/routes.py --url "$URL" "${BENCH_ARGS[@]}"
+  kill $pid
+  wait $pid 2> /dev/null || true
+}
+
+BENCH_ARGS=("$@")
+
+run_profile "baseline: 4 workers, uvicorn auto loop/http, no preload" \
+  --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind "127.0.0.1:$PORT" --log-level warning
+
+BIND="127.0.0.1:$PORT" LOG_LEVEL=warning ACCESS_LOG= \
+  run_profile "conf/gunicorn_conf.py: cpu derived workers, uvloop + httptools, keep-alive, preload" \
+  -c conf/gunicorn_conf.py
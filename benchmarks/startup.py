@@ -0,0 +1,111 @@
+"""
+Startup cost report for src.main.
+
+    python benchmarks/startup.py importtime [--top 25]
+        Imports src.main in a fresh interpreter under `python -X importtime` and reports the total import time and
+        the most expensive modules by cumulative time.
+
+    python benchmarks/startup.py first-request [--runs 5] [--route /sports]
+        Starts a server process and measures the wall time until the first successful response on the route, i.e.
+        what a scale-up or a rolling deploy waits for before a new worker is useful.
+
+Run from the project root. first-request needs DATABASE_URL pointing at a migrated database.
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import httpx
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """Return (module, self_us, cumulative_us, depth) for every line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def importtime(module: str, top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+    )
+    rows = parse_importtime(result.stderr)
+
+    total = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    print(f'import {module}: {total / 1000:.1f} ms total, {len(rows)} modules')
+    print()
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:top]:
+        print(f'{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {"  " * depth}{name}')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def first_request(route: str, runs: int, timeout: float) -> None:
+    timings = []
+    for _ in range(runs):
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', '--factory', 'src.main:create_app', '--port', str(port),
+             '--log-level', 'warning'],
+            env=os.environ.copy(),
+        )
+        try:
+            while True:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f'no response from {route} within {timeout}s')
+                try:
+                    if httpx.get(f'http://127.0.0.1:{port}{route}').status_code < 500:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            timings.append(time.perf_counter() - start)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f'time to first {route} response over {runs} runs: '
+          f'mean {statistics.mean(timings) * 1000:.0f} ms, '
+          f'min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importtime_parser = commands.add_parser('importtime')
+    importtime_parser.add_argument('--module', default='src.main')
+    importtime_parser.add_argument('--top', type=int, default=25)
+
+    first_request_parser = commands.add_parser('first-request')
+    first_request_parser.add_argument('--route', default='/sports')
+    first_request_parser.add_argument('--runs', type=int, default=5)
+    first_request_parser.add_argument('--timeout', type=float, default=30)
+
+    args = parser.parse_args()
+    if args.command == 'importtime':
+        importtime(args.module, args.top)
+    else:
+        first_request(args.route, args.runs, args.timeout)
+
+
+if __name__ == '__main__':
+    main()
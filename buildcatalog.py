@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+
+from src.db.artifact import write_artifact
+from src.db.db import dispose_engine, get_engine
+from src.db.snapshot import load_snapshot
+
+DEFAULT_PATH = 'catalog.bin'
+
+
+async def build_catalog(path: str) -> None:
+    print(f'Building catalog artifact {path}...')
+
+    try:
+        snapshot = await load_snapshot(get_engine())
+    finally:
+        await dispose_engine()
+
+    size = write_artifact(snapshot, path)
+
+    print(f'Done building catalog artifact: {len(snapshot.sports)} sports, {len(snapshot.teams)} teams, {size} bytes')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Compile the sport and team tables into a memory mappable catalog artifact (see CATALOG_ARTIFACT).'
+    )
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    asyncio.run(build_catalog(args.path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Gunicorn runtime configuration for the production api container.
+
+Usage: gunicorn -c conf/gunicorn_conf.py 'src.main:create_app()'
+
+Every setting can be overridden from the environment (see prod.env).
+"""
+import multiprocessing
+import os
+
+
+def _cpu_count() -> int:
+    # Respect the container's cpu set if it is pinned to fewer cores than the host has.
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+def _default_workers() -> int:
+    workers_per_core = float(os.environ.get('WORKERS_PER_CORE', 1))
+    max_workers = int(os.environ.get('MAX_WORKERS', 0))
+
+    workers = max(int(workers_per_core * _cpu_count()), 2)
+    if max_workers:
+        workers = min(workers, max_workers)
+    return workers
+
+
+bind = os.environ.get('BIND', '0.0.0.0:80')
+workers = int(os.environ.get('WEB_CONCURRENCY', 0)) or _default_workers()
+worker_class = os.environ.get('WORKER_CLASS', 'src.worker.UvicornWorker')
+
+# Import the app once in the master and fork the workers from it, the imported modules are then shared between the
+# workers copy-on-write rather than every worker importing fastapi, sqlalchemy etc. on its own.
+preload_app = bool(int(os.environ.get('PRELOAD_APP', 1)))
+
+# Must be longer than nginx's upstream keepalive_timeout so that nginx, not the app, is the side closing idle
+# upstream connections. Otherwise nginx can send a request down a connection the worker is just closing.
+keepalive = int(os.environ.get('KEEP_ALIVE', 75))
+
+backlog = int(os.environ.get('BACKLOG', 2048))
+timeout = int(os.environ.get('TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers periodically, the jitter keeps them from all restarting at the same time.
+max_requests = int(os.environ.get('MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 1000))
+
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+accesslog = os.environ.get('ACCESS_LOG', '-') or None
+errorlog = os.environ.get('ERROR_LOG', '-')
@@ -5,11 +5,14 @@ from alembic.config import Config
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 import pytest
+from sqlalchemy import event
 
+from src.audit import audit_queue
 from src.db.db import create_async_db_engine, get_session_with_engine, init_db_with_engine, reset_db_with_engine
 from src.db.models.team import Team, TeamCreate
 from src.db.models.sport import Sport, SportCreate
 from src.db.schema.league import LeagueEnum
+from src.dependencies import protect_route
 from src.main import app as fastapi_app, get_session
 
 # Testing Sqlite async
@@ -41,6 +44,14 @@ async def async_client(app):
         yield client
 
 
+@pytest.fixture
+def protected_routes_enabled():
+    """Allow requests to the routes behind protect_route for the test."""
+    fastapi_app.dependency_overrides[protect_route] = lambda: None
+    yield
+    del fastapi_app.dependency_overrides[protect_route]
+
+
 # -- DB fixtures --
 
 async def override_get_session():
@@ -58,6 +69,27 @@ def override_get_session_fixture():
     fastapi_app.dependency_overrides[get_session] = override_get_session
 
 
+@pytest.fixture
+def statements():
+    """The first word of each sql statement run during the test, in order."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0])
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def audited():
+    """The audit entries queued during the test, see src/audit.py."""
+    audit_queue.entries.clear()
+    yield audit_queue.entries
+    audit_queue.entries.clear()
+
+
 @pytest.fixture
 def db():
     path = Path.cwd().joinpath(TEST_DB_NAME)  # cwd is the directory pytest is invoked from
@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import os
+
+from src.db.columnar import ColumnarFormat, TABLES, write_table
+from src.db.db import dispose_engine, get_engine
+from src.db.shards import dispose_shard_engines, shard_connections
+
+
+async def export_catalog(out_dir: str, format: ColumnarFormat) -> None:
+    engine = get_engine()
+
+    try:
+        for table in TABLES:
+            path = os.path.join(out_dir, f'{table}.{format.value}')
+            print(f'Exporting {table} to {path}...')
+            size = await write_table(shard_connections(engine), table, path, format)
+            print(f'Done exporting {table}, {size} bytes')
+    finally:
+        await dispose_engine()
+        await dispose_shard_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Export the sport and team tables as Arrow IPC streams or Parquet.')
+    parser.add_argument('--format', type=ColumnarFormat, choices=list(ColumnarFormat), default=ColumnarFormat.ARROW)
+    parser.add_argument('--out-dir', default='.')
+    args = parser.parse_args()
+
+    asyncio.run(export_catalog(args.out_dir, args.format))
+
+
+if __name__ == '__main__':
+    main()
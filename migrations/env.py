@@ -9,8 +9,12 @@ from sqlmodel import SQLModel
 
 from alembic import context
 
+from src.db.models.audit import AuditLog
 from src.db.models.sport import Sport
+from src.db.models.event import CatalogEvent
 from src.db.models.team import Team
+from src.db.models.tombstone import Tombstone
+from src.db.shards import shards
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -32,9 +36,12 @@ target_metadata = SQLModel.metadata
 # ... etc.
 
 # Only set the sqlalchemy.url if it is not already set (it is set in conftest and we don't want to change that)
-if config.get_main_option('sqlalchemy.url') is None:
+database_urls = [config.get_main_option('sqlalchemy.url')]
+if database_urls[0] is None:
     print(f"setting sqlalchemy.url as {os.environ.get('DATABASE_URL')}")
     config.set_main_option('sqlalchemy.url', os.environ.get('DATABASE_URL'))
+    # With the url from the environment migrate the league shards too (see src/db/shards.py)
+    database_urls = [os.environ.get('DATABASE_URL')] + shards.urls[1:]
 
 
 def run_migrations_offline():
@@ -76,17 +83,22 @@ async def run_migrations_online():
     and associate a connection with the context.
 
     """
-    connectable = AsyncEngine(
-        engine_from_config(
-            config.get_section(config.config_ini_section),
-            prefix="sqlalchemy.",
-            poolclass=pool.NullPool,
-            future=True,
+    for url in database_urls:
+        if len(database_urls) > 1:
+            print(f'migrating {url}')
+        section = dict(config.get_section(config.config_ini_section), **{'sqlalchemy.url': url})
+        connectable = AsyncEngine(
+            engine_from_config(
+                section,
+                prefix="sqlalchemy.",
+                poolclass=pool.NullPool,
+                future=True,
+            )
         )
-    )
 
-    async with connectable.connect() as connection:
-        await connection.run_sync(do_run_migrations)
+        async with connectable.connect() as connection:
+            await connection.run_sync(do_run_migrations)
+        await connectable.dispose()
 
 
 if context.is_offline_mode():
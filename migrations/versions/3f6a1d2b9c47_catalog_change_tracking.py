@@ -0,0 +1,51 @@
+"""catalog change tracking
+
+Revision ID: 3f6a1d2b9c47
+Revises: 1c32ce680812
+Create Date: 2026-10-19 09:12:40.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision = '3f6a1d2b9c47'
+down_revision = '1c32ce680812'
+branch_labels = None
+depends_on = None
+
+# Existing rows predate change tracking. Same format sqlalchemy stores DateTime in on sqlite.
+EPOCH = '1970-01-01 00:00:00.000000'
+
+
+def upgrade():
+    with op.batch_alter_table('sport', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=EPOCH))
+        batch_op.create_index(batch_op.f('ix_sport_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('team', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=EPOCH))
+        batch_op.create_index(batch_op.f('ix_team_updated_at'), ['updated_at'], unique=False)
+
+    op.create_table('tombstone',
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tombstone_deleted_at'), 'tombstone', ['deleted_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_tombstone_deleted_at'), table_name='tombstone')
+    op.drop_table('tombstone')
+
+    with op.batch_alter_table('team', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_team_updated_at'))
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('sport', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sport_updated_at'))
+        batch_op.drop_column('updated_at')
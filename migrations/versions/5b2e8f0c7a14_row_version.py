@@ -0,0 +1,33 @@
+"""row version
+
+Revision ID: 5b2e8f0c7a14
+Revises: c4e7b19a3d58
+Create Date: 2026-10-19 16:05:12.381946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8f0c7a14'
+down_revision = 'c4e7b19a3d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start at version 1, like new ones
+    with op.batch_alter_table('sport', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    with op.batch_alter_table('team', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('team', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('sport', schema=None) as batch_op:
+        batch_op.drop_column('version')
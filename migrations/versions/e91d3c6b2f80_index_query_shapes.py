@@ -0,0 +1,43 @@
+"""index query shapes
+
+Revision ID: e91d3c6b2f80
+Revises: 5b2e8f0c7a14
+Create Date: 2026-10-19 16:48:31.902417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision = 'e91d3c6b2f80'
+down_revision = '5b2e8f0c7a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A sport's teams (the join of the sport and league routes) come straight from this index in id order, no table
+    # lookups and no sort. It replaces the plain sport_id index.
+    op.create_index('ix_team_sport_id_id_name_city', 'team', ['sport_id', 'id', 'name', 'city'], unique=False)
+    op.drop_index('ix_team_sport_id', table_name='team')
+
+    # The id indexes duplicate the integer primary keys, the name indexes are prefixes of the unique constraints
+    # (team_name_city_sport_unique_idx covers lookups by team name) and nothing filters by city. Each was one more
+    # b-tree to write on every insert and update.
+    op.drop_index('ix_team_id', table_name='team')
+    op.drop_index('ix_team_name', table_name='team')
+    op.drop_index('ix_team_city', table_name='team')
+    op.drop_index('ix_sport_id', table_name='sport')
+    op.drop_index('ix_sport_name', table_name='sport')
+
+
+def downgrade():
+    op.create_index('ix_sport_name', 'sport', ['name'], unique=False)
+    op.create_index('ix_sport_id', 'sport', ['id'], unique=False)
+    op.create_index('ix_team_city', 'team', ['city'], unique=False)
+    op.create_index('ix_team_name', 'team', ['name'], unique=False)
+    op.create_index('ix_team_id', 'team', ['id'], unique=False)
+
+    op.create_index('ix_team_sport_id', 'team', ['sport_id'], unique=False)
+    op.drop_index('ix_team_sport_id_id_name_city', table_name='team')
@@ -16,4 +16,9 @@ docker ps
 
 docker exec will_they_win_fast_api_prod bash -c "alembic upgrade head"
 
+echo "waiting for the api to finish warming up..."
+until [ "$(docker inspect --format '{{.State.Health.Status}}' will_they_win_fast_api_prod)" = "healthy" ]; do
+  sleep 2
+done
+
 echo " -- Deploying willtheywin-fast production complete -- "
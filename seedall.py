@@ -5,7 +5,7 @@ from src.db.data import teams
 from src.db.models.team import Team, TeamCreate
 from src.db.models.sport import Sport, SportCreate
 from src.db.schema.league import LeagueEnum
-from src.db.db import get_session_with_engine, engine
+from src.db.db import get_engine, get_session_with_engine
 
 
 async def seed_sports() -> dict:
@@ -18,7 +18,7 @@ async def seed_sports() -> dict:
         SportCreate(name='Football', league=LeagueEnum.CFL),
     ]
 
-    db_session = get_session_with_engine(engine)
+    db_session = get_session_with_engine(get_engine())
 
     sports = []
 
@@ -31,10 +31,8 @@ async def seed_sports() -> dict:
 
         await db_session.commit()
 
-        sports_dict = {}
-        for s in sports:
-            await db_session.refresh(s)
-            sports_dict[s.league] = s
+        # The session doesn't expire on commit, the sports keep their values and the ids from the flush
+        sports_dict = {s.league: s for s in sports}
 
     finally:
         if db_session:
@@ -60,7 +58,7 @@ async def seed_teams_for_sport(sport: Sport, teams: List[tuple]) -> List[Team]:
 
     team_creates = [TeamCreate(city=tt[0], name=tt[1]) for tt in teams]
 
-    db_session = get_session_with_engine(engine)
+    db_session = get_session_with_engine(get_engine())
 
     db_teams = []
     try:
@@ -72,9 +70,6 @@ async def seed_teams_for_sport(sport: Sport, teams: List[tuple]) -> List[Team]:
 
         await db_session.commit()
 
-        for t in db_teams:
-            await db_session.refresh(t)
-
     finally:
         if db_session:
             await db_session.close()
@@ -0,0 +1,74 @@
+"""
+Answers for many teams at once, for the league and whole catalog ask routes.
+
+The team set is loaded once and the answers for all of it are drawn together by AnswerChoices.draw, a single
+random.choices call over the answers' json ready dicts. The response is a json array written out in chunks as it is
+rendered, each chunk in one json.dumps call, so it starts going out straight away and a large catalog is never held
+rendered in full.
+"""
+import os
+from typing import AsyncIterator, Optional, Sequence
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+
+from src.db.schema.answer import AnswerChoices, SENTIMENT_WEIGHTS, Sentiment, SentimentWeights
+from src.db.snapshot import render_json
+from src.response_exception import HTTPBadRequest
+
+ASK_CHUNK_SIZE = int(os.environ.get('ASK_CHUNK_SIZE', 500))
+# Tells nginx to pass the chunks on as they come rather than buffering the whole response.
+STREAMING_HEADERS = {'X-Accel-Buffering': 'no'}
+
+# The answers as dicts, in the order of ANSWERS_ANY so AnswerChoices.draw can draw from them directly
+ANSWER_DICTS = [answer.dict() for answer in AnswerChoices.ANSWERS_ANY]
+
+
+def sentiment_weights(
+    sentiment: Optional[Sentiment] = None,
+    negative: Optional[float] = Query(None, ge=0),
+    neutral: Optional[float] = Query(None, ge=0),
+    positive: Optional[float] = Query(None, ge=0),
+) -> Optional[SentimentWeights]:
+    """The weights to draw with: a sentiment's, or the weights given (1 for any left out), or None for any answer."""
+    given = {name: weight for name, weight in (('negative', negative), ('neutral', neutral), ('positive', positive))
+             if weight is not None}
+
+    if sentiment is not None:
+        if given:
+            raise HTTPBadRequest('Pass either a sentiment or sentiment weights, not both')
+        return SENTIMENT_WEIGHTS[sentiment]
+
+    if not given:
+        return None
+
+    weights = SentimentWeights(**given)
+    if sum(weights) <= 0:
+        raise HTTPBadRequest('Sentiment weights must not all be 0')
+    return weights
+
+
+async def stream_answers(
+    teams: Sequence, sentiment: Optional[Sentiment], weights: Optional[SentimentWeights]
+) -> AsyncIterator[bytes]:
+    answers = AnswerChoices.draw(len(teams), weights, population=ANSWER_DICTS)
+
+    yield b'['
+    for start in range(0, len(teams), ASK_CHUNK_SIZE):
+        end = start + ASK_CHUNK_SIZE
+        chunk = render_json([
+            {'team': team.dict(), 'answer': answer, 'requested_sentiment': sentiment}
+            for team, answer in zip(teams[start:end], answers[start:end])
+        ])
+        # The chunk's items without its brackets, comma separated from the previous chunk's
+        yield (b',' if start else b'') + chunk[1:-1]
+    yield b']'
+
+
+def ask_response(
+    teams: Sequence, sentiment: Optional[Sentiment], weights: Optional[SentimentWeights]
+) -> StreamingResponse:
+    """A json array of {'team', 'answer', 'requested_sentiment'} for each team, like /teams/{team_id}/ask's"""
+    return StreamingResponse(
+        stream_answers(teams, sentiment, weights), media_type='application/json', headers=STREAMING_HEADERS
+    )
@@ -0,0 +1,161 @@
+"""
+Audit log of sport and team changes.
+
+SQLAlchemy session events capture the before and after values of every Sport and Team a flush creates, updates or
+deletes, along with the actor, the client address of the request (set by the record_actor dependency on the write
+routes). They are held on the session until it commits, dropped if it rolls back, and on commit move to this worker's
+AuditQueue. AuditQueue.run writes them to the audit_log table in batches, one transaction each, so the write routes
+don't wait on an extra INSERT.
+
+Entries still queued when a worker is killed are lost, and when AUDIT_QUEUE_SIZE entries are waiting the oldest are
+dropped (counted in AuditQueue.dropped). The log is written to the default database, whichever shard changed.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Deque, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from src.db.models import utcnow
+from src.db.models.audit import AuditLog
+from src.db.models.event import CREATED, DELETED, UPDATED
+from src.db.models.sport import Sport
+from src.db.models.team import Team
+from src.db.models.tombstone import SPORT_ENTITY, TEAM_ENTITY
+from src.ratelimit import client_key
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS', 1))
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+
+AUDITED = {Sport: SPORT_ENTITY, Team: TEAM_ENTITY}
+# Key of the entries a session has flushed but not yet committed, in Session.info
+PENDING = 'audit_pending'
+
+actor: ContextVar[Optional[str]] = ContextVar('audit_actor', default=None)
+
+
+async def record_actor(request: Request) -> None:
+    """Dependency of the write routes, their changes are logged as made by the client's address."""
+    actor.set(client_key(request.scope))
+
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _values(obj, state, before: bool = False) -> dict:
+    values = {}
+    for key in obj.__fields__:
+        if before:
+            history = state.attrs[key].history
+            if history.deleted:
+                values[key] = _jsonable(history.deleted[0])
+                continue
+        if key in state.dict:
+            values[key] = _jsonable(state.dict[key])
+    return values
+
+
+def audit_entry(entity: str, entity_id: int, op: str, before: Optional[dict], after: Optional[dict]) -> dict:
+    return {
+        'entity': entity,
+        'entity_id': entity_id,
+        'op': op,
+        'actor': actor.get(),
+        'before': before,
+        'after': after,
+        'changed_at': utcnow(),
+    }
+
+
+def _entry(obj, op: str) -> dict:
+    state = inspect(obj)
+    return audit_entry(
+        AUDITED[type(obj)], obj.id, op,
+        before=None if op == CREATED else _values(obj, state, before=True),
+        after=None if op == DELETED else _values(obj, state),
+    )
+
+
+def add_pending(session: Session, entries: List[dict]) -> None:
+    """Queue entries for the log once the session commits. For changes made without ORM objects, see src/db/bulk.py."""
+    session.info.setdefault(PENDING, []).extend(entries)
+
+
+class AuditQueue:
+    """A worker's committed audit entries waiting to be written."""
+
+    def __init__(self, maxlen: int = AUDIT_QUEUE_SIZE):
+        self.entries: Deque[dict] = deque(maxlen=maxlen)
+        self.written = 0
+        self.dropped = 0
+
+    def put(self, entries: List[dict]) -> None:
+        overflow = len(self.entries) + len(entries) - self.entries.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+            logger.warning(f'audit queue full, dropped the {overflow} oldest entries')
+        self.entries.extend(entries)
+
+    async def flush(self, engine: AsyncEngine, batch_size: int = AUDIT_BATCH_SIZE) -> int:
+        """Write the queued entries in transactions of up to batch_size, returning how many were written."""
+        count = 0
+        while self.entries:
+            batch = [self.entries.popleft() for _ in range(min(batch_size, len(self.entries)))]
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(insert(AuditLog), batch)
+            except BaseException:
+                # Put the batch back to retry on the next flush
+                self.entries.extendleft(reversed(batch))
+                raise
+            count += len(batch)
+            self.written += len(batch)
+        return count
+
+    async def run(self, engine: AsyncEngine, interval: float = AUDIT_FLUSH_SECONDS) -> None:
+        """Flush every interval seconds forever. The app flushes once more on shutdown."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(engine)
+            except Exception:
+                logger.exception('writing the audit log failed')
+
+
+audit_queue = AuditQueue()
+
+
+@event.listens_for(Session, 'after_flush')
+def _capture(session: Session, flush_context) -> None:
+    # Within after_flush new rows have their ids and the attribute history still holds the values before the flush.
+    entries = [_entry(obj, CREATED) for obj in session.new if type(obj) in AUDITED]
+    entries += [
+        _entry(obj, UPDATED) for obj in session.dirty
+        if type(obj) in AUDITED and session.is_modified(obj, include_collections=False)
+    ]
+    entries += [_entry(obj, DELETED) for obj in session.deleted if type(obj) in AUDITED]
+    if entries:
+        add_pending(session, entries)
+
+
+@event.listens_for(Session, 'after_commit')
+def _enqueue(session: Session) -> None:
+    entries = session.info.pop(PENDING, None)
+    if entries:
+        audit_queue.put(entries)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING, None)
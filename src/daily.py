@@ -0,0 +1,154 @@
+"""
+Daily predictions: one answer per team and sentiment a day.
+
+The answer of the day is a deterministic pick (AnswerChoices.daily), so the response for a team only changes at
+midnight (in DAILY_PREDICTIONS_TZ) or when the team is edited. GET /teams/{team_id}/ask/daily sends it with an ETag
+and a short Cache-Control max-age (DAILY_PREDICTIONS_MAX_AGE, never past midnight), so browsers and nginx cache it but
+revalidate often enough to pick up an edited or deleted team. A revalidation is a 304 served from the worker's
+DailyPredictions, without a query.
+
+Each worker also keeps the rendered responses of the day in a DailyPredictions, filled as they are asked for and,
+with DAILY_PREDICTIONS_PRECOMPUTE, precomputed for every team and sentiment when the day rolls over. Hits are served
+without a query. Entries are dropped when the change events (src/events.py) report that the team was updated or
+deleted, the events of every shard's teams included (see src/db/shards.py).
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from math import ceil
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.db import repository
+from src.db.db import get_session_with_engine
+from src.db.models.tombstone import TEAM_ENTITY
+from src.db.schema.answer import AnswerChoices, Sentiment
+from src.db.snapshot import render_json
+from src.events import ChangeBroker
+
+logger = logging.getLogger(__name__)
+
+
+def _timezone(name: Optional[str]) -> tzinfo:
+    if not name:
+        return timezone.utc
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(name)
+
+
+# The day of a prediction is the date in this timezone, its answers change at midnight there.
+DAILY_PREDICTIONS_TZ = _timezone(os.environ.get('DAILY_PREDICTIONS_TZ'))
+DAILY_PREDICTIONS_PRECOMPUTE = bool(int(os.environ.get('DAILY_PREDICTIONS_PRECOMPUTE', 1)))
+# How long caches may serve a prediction before revalidating it, the delay before a team's edits show up.
+DAILY_PREDICTIONS_MAX_AGE = int(os.environ.get('DAILY_PREDICTIONS_MAX_AGE', 60))
+
+SENTIMENTS = (None, *Sentiment)
+
+
+def local_now() -> datetime:
+    return datetime.now(DAILY_PREDICTIONS_TZ)
+
+
+def seconds_until_midnight(at: datetime) -> int:
+    midnight = datetime.combine(at.date() + timedelta(days=1), time(), tzinfo=at.tzinfo)
+    # Subtract in utc, wall clock arithmetic is off by the difference on days the clocks change.
+    return max(ceil((midnight.astimezone(timezone.utc) - at.astimezone(timezone.utc)).total_seconds()), 1)
+
+
+def cache_max_age(at: datetime) -> int:
+    return min(DAILY_PREDICTIONS_MAX_AGE, seconds_until_midnight(at))
+
+
+def render_prediction(team: dict, day: date, sentiment: Optional[Sentiment]) -> bytes:
+    """The response body, /teams/{team_id}/ask's plus the date."""
+    return render_json({
+        'team': team,
+        'answer': AnswerChoices.daily(team['id'], day, sentiment).dict(),
+        'requested_sentiment': sentiment,
+        'date': day.isoformat(),
+    })
+
+
+class DailyPredictions:
+    """A worker's rendered predictions for one day, by (team_id, sentiment)."""
+
+    def __init__(self):
+        self.day: Optional[date] = None
+        self._bodies: Dict[Tuple[int, Optional[Sentiment]], bytes] = {}
+        # Teams changed while a precompute is running, dropped from its result once it is done
+        self._changed_while_building: Optional[Set[int]] = None
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def get(self, day: date, team_id: int, sentiment: Optional[Sentiment]) -> Optional[bytes]:
+        if day != self.day:
+            return None
+        return self._bodies.get((team_id, sentiment))
+
+    def put(self, day: date, team_id: int, sentiment: Optional[Sentiment], body: bytes) -> None:
+        if day != self.day:
+            # A new day without a precompute, start over
+            self._bodies = {}
+            self.day = day
+        self._bodies[(team_id, sentiment)] = body
+
+    def discard(self, team_id: int) -> None:
+        for sentiment in SENTIMENTS:
+            self._bodies.pop((team_id, sentiment), None)
+        if self._changed_while_building is not None:
+            self._changed_while_building.add(team_id)
+
+    def clear(self) -> None:
+        self._bodies = {}
+
+    def precompute(self, day: date, teams: Iterable[dict]) -> None:
+        """Replace the cached predictions with those of day for every team and sentiment."""
+        self._bodies = {
+            (team['id'], sentiment): render_prediction(team, day, sentiment)
+            for team in teams for sentiment in SENTIMENTS
+        }
+        self.day = day
+
+    async def precompute_from_db(self, engine: AsyncEngine, day: date) -> None:
+        self._changed_while_building = set()
+        try:
+            async with get_session_with_engine(engine) as session:
+                rows = await repository.get_team_rows(session)
+            self.precompute(day, (row._asdict() for row in rows))
+            for team_id in self._changed_while_building:
+                self.discard(team_id)
+        finally:
+            self._changed_while_building = None
+        logger.info(f'daily predictions for {day} precomputed: {len(rows)} teams')
+
+    async def invalidate_on_changes(self, broker: ChangeBroker) -> None:
+        """Drop the predictions of teams as they are updated or deleted."""
+        while True:
+            subscription = broker.subscribe()
+            try:
+                while not (subscription.closed and subscription.queue.empty()):
+                    event = await subscription.queue.get()
+                    if event.entity == TEAM_ENTITY:
+                        self.discard(event.entity_id)
+            finally:
+                broker.unsubscribe(subscription)
+            # Dropped for falling behind, some changes may have been missed.
+            self.clear()
+
+    async def run(self, engine: AsyncEngine, broker: ChangeBroker, precompute: bool = DAILY_PREDICTIONS_PRECOMPUTE):
+        """Keep the predictions up to date with the changes, and with precompute fill them after every midnight."""
+        invalidator = asyncio.create_task(self.invalidate_on_changes(broker))
+        try:
+            while precompute:
+                try:
+                    await self.precompute_from_db(engine, local_now().date())
+                except Exception:
+                    logger.exception('precomputing daily predictions failed')
+                # A second past midnight, so the clock is surely on the new day
+                await asyncio.sleep(seconds_until_midnight(local_now()) + 1)
+            await invalidator
+        finally:
+            invalidator.cancel()
@@ -0,0 +1,94 @@
+"""
+Admission control for db sessions, see get_session.
+
+Each worker lets at most DB_CONCURRENCY sessions run at once. Further requests wait in a queue of up to DB_QUEUE_SIZE
+for at most DB_QUEUE_TIMEOUT seconds, and past either limit they are shed with a 503 straight away. Under a spike
+some requests fail fast and the rest keep their usual latency, where without it every request would queue inside the
+connection pool and the aiosqlite threads and all of them would slow down together.
+
+Built on plain futures rather than asyncio.Semaphore, which before python 3.10 binds to the event loop current at
+creation, and this is created at import in the gunicorn master.
+"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AdmissionQueue:
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'shed_queue_full': self.shed_queue_full,
+            'shed_timeout': self.shed_timeout,
+        }
+
+    async def acquire(self) -> None:
+        """Wait for a slot, raises Overloaded if the queue is full or the wait times out."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.shed_queue_full += 1
+            raise Overloaded('queue full')
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self.shed_timeout += 1
+            raise Overloaded('timed out waiting')
+        except asyncio.CancelledError:
+            # Cancelled just as release handed it the slot, pass it on.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+        self.admitted += 1
+
+    def release(self) -> None:
+        # Hand the slot straight to the next waiter, so active doesn't change and nothing can jump the queue.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,280 @@
+"""
+Compiled, memory mapped catalog artifact.
+
+buildcatalog.py compiles the sport and team tables into a single read-only file. Workers mmap it (CATALOG_ARTIFACT)
+and answer catalog lookups straight out of the shared page cache, so the catalog's memory is paid once per host rather
+than once per worker and a worker needs no db queries to start serving the catalog.
+
+Layout, all integers little endian:
+
+    header          magic, then 12 uint32: sport count, team count, and the offsets/sizes of the sections below
+    sports          fixed width sport records sorted by id: int64 id, name, league, teams start, teams count
+    teams           fixed width team records sorted by id: int64 id, int64 sport id (-1 for none), name, city
+    name index      uint32 team record numbers sorted by team name
+    sport index     uint32 team record numbers grouped by sport, each sport's teams start/count point into it
+    strings         utf-8 string pool, the records hold (offset, length) pairs into it
+    sports json     the rendered /sports response
+    teams json      the rendered /teams response
+
+CatalogArtifact has the same lookup methods as CatalogSnapshot so the snapshot routes serve from either. A reload maps
+the new file and retires the old artifact, which is unmapped once the requests still reading it are done.
+"""
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from src.db.records import SportRecord, TeamRecord
+from src.db.schema.league import LeagueEnum
+from src.db.snapshot import CatalogSnapshot, get_current_snapshot, set_current_snapshot
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'WTWCAT02'
+HEADER = struct.Struct('<8s12I')
+# Ids are 64 bit, the ids of sharded leagues start at shard << SHARD_ID_BITS (see src/db/shards.py)
+SPORT = struct.Struct('<q6I')
+TEAM = struct.Struct('<qq4I')
+RECORD_ID = struct.Struct('<q')
+INDEX = struct.Struct('<I')
+
+
+class StringPool:
+
+    def __init__(self):
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._data = bytearray()
+
+    def add(self, value: str) -> Tuple[int, int]:
+        if value not in self._offsets:
+            encoded = value.encode('utf-8')
+            self._offsets[value] = (len(self._data), len(encoded))
+            self._data += encoded
+        return self._offsets[value]
+
+    def bytes(self) -> bytes:
+        return bytes(self._data)
+
+
+def compile_artifact(snapshot: CatalogSnapshot) -> bytes:
+    strings = StringPool()
+    sports = sorted(snapshot.sports, key=lambda s: s.id)
+    teams = sorted(snapshot.teams, key=lambda t: t.id)
+    team_numbers = {team.id: i for i, team in enumerate(teams)}
+
+    sport_index: List[int] = []
+    sport_records = bytearray()
+    for sport in sports:
+        teams_start = len(sport_index)
+        sport_index.extend(team_numbers[team.id] for team in sorted(sport.teams, key=lambda t: t.id))
+        sport_records += SPORT.pack(
+            sport.id, *strings.add(sport.name), *strings.add(sport.league.value), teams_start, len(sport.teams),
+        )
+
+    team_records = bytearray()
+    for team in teams:
+        sport_id = team.sport_id if team.sport_id is not None else -1
+        team_records += TEAM.pack(team.id, sport_id, *strings.add(team.name), *strings.add(team.city))
+
+    name_index = sorted(range(len(teams)), key=lambda i: (teams[i].name.encode('utf-8'), teams[i].id))
+
+    sections = [
+        bytes(sport_records),
+        bytes(team_records),
+        b''.join(INDEX.pack(i) for i in name_index),
+        b''.join(INDEX.pack(i) for i in sport_index),
+        strings.bytes(),
+        snapshot.sports_json,
+        snapshot.teams_json,
+    ]
+
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        offsets.append((position, len(section)))
+        position += len(section)
+
+    (sports_off, _), (teams_off, _), (name_index_off, _), (sport_index_off, _), strings_section, sports_json, \
+        teams_json = offsets
+
+    header = HEADER.pack(
+        MAGIC, len(sports), len(teams), sports_off, teams_off, name_index_off, sport_index_off,
+        *strings_section, *sports_json, *teams_json,
+    )
+    return header + b''.join(sections)
+
+
+def write_artifact(snapshot: CatalogSnapshot, path: str) -> int:
+    """
+    Compile the snapshot and write it to path, returning the size written. The file is replaced atomically so workers
+    that have the old artifact mapped keep reading it until they reopen.
+    """
+    data = compile_artifact(snapshot)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(data)
+
+
+class CatalogArtifact:
+    """Read-only view over a mapped catalog artifact. Records are decoded on demand, nothing is cached per worker."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        # Requests inside reading(), and whether a reload has swapped this artifact out
+        self._readers = 0
+        self._retired = False
+        magic, self.sport_count, self.team_count, self._sports_off, self._teams_off, self._name_index_off, \
+            self._sport_index_off, self._strings_off, _, self._sports_json_off, self._sports_json_len, \
+            self._teams_json_off, self._teams_json_len = HEADER.unpack_from(buffer, 0)
+
+        if magic != MAGIC:
+            raise ValueError(f'Not a catalog artifact, bad magic {magic!r}')
+
+    @classmethod
+    def open(cls, path: str) -> 'CatalogArtifact':
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    @contextmanager
+    def reading(self):
+        """Keep the file mapped while the request reads it, even if a reload retires the artifact meanwhile."""
+        self._readers += 1
+        try:
+            yield self
+        finally:
+            self._readers -= 1
+            if self._retired and not self._readers:
+                self.close()
+
+    def retire(self):
+        """Unmap the file once no request is reading it any more, the artifact is no longer the current snapshot."""
+        self._retired = True
+        if not self._readers:
+            self.close()
+
+    def _str(self, offset: int, length: int) -> str:
+        start = self._strings_off + offset
+        return self._buffer[start:start + length].decode('utf-8')
+
+    def _index(self, offset: int, i: int) -> int:
+        return INDEX.unpack_from(self._buffer, offset + i * INDEX.size)[0]
+
+    def _sport_at(self, n: int, with_teams: bool = True) -> SportRecord:
+        sport_id, name_off, name_len, league_off, league_len, teams_start, teams_count = SPORT.unpack_from(
+            self._buffer, self._sports_off + n * SPORT.size
+        )
+        sport = SportRecord(sport_id, self._str(name_off, name_len), LeagueEnum(self._str(league_off, league_len)))
+        if with_teams:
+            sport.teams = tuple(
+                self._team_at(self._index(self._sport_index_off, teams_start + i), sport=sport)
+                for i in range(teams_count)
+            )
+        return sport
+
+    def _team_at(self, n: int, sport: Optional[SportRecord] = None) -> TeamRecord:
+        team_id, sport_id, name_off, name_len, city_off, city_len = TEAM.unpack_from(
+            self._buffer, self._teams_off + n * TEAM.size
+        )
+        if sport_id < 0:
+            sport_id = None
+        elif sport is None:
+            sport_n = self._find(self._sports_off, SPORT.size, self.sport_count, sport_id)
+            sport = self._sport_at(sport_n, with_teams=False) if sport_n is not None else None
+        return TeamRecord(team_id, self._str(name_off, name_len), self._str(city_off, city_len), sport_id, sport)
+
+    def _team_name(self, n: int) -> bytes:
+        _, _, name_off, name_len, _, _ = TEAM.unpack_from(self._buffer, self._teams_off + n * TEAM.size)
+        start = self._strings_off + name_off
+        return self._buffer[start:start + name_len]
+
+    def _find(self, records_off: int, record_size: int, count: int, record_id: int) -> Optional[int]:
+        """Binary search records sorted by id (the first field of every record) for record_id."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_id = RECORD_ID.unpack_from(self._buffer, records_off + mid * record_size)[0]
+            if mid_id < record_id:
+                lo = mid + 1
+            elif mid_id > record_id:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    @property
+    def sports(self) -> Tuple[SportRecord, ...]:
+        return tuple(self._sport_at(n) for n in range(self.sport_count))
+
+    @property
+    def teams(self) -> Tuple[TeamRecord, ...]:
+        return tuple(self._team_at(n) for n in range(self.team_count))
+
+    @property
+    def sports_json(self) -> bytes:
+        return self._buffer[self._sports_json_off:self._sports_json_off + self._sports_json_len]
+
+    @property
+    def teams_json(self) -> bytes:
+        return self._buffer[self._teams_json_off:self._teams_json_off + self._teams_json_len]
+
+    def sport(self, sport_id: int) -> Optional[SportRecord]:
+        n = self._find(self._sports_off, SPORT.size, self.sport_count, sport_id)
+        return self._sport_at(n) if n is not None else None
+
+    def team(self, team_id: int) -> Optional[TeamRecord]:
+        n = self._find(self._teams_off, TEAM.size, self.team_count, team_id)
+        return self._team_at(n) if n is not None else None
+
+    def teams_by_name(self, name: str) -> Tuple[TeamRecord, ...]:
+        target = name.encode('utf-8')
+
+        # lower bound of target in the name index
+        lo, hi = 0, self.team_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._team_name(self._index(self._name_index_off, mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        teams = []
+        while lo < self.team_count:
+            n = self._index(self._name_index_off, lo)
+            if self._team_name(n) != target:
+                break
+            teams.append(self._team_at(n))
+            lo += 1
+        return tuple(teams)
+
+    def league(self, league: LeagueEnum) -> Optional[SportRecord]:
+        # There is one sport per league and only a handful of them, a scan of the sport records is enough.
+        for n in range(self.sport_count):
+            _, _, _, league_off, league_len, _, _ = SPORT.unpack_from(self._buffer, self._sports_off + n * SPORT.size)
+            if self._str(league_off, league_len) == league.value:
+                return self._sport_at(n)
+        return None
+
+
+async def load_artifact(path: str) -> 'CatalogArtifact':
+    """Map the artifact at path and make it the current snapshot, retiring the one it replaces."""
+    artifact = CatalogArtifact.open(path)
+    previous = get_current_snapshot()
+    set_current_snapshot(artifact)
+    if isinstance(previous, CatalogArtifact):
+        previous.retire()
+    logger.info(f'catalog artifact {path} mapped: {artifact.sport_count} sports, {artifact.team_count} teams')
+    return artifact
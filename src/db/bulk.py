@@ -0,0 +1,196 @@
+"""
+Set-based bulk updates and deletes of sports and teams.
+
+The ids are split by shard and each shard's part runs in one transaction: a SELECT of the named rows, then one
+UPDATE ... WHERE id IN (...) per distinct set of changes, which also bumps the rows' versions, or a single
+DELETE ... WHERE id IN (...). The change events and tombstones are inserted in the default database, in the same
+transaction on shard 0 and committed right after the shard's on the others (see commit_shard in src/db/shards.py). The
+SELECT gives the per-id outcome and the audit log's before values, doing the job of RETURNING, which SQLAlchemy 1.4
+doesn't support on sqlite. Sports that still have teams aren't deleted, their outcome is a conflict. Patches that change
+nothing on their row aren't written, their outcome is unchanged.
+
+Unlike PUT, the updates aren't conditional on the row versions: a patch applies to whatever version the row is at when
+it is written. It does bump the version, so a conditional PUT still in flight fails rather than overwriting it.
+
+The shards commit one after the other. A shard whose transaction breaks a constraint is rolled back and its ids are
+failed, the shards committed before it keep their outcomes.
+
+sqlite only starts the write transaction at the first write, so rows can be deleted by another request after the
+SELECT. A write's rowcount short of the ids it was given shows that, and the ids are read again inside the transaction,
+where they can't change any more, so rows gone in between are not_found and get no events or audit entries.
+
+No ORM objects are loaded, so the session events that audit single writes don't see these changes. Their audit
+entries are added here, and are queued when the transaction commits like the others.
+"""
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.audit import add_pending, audit_entry
+from src.db.models import utcnow
+from src.db.models.event import DELETED, UPDATED
+from src.db.models.sport import Sport
+from src.db.models.team import Team
+from src.db.models.tombstone import SPORT_ENTITY, TEAM_ENTITY, Tombstone
+from src.db.shards import commit_shard, shard_session, shards
+from src.events import record_events
+
+logger = logging.getLogger(__name__)
+
+UPDATED_STATUS = 'updated'
+UNCHANGED = 'unchanged'
+DELETED_STATUS = 'deleted'
+NOT_FOUND = 'not_found'
+CONFLICT = 'conflict'
+FAILED = 'failed'
+
+ENTITIES = {Sport: SPORT_ENTITY, Team: TEAM_ENTITY}
+
+
+def _columns(model) -> list:
+    return [getattr(model, field) for field in model.__fields__]
+
+
+async def _select_rows(session: AsyncSession, model, ids: Iterable[int]) -> Dict[int, dict]:
+    rows = await session.execute(select(*_columns(model)).where(model.id.in_(ids)))
+    return {row.id: dict(row._mapping) for row in rows}
+
+
+async def _existing_ids(session: AsyncSession, model, ids: Iterable[int]) -> set:
+    return set((await session.execute(select(model.id).where(model.id.in_(ids)))).scalars())
+
+
+def _by_shard(ids: Iterable[int]) -> Dict[int, List[int]]:
+    ids_by_shard = defaultdict(list)
+    for id in ids:
+        ids_by_shard[shards.for_id(id)].append(id)
+    return ids_by_shard
+
+
+async def _update_shard(
+    session: AsyncSession, default_session: AsyncSession, model, patches: List[dict]
+) -> Dict[int, str]:
+    entity = ENTITIES[model]
+    rows = await _select_rows(session, model, (patch['id'] for patch in patches))
+
+    # Only the fields that differ from the row, a patch without any is left out of the writes
+    changes_by_id: Dict[int, dict] = {
+        patch['id']: {
+            field: value for field, value in patch.items() if field != 'id' and rows[patch['id']][field] != value
+        }
+        for patch in patches if patch['id'] in rows
+    }
+
+    # One UPDATE for each distinct set of changes, with all the ids it applies to
+    groups: Dict[Tuple, List[int]] = defaultdict(list)
+    for id, changes in changes_by_id.items():
+        if changes:
+            groups[tuple(sorted(changes.items()))].append(id)
+    gone = set()
+    for changes, ids in groups.items():
+        result = await session.execute(
+            update(model).where(model.id.in_(ids)).values({**dict(changes), 'version': model.version + 1})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(ids):
+            gone |= set(ids) - await _existing_ids(session, model, ids)
+
+    updated = [id for id, changes in changes_by_id.items() if changes and id not in gone]
+    await record_events(default_session, UPDATED, entity, updated)
+    add_pending(session.sync_session, [
+        audit_entry(entity, id, UPDATED, rows[id], {**rows[id], **changes_by_id[id]}) for id in updated
+    ])
+
+    await commit_shard(session, default_session)
+    outcomes = {patch['id']: NOT_FOUND for patch in patches}
+    outcomes.update((id, UNCHANGED) for id, changes in changes_by_id.items() if not changes)
+    outcomes.update((id, UPDATED_STATUS) for id in updated)
+    return outcomes
+
+
+async def _delete_shard(
+    session: AsyncSession, default_session: AsyncSession, model, ids: List[int]
+) -> Dict[int, str]:
+    entity = ENTITIES[model]
+    rows = await _select_rows(session, model, ids)
+
+    conflicts = set()
+    if model is Sport and rows:
+        # team.sport_id isn't nullable, a sport can't be deleted while it has teams
+        conflicts = set((await session.execute(
+            select(Team.sport_id).where(Team.sport_id.in_(list(rows))).distinct()
+        )).scalars())
+    deleted = [id for id in rows if id not in conflicts]
+
+    if deleted:
+        # Bumping the versions first takes the write lock with a rowcount to check, after the DELETE the ids it missed
+        # couldn't be told apart. It also fails any conditional PUT of the rows still in flight.
+        bumped = await session.execute(
+            update(model).where(model.id.in_(deleted)).values(version=model.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if bumped.rowcount != len(deleted):
+            existing = await _existing_ids(session, model, deleted)
+            deleted = [id for id in deleted if id in existing]
+        await session.execute(delete(model).where(model.id.in_(deleted)).execution_options(synchronize_session=False))
+        now = utcnow()
+        await default_session.execute(insert(Tombstone), [
+            {'entity': entity, 'entity_id': id, 'deleted_at': now} for id in deleted
+        ])
+        await record_events(default_session, DELETED, entity, deleted)
+        add_pending(session.sync_session, [audit_entry(entity, id, DELETED, rows[id], None) for id in deleted])
+
+    await commit_shard(session, default_session)
+    deleted = set(deleted)
+    return {id: CONFLICT if id in conflicts else DELETED_STATUS if id in deleted else NOT_FOUND for id in ids}
+
+
+async def _each_shard(
+    session: AsyncSession, ids: Iterable[int], write: Callable[[AsyncSession, List[int]], Awaitable[Dict[int, str]]]
+) -> Dict[int, str]:
+    """Run write with each shard's session and ids in turn, the ids of a shard whose write breaks a constraint fail."""
+    outcomes = {}
+    for shard, shard_ids in _by_shard(ids).items():
+        async with shard_session(shard, session) as shard_db:
+            try:
+                outcomes.update(await write(shard_db, shard_ids))
+            except IntegrityError as e:
+                logger.warning(f'bulk write of {shard_ids} on shard {shard} failed: {e.orig}')
+                await shard_db.rollback()
+                if shard_db is not session:
+                    await session.rollback()
+                outcomes.update((id, FAILED) for id in shard_ids)
+    return outcomes
+
+
+async def bulk_update(session: AsyncSession, model, patches: List[dict]) -> Dict[int, str]:
+    """Apply patches, dicts of an id and the fields to change, returning each id's outcome."""
+    patches_by_id = {patch['id']: patch for patch in patches}
+
+    async def write(shard_db: AsyncSession, ids: List[int]) -> Dict[int, str]:
+        return await _update_shard(shard_db, session, model, [patches_by_id[id] for id in ids])
+
+    return await _each_shard(session, patches_by_id, write)
+
+
+async def bulk_delete(session: AsyncSession, model, ids: List[int]) -> Dict[int, str]:
+    """Delete the ids, returning each id's outcome."""
+
+    async def write(shard_db: AsyncSession, shard_ids: List[int]) -> Dict[int, str]:
+        return await _delete_shard(shard_db, session, model, shard_ids)
+
+    return await _each_shard(session, dict.fromkeys(ids), write)
+
+
+def shard_move(model, patch: dict) -> Optional[str]:
+    """Why the patch would move the row to another shard, None if it doesn't."""
+    shard = shards.for_id(patch['id'])
+    if model is Sport and patch.get('league') is not None and shards.for_league(patch['league']) != shard:
+        return f"Moving sport id={patch['id']} to league {patch['league'].value} would move it between shards"
+    if model is Team and patch.get('sport_id') is not None and shards.for_id(patch['sport_id']) != shard:
+        return f"Moving team id={patch['id']} to sport id={patch['sport_id']} would move it between shards"
+    return None
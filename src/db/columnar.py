@@ -0,0 +1,165 @@
+"""
+Columnar (Arrow IPC / Parquet) exports of the catalog tables for analytics.
+
+Rows are read in batches of COLUMNAR_BATCH_SIZE from a server side cursor and each batch becomes one Arrow record batch,
+so the export never holds more than one batch of python rows. The columns match SportRead and TeamRead. Readers of the
+Arrow IPC stream can map the column buffers without copying or parsing anything.
+
+pyarrow is imported on use only, it is heavy and only needed by the exports.
+"""
+import io
+import os
+from enum import Enum
+from typing import AsyncIterator, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+from src.db.models.sport import Sport
+from src.db.models.team import Team
+
+COLUMNAR_BATCH_SIZE = int(os.environ.get('COLUMNAR_BATCH_SIZE', 10000))
+
+
+class ColumnarFormat(str, Enum):
+    ARROW = 'arrow'
+    PARQUET = 'parquet'
+
+
+MEDIA_TYPES = {
+    ColumnarFormat.ARROW: 'application/vnd.apache.arrow.stream',
+    ColumnarFormat.PARQUET: 'application/vnd.apache.parquet',
+}
+
+
+def sport_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field('name', pa.string(), nullable=False),
+        pa.field('league', pa.dictionary(pa.int8(), pa.string()), nullable=False),
+        pa.field('id', pa.int64(), nullable=False),
+    ])
+
+
+def team_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field('name', pa.string(), nullable=False),
+        pa.field('city', pa.string(), nullable=False),
+        pa.field('sport_id', pa.int64()),
+        pa.field('id', pa.int64(), nullable=False),
+    ])
+
+
+def sport_query() -> Select:
+    return select(Sport.name, Sport.league, Sport.id).order_by(Sport.id)
+
+
+def team_query() -> Select:
+    return select(Team.name, Team.city, Team.sport_id, Team.id).order_by(Team.id)
+
+
+# table name: (query, schema)
+TABLES: Dict[str, tuple] = {
+    'sport': (sport_query, sport_schema),
+    'team': (team_query, team_schema),
+}
+
+
+def to_record_batch(rows: List[tuple], schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_dictionary(field.type):
+            values = [v.value if hasattr(v, 'value') else v for v in values]
+            arrays.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+async def record_batches(conns: AsyncIterator, table: str, batch_size: int = None) -> AsyncIterator:
+    """
+    Yield the table as Arrow record batches, read from each of conns in turn, AsyncConnections or AsyncSessions (see
+    shard_connections and shard_sessions in src/db/shards.py).
+    """
+    query, schema = TABLES[table]
+    schema = schema()
+    batch_size = batch_size or COLUMNAR_BATCH_SIZE
+
+    async for conn in conns:
+        result = await conn.stream(query().execution_options(yield_per=batch_size))
+        async for rows in result.partitions(batch_size):
+            yield to_record_batch(rows, schema)
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain, for streaming a writer's output."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buffer += b
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def stream_table(
+    conns: AsyncIterator, table: str, format: ColumnarFormat = ColumnarFormat.ARROW, batch_size: int = None
+) -> AsyncIterator[bytes]:
+    """
+    Yield the table encoded as an Arrow IPC stream or a Parquet file. Arrow output is flushed after every batch, Parquet
+    is flushed per row group (one per batch) with the footer last.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = TABLES[table][1]()
+    sink = _DrainableSink()
+
+    if format == ColumnarFormat.ARROW:
+        writer = pa.ipc.new_stream(sink, schema)
+    elif format == ColumnarFormat.PARQUET:
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        raise ValueError(f'Unknown columnar format {format}')
+
+    try:
+        async for batch in record_batches(conns, table, batch_size):
+            if format == ColumnarFormat.ARROW:
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+
+    data = sink.drain()
+    if data:
+        yield data
+
+
+async def write_table(
+    conns: AsyncIterator, table: str, path: str, format: ColumnarFormat = ColumnarFormat.ARROW, batch_size: int = None
+) -> int:
+    """Write the table to the file at path, returning the number of bytes written."""
+    size = 0
+    with open(path, 'wb') as f:
+        async for data in stream_table(conns, table, format, batch_size):
+            f.write(data)
+            size += len(data)
+    return size
@@ -1,22 +1,62 @@
 import os
+from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel
 
+from src.db.admission import AdmissionQueue, Overloaded
+from src.db.interrupt import track_session
+from src.response_exception import HTTPServiceUnavailable
+
 DATABASE_URL = os.environ.get('DATABASE_URL')
 ECHO_DB_QUERIES = bool(os.environ.get('ECHO_DB_QUERIES', 0))
+# Connections each worker keeps open. 0 opens a new connection per session (sqlalchemy's default for sqlite files).
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+# Sessions each worker runs at once, defaulting to the connections the pool can hand out as more would only wait inside
+# the pool. Past that requests queue, up to DB_QUEUE_SIZE of them for DB_QUEUE_TIMEOUT seconds, then get a 503.
+DB_CONCURRENCY = int(os.environ.get('DB_CONCURRENCY', (DB_POOL_SIZE + DB_MAX_OVERFLOW) or 15))
+DB_QUEUE_SIZE = int(os.environ.get('DB_QUEUE_SIZE', 100))
+DB_QUEUE_TIMEOUT = float(os.environ.get('DB_QUEUE_TIMEOUT', 2))
+
+# Created on first use (normally the app's startup event) rather than at import time. See get_engine.
+engine: Optional[AsyncEngine] = None
+_async_session = None
+admission = AdmissionQueue(DB_CONCURRENCY, DB_QUEUE_SIZE, DB_QUEUE_TIMEOUT)
+
+
+def create_async_db_engine(db_url, echo=False, pool_size=0, max_overflow=0) -> AsyncEngine:
+    pool_kwargs = {}
+    if pool_size:
+        pool_kwargs = dict(poolclass=AsyncAdaptedQueuePool, pool_size=pool_size, max_overflow=max_overflow)
 
+    return create_async_engine(
+        db_url, connect_args={'check_same_thread': False}, echo=echo, future=True, **pool_kwargs
+    )
 
-def create_async_db_engine(db_url, echo=False) -> AsyncEngine:
-    return create_async_engine(db_url, connect_args={'check_same_thread': False}, echo=echo, future=True)
 
+def get_engine() -> AsyncEngine:
+    """Return the app's engine, creating it and its session factory on the first call."""
+    global engine, _async_session
+    if engine is None:
+        engine = create_async_db_engine(DATABASE_URL, ECHO_DB_QUERIES, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+        _async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, future=True)
+    return engine
 
-engine = create_async_db_engine(DATABASE_URL, ECHO_DB_QUERIES)
+
+async def dispose_engine() -> None:
+    """Close the app's engine and all its pooled connections. The next get_engine call makes a new one."""
+    global engine, _async_session
+    if engine is not None:
+        await engine.dispose()
+    engine = None
+    _async_session = None
 
 
 async def init_db():
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
@@ -31,9 +71,18 @@ async def reset_db_with_engine(engine):
 
 
 async def get_session() -> AsyncSession:
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, future=True)
-    async with async_session() as session:
-        yield session
+    try:
+        await admission.acquire()
+    except Overloaded:
+        raise HTTPServiceUnavailable('Server busy', headers={'Retry-After': '1'})
+
+    try:
+        get_engine()
+        async with _async_session() as session:
+            track_session(session)
+            yield session
+    finally:
+        admission.release()
 
 
 def get_session_with_engine(engine) -> AsyncSession:
@@ -0,0 +1,38 @@
+"""
+Interrupting the queries of a request that is being abandoned.
+
+Cancelling a coroutine that awaits an aiosqlite query doesn't stop the query, it keeps running in the connection's
+thread, and closing the session queues behind it. So before a request's task is cancelled the sqlite connections of the
+sessions it opened (tracked by get_session) are found, and right after the cancel they are interrupted, which makes
+sqlite abandon the running statement. The connection then closes promptly and the pool replaces it.
+"""
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# The sessions opened by the current request, set by the deadline route handler.
+request_sessions: ContextVar[Optional[List[AsyncSession]]] = ContextVar('request_sessions', default=None)
+
+
+def track_session(session: AsyncSession) -> None:
+    sessions = request_sessions.get()
+    if sessions is not None:
+        sessions.append(session)
+
+
+async def session_interrupters(sessions: List[AsyncSession]) -> List[Callable[[], None]]:
+    """Functions interrupting the running query of each session that has a connection."""
+    interrupters = []
+    for session in sessions:
+        # Without a transaction the session has no connection, and asking for one would check one out.
+        if not session.in_transaction():
+            continue
+        connection = await session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        # aiosqlite's own interrupt() is run on the connection thread, behind the query it should interrupt. The
+        # sqlite3 connection's may be called from any thread.
+        sqlite_connection = getattr(driver_connection, '_conn', None)
+        if sqlite_connection is not None:
+            interrupters.append(sqlite_connection.interrupt)
+    return interrupters
@@ -1,2 +1,9 @@
+from datetime import datetime
+
+
 def normalize_str(value: str) -> str:
     return ' '.join(word.strip() for word in value.strip().split(' ') if word).lower()
+
+
+def utcnow() -> datetime:
+    return datetime.utcnow()
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, Column, DateTime, Index, String
+from sqlmodel import SQLModel, Field
+
+from src.db.models import utcnow
+
+
+class AuditLog(SQLModel, table=True):
+    """
+    The before and after values of a sport or team created, updated or deleted, and who by. Captured by the session
+    events in src/audit.py and written in batches after the change is committed.
+    """
+    __tablename__ = 'audit_log'
+    __table_args__ = (
+        # GET /audit filters by entity and entity id, newest (highest id) first.
+        Index('ix_audit_log_entity_entity_id_id', 'entity', 'entity_id', 'id'),
+    )
+
+    id: int = Field(default=None, primary_key=True, nullable=False)
+    entity: str = Field(sa_column=Column('entity', String, nullable=False))
+    entity_id: int
+    op: str = Field(sa_column=Column('op', String, nullable=False))
+    actor: Optional[str] = Field(default=None, sa_column=Column('actor', String, nullable=True, index=True))
+    before: Optional[dict] = Field(default=None, sa_column=Column('before', JSON(none_as_null=True), nullable=True))
+    after: Optional[dict] = Field(default=None, sa_column=Column('after', JSON(none_as_null=True), nullable=True))
+    changed_at: datetime = Field(
+        default_factory=utcnow,
+        # The column default covers the Core inserts of the audit writer
+        sa_column=Column('changed_at', DateTime, nullable=False, index=True, default=utcnow),
+    )
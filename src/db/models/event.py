@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+from sqlmodel import SQLModel, Field
+
+from src.db.models import utcnow
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+
+class CatalogEvent(SQLModel, table=True):
+    """
+    A create, update or delete of a sport or team, written by the write routes in the same transaction as the change.
+    Every worker polls this table by id to fan the events out to its GET /events subscribers.
+    """
+    __tablename__ = 'catalog_event'
+
+    id: int = Field(default=None, primary_key=True, nullable=False)
+    entity: str = Field(sa_column=Column('entity', String, nullable=False))
+    entity_id: int
+    op: str = Field(sa_column=Column('op', String, nullable=False))
+    created_at: datetime = Field(
+        default_factory=utcnow, sa_column=Column('created_at', DateTime, nullable=False, index=True)
+    )
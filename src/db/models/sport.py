@@ -2,22 +2,34 @@ from typing import List
 
 from pydantic import validator
 
-from sqlalchemy import Column, Enum, String, UniqueConstraint
+from sqlalchemy import Column, DateTime, Enum, Integer, String, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 
-from src.db.models import normalize_str
+from src.db.models import normalize_str, utcnow
 from src.db.schema.league import LeagueEnum
 
 
 class SportBase(SQLModel):
-    name: str = Field(sa_column=Column('name', String, nullable=False, index=True))
+    # Not indexed on its own, sport_name_league_unique_idx leads with it
+    name: str = Field(sa_column=Column('name', String, nullable=False))
     league: LeagueEnum = Field(sa_column=Column(Enum(LeagueEnum), nullable=False, index=True, unique=True))
 
 
+# Optimistic concurrency: the ORM updates a sport with UPDATE ... WHERE id = ? AND version = ? and bumps the version,
+# failing with StaleDataError if another writer got there first. Its ETag on PUT /sports/{sport_id}.
+sport_version = Column('version', Integer, nullable=False, server_default='1')
+
+
 class Sport(SportBase, table=True):
     __table_args__ = (
         UniqueConstraint('name', 'league', name='sport_name_league_unique_idx'),
+        # When the row last changed, by the writing worker's clock so not a sync cursor (GET /changes follows the
+        # catalog_event ids). Declared as a plain column rather than a field so it stays out of the pydantic models and
+        # every response.
+        Column('updated_at', DateTime, nullable=False, index=True, default=utcnow, onupdate=utcnow),
+        sport_version,
     )
+    __mapper_args__ = {'version_id_col': sport_version}
 
     id: int = Field(default=None, primary_key=True, nullable=False)
     teams: List["Team"] = Relationship(back_populates='sport')
@@ -2,16 +2,17 @@ from typing import Optional
 
 from pydantic import validator
 
-from sqlalchemy import Column, String, UniqueConstraint
+from sqlalchemy import Column, DateTime, Integer, String, UniqueConstraint
 from sqlmodel import SQLModel, Field, Index, Relationship
 
-from src.db.models import normalize_str
+from src.db.models import normalize_str, utcnow
 
 from src.db.models.sport import Sport
 
 
 class TeamBase(SQLModel):
-    name: str = Field(sa_column=Column('name', String, nullable=False, index=True, unique=False))
+    # Not indexed on its own, lookups by name use team_name_city_sport_unique_idx, which covers the team columns
+    name: str = Field(sa_column=Column('name', String, nullable=False))
     city: str
     sport_id: Optional[int] = Field(foreign_key='sport.id')
 
@@ -21,10 +22,20 @@ class TeamCreate(TeamBase):
     _normalize_city = validator('city', allow_reuse=True)(normalize_str)
 
 
+# Optimistic concurrency, see sport_version.
+team_version = Column('version', Integer, nullable=False, server_default='1')
+
+
 class Team(TeamBase, table=True):
     __table_args__ = (
         UniqueConstraint('name', 'city', 'sport_id', name='team_name_city_sport_unique_idx'),
+        # When the row last changed, see Sport.
+        Column('updated_at', DateTime, nullable=False, index=True, default=utcnow, onupdate=utcnow),
+        team_version,
+        # A sport's teams in id order without touching the table, for the sport routes' join
+        Index('ix_team_sport_id_id_name_city', 'sport_id', 'id', 'name', 'city'),
     )
+    __mapper_args__ = {'version_id_col': team_version}
 
     id: int = Field(default=None, primary_key=True, nullable=False)
     sport: Optional[Sport] = Relationship(back_populates='teams')
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+from sqlmodel import SQLModel, Field
+
+from src.db.models import utcnow
+
+
+class Tombstone(SQLModel, table=True):
+    """Record of a deleted sport or team, so GET /changes can report deletions."""
+    id: int = Field(default=None, primary_key=True, nullable=False)
+    entity: str = Field(sa_column=Column('entity', String, nullable=False))
+    entity_id: int
+    deleted_at: datetime = Field(
+        default_factory=utcnow, sa_column=Column('deleted_at', DateTime, nullable=False, index=True)
+    )
+
+
+SPORT_ENTITY = 'sport'
+TEAM_ENTITY = 'team'
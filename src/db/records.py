@@ -0,0 +1,63 @@
+"""
+Lightweight read-only records for the sport/team catalog.
+
+Plain __slots__ classes rather than ORM or pydantic models, for catalog data that is loaded once and served many
+times. They have no identity map, no change tracking and no per-instance __dict__. The dict methods return exactly the
+json shapes of the matching read models (SportRead, SportReadWithTeams, TeamRead, TeamReadWithSport). The row version,
+for checking a PUT's If-Match against a fresh read, is only set on records read from the database.
+"""
+from typing import Optional, Tuple
+
+from src.db.schema.league import LeagueEnum
+
+
+class SportRecord:
+    __slots__ = ('id', 'name', 'league', 'teams', 'version')
+
+    def __init__(
+        self, id: int, name: str, league: LeagueEnum, teams: Tuple['TeamRecord', ...] = (), version: Optional[int] = None
+    ):
+        self.id = id
+        self.name = name
+        self.league = league
+        self.teams = teams
+        self.version = version
+
+    def __repr__(self):
+        return f'SportRecord(id={self.id!r}, name={self.name!r}, league={self.league!r})'
+
+    def dict(self) -> dict:
+        return {'name': self.name, 'league': self.league, 'id': self.id}
+
+    def dict_with_teams(self) -> dict:
+        return {'name': self.name, 'league': self.league, 'id': self.id, 'teams': [t.dict() for t in self.teams]}
+
+
+class TeamRecord:
+    __slots__ = ('id', 'name', 'city', 'sport_id', 'sport', 'version')
+
+    def __init__(
+        self, id: int, name: str, city: str, sport_id: Optional[int], sport: Optional[SportRecord] = None,
+        version: Optional[int] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.city = city
+        self.sport_id = sport_id
+        self.sport = sport
+        self.version = version
+
+    def __repr__(self):
+        return f'TeamRecord(id={self.id!r}, name={self.name!r}, city={self.city!r}, sport_id={self.sport_id!r})'
+
+    def dict(self) -> dict:
+        return {'name': self.name, 'city': self.city, 'sport_id': self.sport_id, 'id': self.id}
+
+    def dict_with_sport(self) -> dict:
+        return {
+            'name': self.name,
+            'city': self.city,
+            'sport_id': self.sport_id,
+            'id': self.id,
+            'sport': self.sport.dict() if self.sport else None,
+        }
@@ -0,0 +1,165 @@
+"""
+Data access for the catalog read routes.
+
+The statements are built once at import with bound parameters for the per-request values. SQLAlchemy memoizes the
+cache key of a statement object, so executing a module level statement goes straight to the compiled form cached on
+the engine, where building it inline costs its construction plus a cache key traversal on every request.
+
+Nothing here loads ORM instances. The queries select plain columns and the nested responses are assembled from the
+rows in one pass into SportRecord / TeamRecord, which the routes render straight to json. That skips ORM instantiation,
+identity map bookkeeping and the read models' validation of every object on the way out.
+
+Reads go through a SingleFlight, so concurrent requests for the same thing on a worker share one query rather than
+each running their own. Waiters never execute anything on their own session, so they don't check out a connection.
+The results are shared between the requests and must be treated as read-only.
+
+The session passed in is for the default database. The reads over the whole catalog fan out to every shard (see
+src/db/shards.py), the others are passed a session on the right shard by the route.
+"""
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models.sport import Sport
+from src.db.models.team import Team
+from src.db.records import SportRecord, TeamRecord
+from src.db.schema.league import LeagueEnum
+from src.db.shards import fan_out
+from src.singleflight import SingleFlight
+
+flights = SingleFlight()
+
+# Sports left joined to their teams, one row per team (or one with null team columns for a sport without teams)
+SPORT_TEAM_ROWS = (
+    select(Sport.id, Sport.name, Sport.league, Sport.version, Team.id, Team.name, Team.city)
+    .join(Team, Team.sport_id == Sport.id, isouter=True)
+    .order_by(Sport.id, Team.id)
+)
+SPORT_TEAM_ROWS_BY_ID = SPORT_TEAM_ROWS.where(Sport.id == bindparam('sport_id'))
+# One league's sport and teams: the sport from the unique league index, its teams from ix_team_sport_id_id_name_city
+SPORT_TEAM_ROWS_BY_LEAGUE = SPORT_TEAM_ROWS.where(Sport.league == bindparam('league'))
+# Teams with their sport's columns, teams without a sport are left out
+TEAM_SPORT_ROWS = (
+    select(Team.id, Team.name, Team.city, Team.sport_id, Team.version, Sport.name, Sport.league)
+    .join(Sport, Team.sport_id == Sport.id)
+    .order_by(Team.id)
+)
+TEAM_SPORT_ROWS_BY_ID = TEAM_SPORT_ROWS.where(Team.id == bindparam('team_id'))
+
+# Flat team rows, the columns of Team / TeamRead
+TEAM_COLUMNS = (Team.name, Team.city, Team.sport_id, Team.id)
+TEAM_ROW_BY_ID = select(*TEAM_COLUMNS).where(Team.id == bindparam('team_id'))
+TEAM_ROWS_BY_NAME = select(*TEAM_COLUMNS).where(Team.name == bindparam('name'))
+TEAM_ROWS = select(*TEAM_COLUMNS).order_by(Team.id)
+
+
+def sports_from_rows(rows: Iterable[tuple]) -> List[SportRecord]:
+    """Assemble sports with their teams from SPORT_TEAM_ROWS rows, which are ordered by sport."""
+    sports = []
+    sport = None
+    for sport_id, name, league, version, team_id, team_name, city in rows:
+        if sport is None or sport.id != sport_id:
+            sport = SportRecord(sport_id, name, league, [], version)
+            sports.append(sport)
+        if team_id is not None:
+            sport.teams.append(TeamRecord(team_id, team_name, city, sport_id))
+    return sports
+
+
+def teams_from_rows(rows: Iterable[tuple]) -> List[TeamRecord]:
+    """Assemble teams with their sport from TEAM_SPORT_ROWS rows, sharing one SportRecord per sport."""
+    sports: Dict[int, SportRecord] = {}
+    teams = []
+    for team_id, name, city, sport_id, version, sport_name, league in rows:
+        sport = sports.get(sport_id)
+        if sport is None:
+            sport = sports[sport_id] = SportRecord(sport_id, sport_name, league)
+        teams.append(TeamRecord(team_id, name, city, sport_id, sport, version))
+    return teams
+
+
+async def _get_shard_sports(session: AsyncSession) -> List[SportRecord]:
+    return sports_from_rows(await session.execute(SPORT_TEAM_ROWS))
+
+
+async def _get_sports(session: AsyncSession) -> List[SportRecord]:
+    # Shard n's ids are all above shard n - 1's, so shard order is id order.
+    return list(chain.from_iterable(await fan_out(session, _get_shard_sports)))
+
+
+async def get_sports(session: AsyncSession) -> List[SportRecord]:
+    return await flights.do(('sports',), _get_sports, session)
+
+
+async def _get_sport(session: AsyncSession, sport_id: int) -> Optional[SportRecord]:
+    sports = sports_from_rows(await session.execute(SPORT_TEAM_ROWS_BY_ID, {'sport_id': sport_id}))
+    return sports[0] if sports else None
+
+
+async def get_sport(session: AsyncSession, sport_id: int, fresh: bool = False) -> Optional[SportRecord]:
+    """fresh reads it on session itself, after anything done on it, rather than sharing a read already in flight."""
+    if fresh:
+        return await _get_sport(session, sport_id)
+    return await flights.do(('sport', sport_id), _get_sport, session, sport_id)
+
+
+async def _get_league(session: AsyncSession, league: LeagueEnum) -> Optional[SportRecord]:
+    sports = sports_from_rows(await session.execute(SPORT_TEAM_ROWS_BY_LEAGUE, {'league': league}))
+    return sports[0] if sports else None
+
+
+async def get_league(session: AsyncSession, league: LeagueEnum) -> Optional[SportRecord]:
+    """The league's sport with its teams, None if no sport has the league."""
+    return await flights.do(('league', league), _get_league, session, league)
+
+
+async def _get_shard_teams(session: AsyncSession) -> List[TeamRecord]:
+    return teams_from_rows(await session.execute(TEAM_SPORT_ROWS))
+
+
+async def _get_teams(session: AsyncSession) -> List[TeamRecord]:
+    return list(chain.from_iterable(await fan_out(session, _get_shard_teams)))
+
+
+async def get_teams(session: AsyncSession) -> List[TeamRecord]:
+    return await flights.do(('teams',), _get_teams, session)
+
+
+async def _get_team(session: AsyncSession, team_id: int) -> Optional[TeamRecord]:
+    teams = teams_from_rows(await session.execute(TEAM_SPORT_ROWS_BY_ID, {'team_id': team_id}))
+    return teams[0] if teams else None
+
+
+async def get_team(session: AsyncSession, team_id: int, fresh: bool = False) -> Optional[TeamRecord]:
+    """fresh as for get_sport."""
+    if fresh:
+        return await _get_team(session, team_id)
+    return await flights.do(('team', team_id), _get_team, session, team_id)
+
+
+async def get_team_row(session: AsyncSession, team_id: int) -> Optional[Row]:
+    """The team's own columns, without its sport."""
+    return (await session.execute(TEAM_ROW_BY_ID, {'team_id': team_id})).first()
+
+
+async def get_team_rows(session: AsyncSession) -> List[Row]:
+    """Every team's own columns, ordered by id."""
+    async def shard_teams(shard_session):
+        return (await shard_session.execute(TEAM_ROWS)).all()
+
+    return list(chain.from_iterable(await fan_out(session, shard_teams)))
+
+
+async def _get_teams_by_name(session: AsyncSession, name: str) -> List[Row]:
+    async def shard_teams(shard_session):
+        return (await shard_session.execute(TEAM_ROWS_BY_NAME, {'name': name})).all()
+
+    return list(chain.from_iterable(await fan_out(session, shard_teams)))
+
+
+async def get_teams_by_name(session: AsyncSession, team_name: str) -> List[Row]:
+    name = team_name.strip().lower()
+    return await flights.do(('teams_by_name', name), _get_teams_by_name, session, name)
@@ -1,5 +1,9 @@
+from datetime import date
 from enum import Enum
+from functools import lru_cache
+from hashlib import blake2b
 from random import choice, choices
+from typing import List, NamedTuple, Optional, Sequence
 
 from pydantic import BaseModel
 
@@ -10,6 +14,13 @@ class Sentiment(str, Enum):
     POSITIVE = 'positive'
 
 
+class SentimentWeights(NamedTuple):
+    """ Relative chances of an answer having each sentiment. """
+    negative: float = 1
+    neutral: float = 1
+    positive: float = 1
+
+
 class Answer(BaseModel):
     text: str
     sentiment: Sentiment
@@ -57,11 +68,58 @@ class AnswerChoices:
         [Answer(text=text, sentiment=Sentiment.POSITIVE) for text in _PHRASES_POSITIVE]
     )
 
-    # TODO: Change this to take weights optional weights for negative, neutral and positive  sentiments
+    _ANSWERS_BY_SENTIMENT = {
+        None: ANSWERS_ANY,
+        Sentiment.NEGATIVE: ANSWERS_NEGATIVE,
+        Sentiment.NEUTRAL: ANSWERS_NEUTRAL,
+        Sentiment.POSITIVE: ANSWERS_POSITIVE,
+    }
+
     @staticmethod
-    def any():
-        """ Returns a random answer with any sentiment. """
-        return choice(AnswerChoices.ANSWERS_ANY)
+    def any(weights: Optional[SentimentWeights] = None):
+        """ Returns a random answer with any sentiment, or with weights the sentiment is picked by its weight. """
+        if weights is None:
+            return choice(AnswerChoices.ANSWERS_ANY)
+        return AnswerChoices.draw(1, weights)[0]
+
+    @staticmethod
+    def draw(k: int, weights: Optional[SentimentWeights] = None, population: Optional[Sequence] = None) -> List:
+        """
+        Returns k random answers from ANSWERS_ANY in a single call to random.choices, weighted by sentiment with
+        weights. population, a sequence in the order of ANSWERS_ANY (their rendered json for example), is drawn from
+        instead when given.
+        """
+        population = AnswerChoices.ANSWERS_ANY if population is None else population
+        if weights is None:
+            return choices(population, k=k)
+        return choices(population, cum_weights=AnswerChoices.cum_weights(weights), k=k)
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def cum_weights(weights: SentimentWeights) -> List[float]:
+        """ Cumulative weights over ANSWERS_ANY giving each sentiment its weight's share, split evenly between its
+        answers. """
+        if min(weights) < 0 or sum(weights) <= 0:
+            raise ValueError(f'Sentiment weights must not be negative and must not all be 0, got {weights}')
+
+        per_answer = (
+            [weights.negative / len(AnswerChoices.ANSWERS_NEGATIVE)] * len(AnswerChoices.ANSWERS_NEGATIVE) +
+            [weights.neutral / len(AnswerChoices.ANSWERS_NEUTRAL)] * len(AnswerChoices.ANSWERS_NEUTRAL) +
+            [weights.positive / len(AnswerChoices.ANSWERS_POSITIVE)] * len(AnswerChoices.ANSWERS_POSITIVE)
+        )
+        total, cum_weights = 0, []
+        for weight in per_answer:
+            total += weight
+            cum_weights.append(total)
+        return cum_weights
+
+    @staticmethod
+    def daily(team_id: int, day: date, sentiment: Optional[Sentiment] = None) -> Answer:
+        """ Returns the team's answer of the day, picked by a hash of (team_id, day, sentiment) so it is the same
+        every time it is asked for. """
+        answers = AnswerChoices._ANSWERS_BY_SENTIMENT[sentiment]
+        key = f'{team_id}:{day.isoformat()}:{sentiment.value if sentiment else "any"}'.encode()
+        return answers[int.from_bytes(blake2b(key, digest_size=8).digest(), 'little') % len(answers)]
 
     @staticmethod
     def negative():
@@ -77,3 +135,17 @@ class AnswerChoices:
     def positive():
         """ Always returns an answer with a positive sentiment. """
         return choice(AnswerChoices.ANSWERS_POSITIVE)
+
+
+SENTIMENT_CHOICES_CALLABLE_MAP = {
+    Sentiment.NEGATIVE: AnswerChoices.negative,
+    Sentiment.NEUTRAL: AnswerChoices.neutral,
+    Sentiment.POSITIVE: AnswerChoices.positive,
+}
+
+# A sentiment as weights, answers drawn with them always have that sentiment.
+SENTIMENT_WEIGHTS = {
+    Sentiment.NEGATIVE: SentimentWeights(1, 0, 0),
+    Sentiment.NEUTRAL: SentimentWeights(0, 1, 0),
+    Sentiment.POSITIVE: SentimentWeights(0, 0, 1),
+}
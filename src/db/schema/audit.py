@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class AuditEntry(BaseModel):
+    id: int
+    entity: str
+    entity_id: int
+    op: str
+    actor: Optional[str]
+    before: Optional[dict]
+    after: Optional[dict]
+    changed_at: datetime
+
+
+class AuditPage(BaseModel):
+    entries: List[AuditEntry] = []
+    # Pass back as `before_id` for the next, older, page. None on the last page.
+    next_before_id: Optional[int]
@@ -0,0 +1,61 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, conlist, validator
+
+from src.db.models import normalize_str
+from src.db.schema.league import LeagueEnum
+
+# Ids in one bulk request, well under sqlite's limit on bound parameters
+BULK_MAX_IDS = 500
+
+
+def not_null(value):
+    # Optional only so it can be left out, the columns aren't nullable
+    if value is None:
+        raise ValueError('none is not an allowed value')
+    return value
+
+
+class TeamPatch(BaseModel):
+    """Changes to one team, only the fields given are changed."""
+    id: int
+    name: Optional[str]
+    city: Optional[str]
+    sport_id: Optional[int]
+
+    _not_null = validator('name', 'city', pre=True, allow_reuse=True)(not_null)
+    _normalize_name = validator('name', allow_reuse=True)(normalize_str)
+    _normalize_city = validator('city', allow_reuse=True)(normalize_str)
+
+
+class SportPatch(BaseModel):
+    """Changes to one sport, only the fields given are changed."""
+    id: int
+    name: Optional[str]
+    league: Optional[LeagueEnum]
+
+    _not_null = validator('name', 'league', pre=True, allow_reuse=True)(not_null)
+    _normalize_name = validator('name', allow_reuse=True)(normalize_str)
+
+
+class BulkTeamUpdate(BaseModel):
+    updates: conlist(TeamPatch, min_items=1, max_items=BULK_MAX_IDS)
+
+
+class BulkSportUpdate(BaseModel):
+    updates: conlist(SportPatch, min_items=1, max_items=BULK_MAX_IDS)
+
+
+class BulkDelete(BaseModel):
+    ids: conlist(int, min_items=1, max_items=BULK_MAX_IDS)
+
+
+class BulkOutcome(BaseModel):
+    id: int
+    # updated, unchanged for a patch that changes nothing, deleted, not_found, conflict for a sport that still has
+    # teams, or failed when its shard's transaction broke a constraint
+    status: str
+
+
+class BulkResult(BaseModel):
+    results: List[BulkOutcome] = []
@@ -0,0 +1,19 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from src.db.models.sport import SportRead
+from src.db.models.team import TeamRead
+
+
+class DeletedIds(BaseModel):
+    sports: List[int] = []
+    teams: List[int] = []
+
+
+class CatalogChanges(BaseModel):
+    # Pass back as `since` on the next call, the id of the last change event covered, 0 before the first.
+    cursor: int
+    sports: List[SportRead] = []
+    teams: List[TeamRead] = []
+    deleted: DeletedIds = DeletedIds()
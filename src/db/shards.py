@@ -0,0 +1,186 @@
+"""
+Sharding the catalog by league.
+
+DATABASE_SHARDS moves leagues out of the default database (DATABASE_URL) into databases of their own:
+
+    DATABASE_SHARDS='NHL,AHL=sqlite+aiosqlite:///hockey.db;MLB=sqlite+aiosqlite:///baseball.db'
+
+Leagues not listed stay in the default database, shard 0. Each shard has the full schema, `alembic upgrade head`
+migrates them all.
+
+Ids stay unique across shards: shard n hands out ids from n << SHARD_ID_BITS up, so the shard of any sport or team
+follows from its id and the id routes go straight to it. Shard 0 keeps the ids it has. League and id scoped routes use
+one shard, the routes over the whole catalog query every shard concurrently and merge.
+
+Only the sport and team tables are sharded. The change events and tombstones of every shard's writes are recorded in the
+default database, so the change feeds (/changes, /events) and the daily predictions' invalidation see them all from one
+place. They are committed right after the shard's own transaction (see commit_shard). The exports and the snapshot
+builds read every shard in turn.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Depends
+from sqlalchemy import func, select
+from sqlalchemy.sql.expression import ScalarSelect
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.db.db import (
+    DB_MAX_OVERFLOW, DB_POOL_SIZE, ECHO_DB_QUERIES, create_async_db_engine, get_engine, get_session,
+)
+from src.db.interrupt import track_session
+from src.db.schema.league import LeagueEnum
+
+SHARD_ID_BITS = 40
+
+
+def parse_shards(value: str) -> Dict[LeagueEnum, str]:
+    """'NHL,AHL=url;MLB=url' -> {LeagueEnum.NHL: url, LeagueEnum.AHL: url, LeagueEnum.MLB: url}"""
+    league_urls = {}
+    for item in filter(None, (item.strip() for item in value.split(';'))):
+        leagues, url = item.split('=', 1)
+        for league in leagues.split(','):
+            league_urls[LeagueEnum(league.strip().upper())] = url.strip()
+    return league_urls
+
+
+class ShardMap:
+
+    def __init__(self, league_urls: Dict[LeagueEnum, str]):
+        # Shard 0, the default database, has no url here, it is DATABASE_URL.
+        self.urls: List[Optional[str]] = [None]
+        self.league_shards: Dict[LeagueEnum, int] = {}
+        for league, url in league_urls.items():
+            if url not in self.urls:
+                self.urls.append(url)
+            self.league_shards[league] = self.urls.index(url)
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.urls) > 1
+
+    def __len__(self):
+        return len(self.urls)
+
+    def for_league(self, league: LeagueEnum) -> int:
+        return self.league_shards.get(league, 0)
+
+    def for_id(self, id: int) -> int:
+        shard = id >> SHARD_ID_BITS
+        # Ids beyond the configured shards can't exist, looking them up in the default database finds nothing.
+        return shard if 0 < shard < len(self.urls) else 0
+
+
+shards = ShardMap(parse_shards(os.environ.get('DATABASE_SHARDS', '')))
+
+_engines: Dict[int, AsyncEngine] = {}
+_sessionmakers: Dict[int, sessionmaker] = {}
+
+
+def get_shard_engine(shard: int) -> AsyncEngine:
+    """The engine of a shard, shard 0 is the app's engine. Created on first use, like get_engine."""
+    if shard == 0:
+        return get_engine()
+    if shard not in _engines:
+        _engines[shard] = create_async_db_engine(shards.urls[shard], ECHO_DB_QUERIES, DB_POOL_SIZE, DB_MAX_OVERFLOW)
+        _sessionmakers[shard] = sessionmaker(
+            _engines[shard], class_=AsyncSession, expire_on_commit=False, future=True
+        )
+    return _engines[shard]
+
+
+async def dispose_shard_engines() -> None:
+    for engine in _engines.values():
+        await engine.dispose()
+    _engines.clear()
+    _sessionmakers.clear()
+
+
+@asynccontextmanager
+async def shard_session(shard: int, default_session: AsyncSession):
+    """A session on the shard. For shard 0 that is default_session, the request's get_session session."""
+    if shard == 0:
+        yield default_session
+        return
+
+    get_shard_engine(shard)
+    async with _sessionmakers[shard]() as session:
+        track_session(session)
+        yield session
+
+
+async def fan_out(default_session: AsyncSession, fn: Callable[[AsyncSession], Awaitable]) -> List:
+    """Run fn with a session on every shard concurrently, returning the results in shard order."""
+    if not shards.enabled:
+        return [await fn(default_session)]
+
+    async def run(shard):
+        async with shard_session(shard, default_session) as session:
+            return await fn(session)
+
+    return await asyncio.gather(*(run(shard) for shard in range(len(shards))))
+
+
+async def shard_sessions(default_session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """A session on every shard in turn, for the reads that stream the whole catalog."""
+    for shard in range(len(shards)):
+        async with shard_session(shard, default_session) as session:
+            yield session
+
+
+async def shard_connections(default_engine: AsyncEngine) -> AsyncIterator[AsyncConnection]:
+    """A connection to every shard in turn, shard 0 from default_engine. For the exports and snapshot builds."""
+    for shard in range(len(shards)):
+        async with (get_shard_engine(shard) if shard else default_engine).connect() as conn:
+            yield conn
+
+
+async def commit_shard(session: AsyncSession, default_session: AsyncSession) -> None:
+    """
+    Commit a write on a shard's session, then the change events and tombstones recorded for it on default_session.
+
+    On shard 0 they are the same session and commit together. On the other shards the events commit after the change,
+    so a reader that has seen an event always finds the change in place. A failure between the two commits loses the
+    events, the change itself stays.
+    """
+    await session.commit()
+    if session is not default_session:
+        await default_session.commit()
+
+
+def next_id(model, shard: int) -> Optional[ScalarSelect]:
+    """
+    The id for a new row of model on the shard, None on shard 0 where the database assigns it.
+
+    The id is a subquery for the INSERT to evaluate rather than a value read beforehand. A write statement takes
+    sqlite's write lock before it runs, so concurrent creates on a shard each see the others' rows and get distinct
+    ids. The ORM reads the id back from the cursor's lastrowid.
+    """
+    if shard == 0:
+        return None
+    first_id = shard << SHARD_ID_BITS
+    return (
+        select(func.coalesce(func.max(model.id), first_id) + 1)
+        .where(model.id >= first_id, model.id < (shard + 1) << SHARD_ID_BITS)
+        .scalar_subquery()
+    )
+
+
+# Dependencies giving id and league scoped routes a session on the right shard.
+
+async def sport_session(sport_id: int, session: AsyncSession = Depends(get_session)) -> AsyncSession:
+    async with shard_session(shards.for_id(sport_id), session) as shard:
+        yield shard
+
+
+async def team_session(team_id: int, session: AsyncSession = Depends(get_session)) -> AsyncSession:
+    async with shard_session(shards.for_id(team_id), session) as shard:
+        yield shard
+
+
+async def league_session(league: LeagueEnum, session: AsyncSession = Depends(get_session)) -> AsyncSession:
+    async with shard_session(shards.for_league(league), session) as shard:
+        yield shard
@@ -0,0 +1,158 @@
+"""
+Read-only snapshot of the whole sport/team catalog, held in memory by each worker.
+
+With CATALOG_SNAPSHOT=1 the catalog GET routes are answered from the current snapshot without a db session (see
+src/routers/snapshot.py). With CATALOG_ARTIFACT the current snapshot is a memory mapped CatalogArtifact instead (see
+src/db/artifact.py). A snapshot is never modified after it is built, a reload builds a new one and swaps it in
+with a single assignment, so requests in flight keep reading the snapshot they started with. The snapshot routes read
+it inside reading(), which lets a swapped out CatalogArtifact unmap its file once the last of them is done.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.db.models.sport import Sport
+from src.db.models.team import Team
+from src.db.records import SportRecord, TeamRecord
+from src.db.schema.league import LeagueEnum
+from src.db.shards import shard_connections
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SNAPSHOT = bool(int(os.environ.get('CATALOG_SNAPSHOT', 0)))
+# Path of a compiled catalog artifact (buildcatalog.py) to serve the snapshot routes from instead of the db.
+CATALOG_ARTIFACT = os.environ.get('CATALOG_ARTIFACT')
+# Seconds between checks of the sqlite file's (or the artifact's) mtime for changes, 0 disables watching.
+CATALOG_SNAPSHOT_WATCH_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_WATCH_SECONDS', 0))
+# Reload the snapshot when the worker receives SIGHUP.
+CATALOG_SNAPSHOT_RELOAD_ON_SIGHUP = bool(int(os.environ.get('CATALOG_SNAPSHOT_RELOAD_ON_SIGHUP', 0)))
+
+
+def render_json(content) -> bytes:
+    # Same encoding as starlette's JSONResponse.
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+
+class CatalogSnapshot:
+    __slots__ = (
+        'sports', 'teams', '_sports_by_id', '_teams_by_id', '_teams_by_name', '_sports_by_league', 'sports_json',
+        'teams_json',
+    )
+
+    def __init__(self, sports: Tuple[SportRecord, ...], teams: Tuple[TeamRecord, ...]):
+        self.sports = sports
+        self.teams = teams
+        # Dicts, the ids of sharded leagues start at shard << SHARD_ID_BITS (see src/db/shards.py)
+        self._sports_by_id: Dict[int, SportRecord] = {sport.id: sport for sport in sports}
+        self._teams_by_id: Dict[int, TeamRecord] = {team.id: team for team in teams}
+
+        teams_by_name: Dict[str, Tuple[TeamRecord, ...]] = {}
+        for team in teams:
+            teams_by_name[team.name] = teams_by_name.get(team.name, ()) + (team,)
+        self._teams_by_name = teams_by_name
+        self._sports_by_league: Dict[LeagueEnum, SportRecord] = {sport.league: sport for sport in sports}
+
+        # The two list routes return the whole catalog, render them once.
+        self.sports_json = render_json([s.dict_with_teams() for s in sports])
+        self.teams_json = render_json([t.dict_with_sport() for t in teams if t.sport is not None])
+
+    @contextmanager
+    def reading(self):
+        """Held by a request while it reads the snapshot, see CatalogArtifact. Nothing to release in memory."""
+        yield self
+
+    def sport(self, sport_id: int) -> Optional[SportRecord]:
+        return self._sports_by_id.get(sport_id)
+
+    def team(self, team_id: int) -> Optional[TeamRecord]:
+        return self._teams_by_id.get(team_id)
+
+    def teams_by_name(self, name: str) -> Tuple[TeamRecord, ...]:
+        return self._teams_by_name.get(name, ())
+
+    def league(self, league: LeagueEnum) -> Optional[SportRecord]:
+        """The league's sport, its teams are in .teams"""
+        return self._sports_by_league.get(league)
+
+
+def build_snapshot(sport_rows: Sequence[tuple], team_rows: Sequence[tuple]) -> CatalogSnapshot:
+    """Build a snapshot from (id, name, league) sport rows and (id, name, city, sport_id) team rows."""
+    sports = {row[0]: SportRecord(*row) for row in sport_rows}
+    teams = tuple(TeamRecord(*row, sport=sports.get(row[3])) for row in team_rows)
+
+    sport_teams: Dict[int, list] = {sport_id: [] for sport_id in sports}
+    for team in teams:
+        if team.sport_id in sport_teams:
+            sport_teams[team.sport_id].append(team)
+    for sport_id, sport in sports.items():
+        sport.teams = tuple(sport_teams[sport_id])
+
+    return CatalogSnapshot(tuple(sports.values()), teams)
+
+
+async def load_snapshot(engine: AsyncEngine) -> CatalogSnapshot:
+    """The catalog of engine's database and every shard's (see src/db/shards.py)."""
+    sport_rows, team_rows = [], []
+    async for conn in shard_connections(engine):
+        sport_rows += (await conn.execute(select(Sport.id, Sport.name, Sport.league).order_by(Sport.id))).all()
+        team_rows += (await conn.execute(
+            select(Team.id, Team.name, Team.city, Team.sport_id).order_by(Team.id)
+        )).all()
+
+    return build_snapshot(sport_rows, team_rows)
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+
+
+def get_current_snapshot() -> Optional[CatalogSnapshot]:
+    return _snapshot
+
+
+def set_current_snapshot(snapshot: Optional[CatalogSnapshot]) -> None:
+    global _snapshot
+    _snapshot = snapshot
+
+
+async def reload_snapshot(engine: AsyncEngine) -> CatalogSnapshot:
+    snapshot = await load_snapshot(engine)
+    set_current_snapshot(snapshot)
+    logger.info(f'catalog snapshot loaded: {len(snapshot.sports)} sports, {len(snapshot.teams)} teams')
+    return snapshot
+
+
+async def try_reload(reload: Callable[[], Awaitable]) -> bool:
+    """Run a snapshot reload, on failure log it and keep serving the current snapshot."""
+    try:
+        await reload()
+        return True
+    except Exception:
+        logger.exception('catalog snapshot reload failed, keeping the current snapshot')
+        return False
+
+
+async def watch_file(path: str, interval: float, reload: Callable[[], Awaitable]) -> None:
+    """Call reload whenever the file at path changes, checking its mtime every interval seconds."""
+    last_mtime = os.stat(path).st_mtime_ns
+    while True:
+        await asyncio.sleep(interval)
+        mtime = os.stat(path).st_mtime_ns
+        if mtime != last_mtime and await try_reload(reload):
+            last_mtime = mtime
+
+
+def reload_on_signal(reload: Callable[[], Awaitable], signum=signal.SIGHUP) -> None:
+    """Call reload in the running event loop when the process receives signum."""
+    loop = asyncio.get_running_loop()
+
+    def handler():
+        loop.create_task(try_reload(reload))
+
+    loop.add_signal_handler(signum, handler)
@@ -0,0 +1,104 @@
+"""
+Per route deadlines and cancellation on client disconnect.
+
+Routes using DeadlineRoute run their handler as a task that is abandoned when its deadline passes (a 504) or the client
+disconnects (a 499, nginx's code for it, though nobody is left to receive it). The task is cancelled and the queries
+of the sessions it opened are interrupted (see src/db/interrupt.py), so a stuck request stops holding a connection
+and an aiosqlite thread.
+
+The deadline is ROUTE_DEADLINE_SECONDS unless ROUTE_DEADLINES has one for the route, for example
+ROUTE_DEADLINES='/teams=2,/teams/{team_id}=0.5'. 0 is no deadline. Streaming responses are only covered until the
+handler returns the response, not while the body streams.
+"""
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from src.db.interrupt import request_sessions, session_interrupters
+from src.response_exception import HTTPGatewayTimeout
+
+logger = logging.getLogger(__name__)
+
+ROUTE_DEADLINE_SECONDS = float(os.environ.get('ROUTE_DEADLINE_SECONDS', 10))
+CLIENT_CLOSED_REQUEST = 499
+
+
+def parse_deadlines(value: str) -> Dict[str, float]:
+    deadlines = {}
+    for item in filter(None, (item.strip() for item in value.split(','))):
+        path, seconds = item.rsplit('=', 1)
+        deadlines[path.strip()] = float(seconds)
+    return deadlines
+
+
+ROUTE_DEADLINES = parse_deadlines(os.environ.get('ROUTE_DEADLINES', ''))
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def abandon(task: asyncio.Task, sessions) -> None:
+    # Find the connections while the task still holds them, cancelling it invalidates them.
+    interrupters = await session_interrupters(sessions)
+    task.cancel()
+    for interrupt in interrupters:
+        interrupt()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+async def run_with_deadline(request: Request, handler: Callable, deadline: Optional[float]) -> Response:
+    # Read the body first, once the handler has it cached the only thing left to receive is the disconnect.
+    await request.body()
+
+    sessions = []
+    token = request_sessions.set(sessions)
+    try:
+        # The task copies the context, so the sessions get_session opens in it are added to this list.
+        task = asyncio.create_task(handler(request))
+    finally:
+        request_sessions.reset(token)
+    disconnected = asyncio.create_task(wait_for_disconnect(request))
+
+    try:
+        done, _ = await asyncio.wait({task, disconnected}, timeout=deadline or None,
+                                     return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        await abandon(task, sessions)
+        raise
+    finally:
+        disconnected.cancel()
+
+    if task in done:
+        return task.result()
+
+    await abandon(task, sessions)
+    if disconnected in done:
+        logger.info(f'{request.method} {request.url.path} abandoned, client disconnected')
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    logger.warning(f'{request.method} {request.url.path} abandoned, deadline of {deadline}s passed')
+    raise HTTPGatewayTimeout('Deadline exceeded')
+
+
+class DeadlineRoute(APIRoute):
+
+    @property
+    def deadline(self) -> float:
+        return ROUTE_DEADLINES.get(self.path, ROUTE_DEADLINE_SECONDS)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def deadline_handler(request: Request) -> Response:
+            return await run_with_deadline(request, handler, self.deadline)
+
+        return deadline_handler
@@ -0,0 +1,8 @@
+from fastapi import HTTPException, status
+
+DISABLE_CUD_ROUTES = True
+
+
+def protect_route():
+    if DISABLE_CUD_ROUTES:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,48 @@
+"""
+ETags for conditional GETs and PUTs.
+
+The ETag of a cached read is a hash of the rendered body, so it changes exactly when the response does and every worker
+computes the same one without sharing any state. A request whose If-None-Match has it gets an empty 304.
+
+A PUT can send the ETag of a sport or team's GET back in If-Match, to only apply if that response hasn't changed since.
+"""
+from hashlib import blake2b
+from typing import Optional
+
+from fastapi import Request, Response
+
+from src.db.snapshot import render_json
+
+
+def etag(body: bytes) -> str:
+    return f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison, as If-None-Match uses: W/"x" matches "x".
+    return any(candidate.strip().removeprefix('W/') == tag for candidate in if_none_match.split(','))
+
+
+def if_match_passes(if_match: Optional[str], tag: str) -> bool:
+    """Whether a write to a resource with the ETag tag may go ahead. No If-Match always may."""
+    if if_match is None or if_match.strip() == '*':
+        return True
+    # Strong comparison, as If-Match uses: weak tags never match.
+    return any(candidate.strip() == tag for candidate in if_match.split(','))
+
+
+def etag_response(request: Request, body: bytes, headers: Optional[dict] = None) -> Response:
+    """The json body with its ETag, or a 304 if the request already has it."""
+    tag = etag(body)
+    headers = {**(headers or {}), 'ETag': tag}
+    if etag_matches(request.headers.get('if-none-match'), tag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
+def etag_json_response(request: Request, content, headers: Optional[dict] = None) -> Response:
+    return etag_response(request, render_json(content), headers)
@@ -0,0 +1,144 @@
+"""
+Push notification of catalog changes to GET /events subscribers.
+
+The write routes record each change in the catalog_event table. Every worker runs one ChangeBroker poller that reads
+new events from that table by id and hands them to the subscribers connected to that worker, so fan-out across the
+gunicorn workers costs one indexed query per worker per poll, however many subscribers there are.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import timedelta
+from typing import List, Optional, Set
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.db.models import utcnow
+from src.db.models.event import CatalogEvent
+
+logger = logging.getLogger(__name__)
+
+CHANGE_EVENTS_POLL_SECONDS = float(os.environ.get('CHANGE_EVENTS_POLL_SECONDS', 1))
+# Events a subscriber may fall behind by before it is disconnected. It can reconnect with Last-Event-ID to catch up.
+CHANGE_EVENTS_QUEUE_SIZE = int(os.environ.get('CHANGE_EVENTS_QUEUE_SIZE', 256))
+CHANGE_EVENTS_REPLAY_LIMIT = int(os.environ.get('CHANGE_EVENTS_REPLAY_LIMIT', 1000))
+CHANGE_EVENTS_RETENTION = timedelta(hours=float(os.environ.get('CHANGE_EVENTS_RETENTION_HOURS', 24)))
+CHANGE_EVENTS_PRUNE_SECONDS = 3600
+
+
+class ChangeEvent:
+    __slots__ = ('id', 'entity', 'entity_id', 'op')
+
+    def __init__(self, id: int, entity: str, entity_id: int, op: str):
+        self.id = id
+        self.entity = entity
+        self.entity_id = entity_id
+        self.op = op
+
+    def sse(self) -> str:
+        data = json.dumps({'entity': self.entity, 'id': self.entity_id})
+        return f'id: {self.id}\nevent: {self.op}\ndata: {data}\n\n'
+
+
+def record_event(session: AsyncSession, op: str, entity: str, entity_id: int) -> None:
+    """Add a change event to the session, to be committed with the change itself."""
+    session.add(CatalogEvent(entity=entity, entity_id=entity_id, op=op))
+
+
+async def record_events(session: AsyncSession, op: str, entity: str, entity_ids: List[int]) -> None:
+    """Insert change events for many rows in one statement, in the session's transaction."""
+    if entity_ids:
+        now = utcnow()
+        await session.execute(insert(CatalogEvent), [
+            {'entity': entity, 'entity_id': entity_id, 'op': op, 'created_at': now} for entity_id in entity_ids
+        ])
+
+
+async def events_after(conn, last_id: int, limit: int) -> List[ChangeEvent]:
+    """The events with id greater than last_id, oldest first. conn is an AsyncConnection or AsyncSession."""
+    result = await conn.execute(
+        select(CatalogEvent.id, CatalogEvent.entity, CatalogEvent.entity_id, CatalogEvent.op)
+        .where(CatalogEvent.id > last_id)
+        .order_by(CatalogEvent.id)
+        .limit(limit)
+    )
+    return [ChangeEvent(*row) for row in result]
+
+
+class Subscription:
+    """A subscriber's queue of events. closed is set when the broker drops it, once the queue is empty it is done."""
+    __slots__ = ('queue', 'closed')
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+
+class ChangeBroker:
+    """Per worker fan-out of change events to subscriber queues."""
+
+    def __init__(self, queue_size: int = CHANGE_EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscriptions: Set[Subscription] = set()
+        self.last_id: Optional[int] = None
+        self.dropped = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event: ChangeEvent) -> None:
+        for subscription in list(self.subscriptions):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up, cut it loose once it has drained its queue rather than buffer without bound.
+                subscription.closed = True
+                self.unsubscribe(subscription)
+                self.dropped += 1
+
+    async def poll_once(self, conn) -> int:
+        """Publish the events recorded since the last poll, returning how many there were."""
+        if self.last_id is None:
+            # Start from now, subscribers wanting history ask for it with Last-Event-ID.
+            self.last_id = (await conn.execute(select(func.coalesce(func.max(CatalogEvent.id), 0)))).scalar()
+            return 0
+
+        count = 0
+        while True:
+            events = await events_after(conn, self.last_id, CHANGE_EVENTS_REPLAY_LIMIT)
+            for event in events:
+                self.publish(event)
+            if events:
+                self.last_id = events[-1].id
+            count += len(events)
+            if len(events) < CHANGE_EVENTS_REPLAY_LIMIT:
+                return count
+
+    async def run(self, engine: AsyncEngine, interval: float = CHANGE_EVENTS_POLL_SECONDS) -> None:
+        """Poll for new events forever, pruning expired ones now and then."""
+        last_prune = None
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    await self.poll_once(conn)
+
+                    now = utcnow()
+                    if last_prune is None or (now - last_prune).total_seconds() > CHANGE_EVENTS_PRUNE_SECONDS:
+                        # Keeping the newest event, without it sqlite would hand out ids from 1 again and the
+                        # cursors of /events and /changes would go backwards.
+                        await conn.execute(delete(CatalogEvent).where(
+                            CatalogEvent.created_at < now - CHANGE_EVENTS_RETENTION,
+                            CatalogEvent.id < select(func.max(CatalogEvent.id)).scalar_subquery(),
+                        ))
+                        await conn.commit()
+                        last_prune = now
+            except Exception:
+                logger.exception('polling catalog events failed')
+            await asyncio.sleep(interval)
@@ -1,174 +1,245 @@
+import asyncio
+import logging
 from typing import Dict, List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import APIRouter, Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from src.db.db import get_session
+from src.ask import ask_response, sentiment_weights
+from src.audit import audit_queue, record_actor
+from src.daily import DailyPredictions, cache_max_age, local_now, render_prediction
+from src.db import bulk, repository
+from src.db.db import admission, dispose_engine, get_engine, get_session
 from src.db.models.team import Team, TeamCreate, TeamReadWithSport
 from src.db.models.sport import Sport, SportCreate
 from src.db.models.related import SportReadWithTeams
-from src.db.schema.answer import AnswerChoices, Sentiment
-from src.response_exception import HTTPBadRequest, HTTPExceptionNotFound
-
-DISABLE_CUD_ROUTES = True
+from src.db.models.event import CREATED, DELETED, UPDATED
+from src.db.schema.bulk import BulkDelete, BulkResult, BulkSportUpdate, BulkTeamUpdate
+from src.db.models.tombstone import SPORT_ENTITY, TEAM_ENTITY, Tombstone
+from src.db.artifact import load_artifact
+from src.db.shards import (
+    commit_shard, dispose_shard_engines, league_session, next_id, shard_session, shards, sport_session, team_session,
+)
+from src.db.snapshot import (
+    CATALOG_ARTIFACT, CATALOG_SNAPSHOT, CATALOG_SNAPSHOT_RELOAD_ON_SIGHUP, CATALOG_SNAPSHOT_WATCH_SECONDS,
+    reload_on_signal, reload_snapshot, render_json, watch_file,
+)
+from src.db.schema.answer import AnswerChoices, SENTIMENT_CHOICES_CALLABLE_MAP, Sentiment, SentimentWeights
+from src.db.schema.league import LeagueEnum
+from src.deadline import DeadlineRoute
+from src.dependencies import protect_route
+from src.etag import etag, etag_json_response, etag_response, if_match_passes
+from src.events import ChangeBroker, record_event
+from src.ratelimit import RATE_LIMIT_PER_SECOND, RateLimitMiddleware, create_buckets
+from src.routers import audit, changes, events, export, snapshot
+from src.response_exception import (
+    HTTPBadRequest, HTTPExceptionNotFound, HTTPPreconditionFailed, HTTPServiceUnavailable,
+)
+from src.warmup import warmup_until_ready
 
-SENTIMENT_CHOICES_CALLABLE_MAP = {
-    Sentiment.NEGATIVE: AnswerChoices.negative,
-    Sentiment.NEUTRAL: AnswerChoices.neutral,
-    Sentiment.POSITIVE: AnswerChoices.positive,
-}
+logger = logging.getLogger(__name__)
 
 origins = [
     "https://gregmallan.github.io/",
 ]
 
-app = FastAPI()
+router = APIRouter(route_class=DeadlineRoute)
+
+# The write routes are protected, and audited as made by the client's address
+WRITE_DEPENDENCIES = [Depends(protect_route), Depends(record_actor)]
+
+
+def check_if_match(if_match: str, content: Optional[dict], version: Optional[int], loaded_version: int, what: str):
+    """
+    412 unless If-Match has the ETag of the GET response, content, read at the row version the update is conditional
+    on. A different version means the row changed between the two reads.
+    """
+    if content is None or version != loaded_version or not if_match_passes(if_match, etag(render_json(content))):
+        raise HTTPPreconditionFailed(f'{what} has changed since the ETag in If-Match')
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origin_regex='https?://127.0.0.1:\d*',
-    allow_origins=origins,
-    allow_credentials=False,
-    allow_methods=["GET", ],
-    allow_headers=["*"],
-)
 
+async def bulk_update(session: AsyncSession, model, patches: List[dict]) -> BulkResult:
+    ids = [patch['id'] for patch in patches]
+    if len(set(ids)) != len(ids):
+        raise HTTPBadRequest(f'Each {model.__name__} id may only be updated once per request')
+    for patch in patches:
+        reason = bulk.shard_move(model, patch)
+        if reason:
+            raise HTTPBadRequest(reason)
 
-def protect_route():
-    if DISABLE_CUD_ROUTES:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    outcomes = await bulk.bulk_update(session, model, patches)
+    return BulkResult(results=[{'id': id, 'status': outcomes[id]} for id in ids])
 
 
-@app.get('/ping', response_model=Dict)
+async def bulk_delete(session: AsyncSession, model, ids: List[int]) -> BulkResult:
+    outcomes = await bulk.bulk_delete(session, model, ids)
+    return BulkResult(results=[{'id': id, 'status': outcomes[id]} for id in dict.fromkeys(ids)])
+
+
+@router.get('/ping', response_model=Dict)
 async def ping():
     return {'ping': 'pong!'}
 
 
-@app.get('/sports', response_model=List[SportReadWithTeams])
-async def get_sports(session: AsyncSession = Depends(get_session)):
-    results = await session.execute(
-        select(Sport).options(selectinload(Sport.teams)).execution_options(populate_existing=True)
-    )
+@router.get('/ready', response_model=Dict)
+async def ready(request: Request):
+    """Readiness check, unlike /ping this fails until the worker has finished its startup warmup."""
+    if not getattr(request.app.state, 'ready', False):
+        raise HTTPServiceUnavailable('Warming up')
+    return {'ready': True}
+
+
+@router.get('/admission', response_model=Dict, dependencies=[Depends(protect_route)])
+async def admission_stats():
+    """This worker's db admission control: sessions running and queued, and the requests admitted and shed."""
+    return admission.stats()
+
 
-    sports = results.scalars().all()
-    return sports
+@router.get('/sports', response_model=List[SportReadWithTeams])
+async def get_sports(session: AsyncSession = Depends(get_session)):
+    sports = await repository.get_sports(session)
+    return JSONResponse([sport.dict_with_teams() for sport in sports])
 
 
-@app.post('/sports', response_model=Sport, status_code=status.HTTP_201_CREATED, dependencies=[Depends(protect_route)])
+@router.post('/sports', response_model=Sport, status_code=status.HTTP_201_CREATED, dependencies=WRITE_DEPENDENCIES)
 async def create_sport(sport: SportCreate, session: AsyncSession = Depends(get_session)):
     sport = Sport.from_orm(sport)
-    session.add(sport)
-    try:
-        await session.commit()
-    except IntegrityError as e:
-        raise HTTPBadRequest(f'IntegrityError creating Sport: {sport.dict()}')
-
-    await session.refresh(sport)
+    shard = shards.for_league(sport.league)
+
+    async with shard_session(shard, session) as shard_db:
+        sport.id = next_id(Sport, shard)
+        shard_db.add(sport)
+        try:
+            await shard_db.flush()
+            record_event(session, CREATED, SPORT_ENTITY, sport.id)
+            await commit_shard(shard_db, session)
+        except IntegrityError as e:
+            # Without the id, on a shard that is still the subquery assigning it
+            raise HTTPBadRequest(f"IntegrityError creating Sport: {sport.dict(exclude={'id'})}")
+
+    # expire_on_commit is off, the sport still has its values and its id from the flush, no need to read it back
     return sport
 
 
-@app.get('/sports/{sport_id}', response_model=SportReadWithTeams)
-async def get_sport(sport_id: int, session: AsyncSession = Depends(get_session)):
-    result = await session.execute(
-        select(Sport, Team)
-            .join(Team, Team.sport_id == Sport.id, isouter=True)  # Do a left outer join to get sports with no teams
-            .where(Sport.id == sport_id)
-            .options(selectinload(Sport.teams))
-    )
-
-    sport = result.scalar()
+@router.get('/sports/{sport_id}', response_model=SportReadWithTeams)
+async def get_sport(sport_id: int, request: Request, session: AsyncSession = Depends(sport_session)):
+    sport = await repository.get_sport(session, sport_id)
 
     if sport is None:
         raise HTTPExceptionNotFound(f'No sport found with id={sport_id}')
 
-    return sport
+    return etag_json_response(request, sport.dict_with_teams())
 
 
-@app.put('/sports/{sport_id}', response_model=Sport, status_code=status.HTTP_200_OK,
-         dependencies=[Depends(protect_route)])
-async def update_sport(sport_id: int, sport: SportCreate, session: AsyncSession = Depends(get_session)):
+@router.put('/sports/{sport_id}', response_model=Sport, status_code=status.HTTP_200_OK,
+         dependencies=WRITE_DEPENDENCIES)
+async def update_sport(
+    sport_id: int, sport: SportCreate, request: Request, session: AsyncSession = Depends(sport_session),
+    default_session: AsyncSession = Depends(get_session),
+):
     db_sport = await session.get(Sport, sport_id)
 
     if db_sport is None:
         raise HTTPExceptionNotFound(f'No sport found with id={sport_id}')
 
+    if_match = request.headers.get('if-match')
+    if if_match is not None:
+        current = await repository.get_sport(session, sport_id, fresh=True)
+        check_if_match(
+            if_match, current and current.dict_with_teams(), current and current.version, db_sport.version,
+            f'Sport id={sport_id}',
+        )
+
+    if shards.for_league(sport.league) != shards.for_id(sport_id):
+        raise HTTPBadRequest(f'Moving sport id={sport_id} to league {sport.league.value} would move it between shards')
+
     for field, val in sport.dict().items():
         setattr(db_sport, field, val)
 
     session.add(db_sport)
-    await session.commit()
-    await session.refresh(db_sport)
+    record_event(default_session, UPDATED, SPORT_ENTITY, sport_id)
+    try:
+        # UPDATE ... WHERE version = the version loaded, no row matches if another request updated it since
+        await commit_shard(session, default_session)
+    except StaleDataError:
+        raise HTTPPreconditionFailed(f'Sport id={sport_id} was changed by another request')
 
     return db_sport
 
 
-@app.delete('/sports/{sport_id}', response_model=Dict, status_code=status.HTTP_200_OK,
-            dependencies=[Depends(protect_route)])
-async def delete_sport(sport_id: int, session: AsyncSession = Depends(get_session)):
+@router.delete('/sports/{sport_id}', response_model=Dict, status_code=status.HTTP_200_OK,
+            dependencies=WRITE_DEPENDENCIES)
+async def delete_sport(
+    sport_id: int, session: AsyncSession = Depends(sport_session), default_session: AsyncSession = Depends(get_session),
+):
     sport = await session.get(Sport, sport_id)
 
     if sport is None:
         raise HTTPExceptionNotFound(f'No sport found with id={sport_id}')
 
     await session.delete(sport)
-    await session.commit()
+    default_session.add(Tombstone(entity=SPORT_ENTITY, entity_id=sport_id))
+    record_event(default_session, DELETED, SPORT_ENTITY, sport_id)
+    await commit_shard(session, default_session)
 
     return {'OK': True, 'sport': sport, 'msg': f'sport id={sport_id} deleted'}
 
 
-@app.get('/teams', response_model=List[TeamReadWithSport])
+@router.patch('/sports', response_model=BulkResult, dependencies=WRITE_DEPENDENCIES)
+async def bulk_update_sports(body: BulkSportUpdate, session: AsyncSession = Depends(get_session)):
+    """Update many sports, each with its own changes, in one transaction per shard."""
+    return await bulk_update(session, Sport, [patch.dict(exclude_unset=True) for patch in body.updates])
+
+
+@router.delete('/sports', response_model=BulkResult, dependencies=WRITE_DEPENDENCIES)
+async def bulk_delete_sports(body: BulkDelete, session: AsyncSession = Depends(get_session)):
+    """Delete many sports in one transaction per shard. Sports that still have teams are left, as conflicts."""
+    return await bulk_delete(session, Sport, body.ids)
+
+
+@router.get('/teams', response_model=List[TeamReadWithSport])
 async def get_teams(session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Team, Sport).join(Sport).options(selectinload(Team.sport)))
-    teams = result.scalars().all()
-    return teams
+    teams = await repository.get_teams(session)
+    return JSONResponse([team.dict_with_sport() for team in teams])
 
 
-@app.post('/teams', response_model=Team, status_code=status.HTTP_201_CREATED, dependencies=[Depends(protect_route)])
+@router.post('/teams', response_model=Team, status_code=status.HTTP_201_CREATED, dependencies=WRITE_DEPENDENCIES)
 async def create_team(team: TeamCreate, session: AsyncSession = Depends(get_session)):
     team = Team(name=team.name, city=team.city, sport_id=team.sport_id)
-    session.add(team)
-    try:
-        await session.commit()
-    except IntegrityError as e:
-        raise HTTPBadRequest(f'IntegrityError creating Team: {team.dict()}')
+    # Teams live in their sport's shard
+    shard = shards.for_id(team.sport_id) if team.sport_id is not None else 0
+
+    async with shard_session(shard, session) as shard_db:
+        team.id = next_id(Team, shard)
+        shard_db.add(team)
+        try:
+            await shard_db.flush()
+            record_event(session, CREATED, TEAM_ENTITY, team.id)
+            await commit_shard(shard_db, session)
+        except IntegrityError as e:
+            raise HTTPBadRequest(f"IntegrityError creating Team: {team.dict(exclude={'id'})}")
 
-    await session.refresh(team)
     return team
 
 
-@app.get('/teams/{team_id}', response_model=TeamReadWithSport)
-async def get_team(team_id: int, session: AsyncSession = Depends(get_session)):
-    # Alternate option to make the query for team by id
-    # query = select(Team).where(Team.id == team_id)
-    # results = await session.execute(query)
-    # team = results.first() # Returns a sqlalchemy Row
-    # team = results.one()  # Returns a sqlalchemy Row or raises
-    # team = await session.get(Team, team_id)  # Returns Team instance
-
-    result = await session.execute(
-        select(Team, Sport)
-            .join(Sport)
-            .where(Team.id == team_id)
-            .options(selectinload(Team.sport))
-    )
-
-    team = result.scalar()
+@router.get('/teams/{team_id}', response_model=TeamReadWithSport)
+async def get_team(team_id: int, request: Request, session: AsyncSession = Depends(team_session)):
+    team = await repository.get_team(session, team_id)
 
     if team is None:
         raise HTTPExceptionNotFound(f'No team found with id={team_id}')
 
-    return team
+    return etag_json_response(request, team.dict_with_sport())
 
 
-@app.get('/teams/name/{team_name}', response_model=List[Team])
+@router.get('/teams/name/{team_name}', response_model=List[Team])
 async def get_team_by_name(team_name: str, session: AsyncSession = Depends(get_session)):
-    query = select(Team).where(Team.name == team_name.strip().lower())
-    result = await session.execute(query)
-    teams = result.scalars().all()
+    teams = await repository.get_teams_by_name(session, team_name)
 
     if not teams:
         raise HTTPExceptionNotFound(f'No teams found with name={team_name}')
@@ -176,51 +247,237 @@ async def get_team_by_name(team_name: str, session: AsyncSession = Depends(get_s
     return teams
 
 
-@app.put('/teams/{team_id}', response_model=Team, status_code=status.HTTP_200_OK, dependencies=[Depends(protect_route)])
-async def update_team(team_id: int, team: TeamCreate, session: AsyncSession = Depends(get_session)):
+@router.put('/teams/{team_id}', response_model=Team, status_code=status.HTTP_200_OK, dependencies=WRITE_DEPENDENCIES)
+async def update_team(
+    team_id: int, team: TeamCreate, request: Request, session: AsyncSession = Depends(team_session),
+    default_session: AsyncSession = Depends(get_session),
+):
     db_team = await session.get(Team, team_id)
 
     if db_team is None:
         raise HTTPExceptionNotFound(f'No team found with id={team_id}')
 
+    if_match = request.headers.get('if-match')
+    if if_match is not None:
+        current = await repository.get_team(session, team_id, fresh=True)
+        check_if_match(
+            if_match, current and current.dict_with_sport(), current and current.version, db_team.version,
+            f'Team id={team_id}',
+        )
+
+    if team.sport_id is not None and shards.for_id(team.sport_id) != shards.for_id(team_id):
+        raise HTTPBadRequest(f'Moving team id={team_id} to sport id={team.sport_id} would move it between shards')
+
     for field, val in team.dict().items():
         setattr(db_team, field, val)
 
     session.add(db_team)
+    record_event(default_session, UPDATED, TEAM_ENTITY, team_id)
 
     try:
-        await session.commit()
+        await commit_shard(session, default_session)
     except IntegrityError as e:
         raise HTTPBadRequest(f'IntegrityError updating Team: {team.dict()}')
-
-    await session.refresh(db_team)
+    except StaleDataError:
+        raise HTTPPreconditionFailed(f'Team id={team_id} was changed by another request')
 
     return db_team
 
 
-@app.delete(
-    '/teams/{team_id}', response_model=Dict, status_code=status.HTTP_200_OK, dependencies=[Depends(protect_route)]
+@router.delete(
+    '/teams/{team_id}', response_model=Dict, status_code=status.HTTP_200_OK, dependencies=WRITE_DEPENDENCIES
 )
-async def delete_team(team_id: int, session: AsyncSession = Depends(get_session)):
+async def delete_team(
+    team_id: int, session: AsyncSession = Depends(team_session), default_session: AsyncSession = Depends(get_session),
+):
     team = await session.get(Team, team_id)
 
     if team is None:
         raise HTTPExceptionNotFound(f'No team found with id={team_id}')
 
     await session.delete(team)
-    await session.commit()
+    default_session.add(Tombstone(entity=TEAM_ENTITY, entity_id=team_id))
+    record_event(default_session, DELETED, TEAM_ENTITY, team_id)
+    await commit_shard(session, default_session)
 
     return {'OK': True, 'team': team, 'msg': f'team id={team_id} deleted'}
 
 
-@app.get('/teams/{team_id}/ask', response_model=Dict)
+@router.patch('/teams', response_model=BulkResult, dependencies=WRITE_DEPENDENCIES)
+async def bulk_update_teams(body: BulkTeamUpdate, session: AsyncSession = Depends(get_session)):
+    """Update many teams, each with its own changes, in one transaction per shard."""
+    return await bulk_update(session, Team, [patch.dict(exclude_unset=True) for patch in body.updates])
+
+
+@router.delete('/teams', response_model=BulkResult, dependencies=WRITE_DEPENDENCIES)
+async def bulk_delete_teams(body: BulkDelete, session: AsyncSession = Depends(get_session)):
+    """Delete many teams in one transaction per shard."""
+    return await bulk_delete(session, Team, body.ids)
+
+
+@router.get('/teams/{team_id}/ask', response_model=Dict)
 async def team_will_they_win(team_id: int, sentiment: Optional[Sentiment] = None,
-                             session: AsyncSession = Depends(get_session)):
-    team = await session.get(Team, team_id)
+                             session: AsyncSession = Depends(team_session)):
+    team = await repository.get_team_row(session, team_id)
 
     if team is None:
         raise HTTPExceptionNotFound(f'No team found with id={team_id}')
 
     answer = SENTIMENT_CHOICES_CALLABLE_MAP.get(sentiment, AnswerChoices.any)()
 
-    return {'team': team, 'answer': answer, 'requested_sentiment': sentiment}
+    return {'team': team._asdict(), 'answer': answer, 'requested_sentiment': sentiment}
+
+
+@router.get('/teams/{team_id}/ask/daily', response_model=Dict)
+async def team_will_they_win_today(team_id: int, request: Request, sentiment: Optional[Sentiment] = None,
+                                   session: AsyncSession = Depends(team_session)):
+    """
+    The team's answer of the day, the same all day (see src/daily.py). Cacheable for a short while, with an ETag.
+    """
+    predictions: DailyPredictions = request.app.state.daily_predictions
+    now = local_now()
+    day = now.date()
+
+    body = predictions.get(day, team_id, sentiment)
+    if body is None:
+        team = await repository.get_team_row(session, team_id)
+
+        if team is None:
+            raise HTTPExceptionNotFound(f'No team found with id={team_id}')
+
+        body = render_prediction(team._asdict(), day, sentiment)
+        predictions.put(day, team_id, sentiment, body)
+
+    return etag_response(request, body, headers={'Cache-Control': f'public, max-age={cache_max_age(now)}'})
+
+
+@router.get('/leagues/{league}/teams', response_model=List[Team])
+async def get_league_teams(league: LeagueEnum, request: Request, session: AsyncSession = Depends(league_session)):
+    sport = await repository.get_league(session, league)
+
+    if sport is None:
+        raise HTTPExceptionNotFound(f'No sport found with league={league.value}')
+
+    return etag_json_response(request, [team.dict() for team in sport.teams])
+
+
+@router.get('/leagues/{league}/ask', response_model=List[Dict])
+async def league_will_they_win(league: LeagueEnum, sentiment: Optional[Sentiment] = None,
+                               weights: Optional[SentimentWeights] = Depends(sentiment_weights),
+                               session: AsyncSession = Depends(league_session)):
+    sport = await repository.get_league(session, league)
+
+    if sport is None:
+        raise HTTPExceptionNotFound(f'No sport found with league={league.value}')
+
+    return ask_response(sport.teams, sentiment, weights)
+
+
+@router.get('/ask', response_model=List[Dict])
+async def catalog_will_they_win(sentiment: Optional[Sentiment] = None,
+                                weights: Optional[SentimentWeights] = Depends(sentiment_weights),
+                                session: AsyncSession = Depends(get_session)):
+    """An answer for every team with a sport"""
+    teams = await repository.get_teams(session)
+    return ask_response(teams, sentiment, weights)
+
+
+def create_app(
+    catalog_snapshot: bool = CATALOG_SNAPSHOT, catalog_artifact: Optional[str] = CATALOG_ARTIFACT,
+    rate_limit: float = RATE_LIMIT_PER_SECOND,
+) -> FastAPI:
+    """
+    App factory. Gunicorn calls this in the master (src.main:create_app() with preload_app) so the workers fork with
+    the app built but without an engine or any open connections, those are made per worker on startup.
+
+    With catalog_snapshot the catalog GET routes are served from an in-memory snapshot loaded during warmup, or with
+    catalog_artifact from that compiled artifact file, memory mapped.
+
+    With rate_limit each client is limited to that many requests a second (see src/ratelimit.py).
+    """
+    app = FastAPI()
+
+    if rate_limit:
+        # Added before CORS so that wraps it and the 429s carry the CORS headers too.
+        app.add_middleware(RateLimitMiddleware, buckets=create_buckets(rate_limit))
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origin_regex='https?://127.0.0.1:\d*',
+        allow_origins=origins,
+        allow_credentials=False,
+        allow_methods=["GET", ],
+        allow_headers=["*"],
+    )
+
+    app.state.ready = False
+    app.state.warmup_hooks = []
+    app.state.background_tasks = []
+    app.state.change_broker = ChangeBroker()
+    app.state.daily_predictions = DailyPredictions()
+
+    if catalog_snapshot or catalog_artifact:
+        # Ahead of the db routes so the snapshot routes match the catalog GETs first.
+        app.include_router(snapshot.router)
+        app.state.warmup_hooks.append(lambda app, engine: app.state.reload_snapshot())
+
+    app.include_router(router)
+    app.include_router(export.router)
+    app.include_router(changes.router)
+    app.include_router(events.router)
+    app.include_router(audit.router)
+
+    @app.on_event('startup')
+    async def startup():
+        engine = get_engine()
+
+        if catalog_artifact:
+            app.state.reload_snapshot = lambda: load_artifact(catalog_artifact)
+            snapshot_sources = [catalog_artifact]
+        else:
+            app.state.reload_snapshot = lambda: reload_snapshot(engine)
+            # The snapshot has every shard's catalog, a change to any of their files reloads it
+            snapshot_sources = [engine.url.database] + [make_url(url).database for url in shards.urls[1:]]
+
+        await warmup_until_ready(app, engine)
+        app.state.background_tasks.append(asyncio.create_task(app.state.change_broker.run(engine)))
+        app.state.background_tasks.append(asyncio.create_task(audit_queue.run(engine)))
+        app.state.background_tasks.append(asyncio.create_task(
+            app.state.daily_predictions.run(engine, app.state.change_broker)
+        ))
+
+        if not (catalog_snapshot or catalog_artifact):
+            return
+        if CATALOG_SNAPSHOT_WATCH_SECONDS:
+            for snapshot_source in filter(None, snapshot_sources):
+                app.state.background_tasks.append(asyncio.create_task(
+                    watch_file(snapshot_source, CATALOG_SNAPSHOT_WATCH_SECONDS, app.state.reload_snapshot)
+                ))
+        if CATALOG_SNAPSHOT_RELOAD_ON_SIGHUP:
+            reload_on_signal(app.state.reload_snapshot)
+
+    @app.on_event('shutdown')
+    async def shutdown():
+        warmup_task = getattr(app.state, 'warmup_task', None)
+        if warmup_task:
+            warmup_task.cancel()
+        for task in app.state.background_tasks:
+            task.cancel()
+        try:
+            await audit_queue.flush(get_engine())
+        except Exception:
+            logger.exception('writing the audit log on shutdown failed')
+        await dispose_engine()
+        await dispose_shard_engines()
+
+    return app
+
+
+def __getattr__(name):
+    # Build the module level `app` (used by uvicorn src.main:app and the tests) on first access only, so importing
+    # this module for the factory doesn't build a second app.
+    if name == 'app':
+        app = create_app()
+        globals()['app'] = app
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
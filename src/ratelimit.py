@@ -0,0 +1,203 @@
+"""
+Per client token bucket rate limiting.
+
+RateLimitMiddleware admits a request if the client's bucket has a token, otherwise it answers 429 with Retry-After
+without calling the app, so a rejected request never reaches a route or opens a db session. Buckets hold up to burst
+tokens and refill at rate tokens a second.
+
+Clients are keyed on the last X-Forwarded-For entry, the address our nginx saw and appended. The api is only reachable
+through nginx so that entry can't be forged, the ones before it can.
+
+By default each worker keeps its own buckets in memory, so a client gets the rate once per worker it lands on. Set
+RATE_LIMIT_SHARED_DB to a file path to keep the buckets in a small sqlite db shared by the workers on the host instead.
+Its transactions run on a thread of their own, off the event loop, and a request whose bucket can't be updated (the db
+stayed locked, or is broken) is let through rather than failed.
+"""
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Tokens a second, 0 turns rate limiting off
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 0))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 20))
+RATE_LIMIT_SHARED_DB = os.environ.get('RATE_LIMIT_SHARED_DB')
+# Health checks come from the docker host and must never be limited.
+RATE_LIMIT_EXEMPT_PATHS = ('/ping', '/ready')
+# The client of the workers' in process warmup requests (src/warmup.py), never limited either. It is no socket address,
+# so no request from the network has it.
+RATE_LIMIT_EXEMPT_CLIENT = ('warmup', 0)
+# Seconds a take waits for another worker's write lock on the shared db before letting the request through
+RATE_LIMIT_SHARED_DB_TIMEOUT = float(os.environ.get('RATE_LIMIT_SHARED_DB_TIMEOUT', 0.1))
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBuckets:
+    """
+    In-memory buckets, key: (tokens, updated). A bucket idle for long enough to have refilled is the same as no bucket,
+    so those are swept out now and then and memory stays proportional to the clients active in the last refill period.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.refill_seconds = burst / rate
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._next_sweep = clock() + self.refill_seconds
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key: str) -> float:
+        """Take a token from key's bucket. Returns 0 if there was one, otherwise the seconds until there is."""
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+    async def take_async(self, key: str) -> float:
+        # In memory and quick, fine to run on the loop
+        return self.take(key)
+
+    def sweep(self, now: float) -> None:
+        expired = now - self.refill_seconds
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[1] > expired}
+        self._next_sweep = now + self.refill_seconds
+
+
+class SqliteTokenBuckets:
+    """
+    Buckets in a sqlite db shared by the workers on a host. Each take is one short immediate transaction on a local
+    file with synchronous off, losing the buckets in a crash only resets them. take_async runs them on one thread per
+    process, which also keeps the connection to one transaction at a time.
+    """
+
+    def __init__(
+        self, path: str, rate: float, burst: int, clock: Callable[[], float] = time.time,
+        timeout: float = RATE_LIMIT_SHARED_DB_TIMEOUT,
+    ):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.timeout = timeout
+        self.refill_seconds = burst / rate
+        # Takes that failed and let the request through
+        self.errors = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = None
+        self._pid = None
+        self._next_sweep = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily and per process, the middleware is built in the gunicorn master before the workers fork.
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_bucket '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID'
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _thread(self) -> ThreadPoolExecutor:
+        # Per process like the connection, the master's thread doesn't exist in the forked workers.
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rate-limit')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    async def take_async(self, key: str) -> float:
+        return await asyncio.get_running_loop().run_in_executor(self._thread(), self.take, key)
+
+    def take(self, key: str) -> float:
+        """Blocks for up to timeout on another worker's write lock, call take_async from the event loop."""
+        try:
+            return self._take(key)
+        except sqlite3.Error:
+            self.errors += 1
+            logger.warning('rate limit bucket update failed, letting the request through', exc_info=True)
+            return 0.0
+
+    def _take(self, key: str) -> float:
+        conn = self._connection()
+        now = self.clock()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_limit_bucket WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO rate_limit_bucket (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            if now >= self._next_sweep:
+                conn.execute('DELETE FROM rate_limit_bucket WHERE updated < ?', (now - self.refill_seconds,))
+                self._next_sweep = now + self.refill_seconds
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+def client_key(scope: Scope) -> str:
+    for name, value in scope['headers']:
+        if name == b'x-forwarded-for':
+            return value.decode('latin-1').rsplit(',', 1)[-1].strip()
+    client = scope.get('client')
+    return client[0] if client else ''
+
+
+class RateLimitMiddleware:
+
+    def __init__(self, app: ASGIApp, buckets, exempt_paths: Iterable[str] = RATE_LIMIT_EXEMPT_PATHS):
+        self.app = app
+        self.buckets = buckets
+        self.exempt_paths = frozenset(exempt_paths)
+        self.limited = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['path'] in self.exempt_paths:
+            return await self.app(scope, receive, send)
+        if scope.get('client') == RATE_LIMIT_EXEMPT_CLIENT:
+            return await self.app(scope, receive, send)
+
+        wait = await self.buckets.take_async(client_key(scope))
+        if wait:
+            self.limited += 1
+            response = JSONResponse(
+                {'detail': 'Too many requests'}, status_code=429, headers={'Retry-After': str(math.ceil(wait))}
+            )
+            return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+
+def create_buckets(rate: float = RATE_LIMIT_PER_SECOND, burst: int = RATE_LIMIT_BURST,
+                   shared_db: Optional[str] = RATE_LIMIT_SHARED_DB):
+    if shared_db:
+        return SqliteTokenBuckets(shared_db, rate, burst)
+    return TokenBuckets(rate, burst)
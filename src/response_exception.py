@@ -10,3 +10,27 @@ class HTTPExceptionNotFound(HTTPException):
 
     def __init__(self, detail):
         super().__init__(status_code=404, detail=detail)
+
+
+class HTTPGone(HTTPException):
+
+    def __init__(self, detail):
+        super().__init__(status_code=410, detail=detail)
+
+
+class HTTPPreconditionFailed(HTTPException):
+
+    def __init__(self, detail):
+        super().__init__(status_code=412, detail=detail)
+
+
+class HTTPServiceUnavailable(HTTPException):
+
+    def __init__(self, detail, headers=None):
+        super().__init__(status_code=503, detail=detail, headers=headers)
+
+
+class HTTPGatewayTimeout(HTTPException):
+
+    def __init__(self, detail):
+        super().__init__(status_code=504, detail=detail)
@@ -0,0 +1,48 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.db import get_session
+from src.db.models.audit import AuditLog
+from src.db.models.tombstone import SPORT_ENTITY, TEAM_ENTITY
+from src.db.schema.audit import AuditPage
+from src.deadline import DeadlineRoute
+from src.dependencies import protect_route
+
+router = APIRouter(route_class=DeadlineRoute)
+
+AUDIT_COLUMNS = (
+    AuditLog.id, AuditLog.entity, AuditLog.entity_id, AuditLog.op, AuditLog.actor, AuditLog.before, AuditLog.after,
+    AuditLog.changed_at,
+)
+
+
+@router.get('/audit', response_model=AuditPage, dependencies=[Depends(protect_route)])
+async def get_audit_log(
+    entity: Optional[str] = Query(None, regex=f'^({SPORT_ENTITY}|{TEAM_ENTITY})$'),
+    entity_id: Optional[int] = None,
+    actor: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Audit log entries, newest first, a page of `limit` at a time. Filtered by entity (and entity_id) the query is a
+    range scan of the (entity, entity_id, id) index, by actor of the actor index.
+    """
+    query = select(*AUDIT_COLUMNS).order_by(AuditLog.id.desc()).limit(limit)
+
+    if entity is not None:
+        query = query.where(AuditLog.entity == entity)
+    if entity_id is not None:
+        query = query.where(AuditLog.entity_id == entity_id)
+    if actor is not None:
+        query = query.where(AuditLog.actor == actor)
+    if before_id is not None:
+        query = query.where(AuditLog.id < before_id)
+
+    entries = (await session.execute(query)).all()
+
+    return AuditPage(entries=entries, next_before_id=entries[-1].id if len(entries) == limit else None)
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from src.db.db import get_session
+from src.db.models.event import CatalogEvent
+from src.db.models.sport import Sport
+from src.db.models.team import Team
+from src.db.models.tombstone import SPORT_ENTITY, TEAM_ENTITY, Tombstone
+from src.db.schema.changes import CatalogChanges, DeletedIds
+from src.db.shards import fan_out, shard_session, shards
+from src.deadline import DeadlineRoute
+from src.response_exception import HTTPGone
+
+router = APIRouter(route_class=DeadlineRoute)
+
+SPORT_COLUMNS = (Sport.name, Sport.league, Sport.id)
+TEAM_COLUMNS = (Team.name, Team.city, Team.sport_id, Team.id)
+# Ids per query when reading changed rows from the other shards, well under sqlite's limit on bound parameters
+SHARD_IDS_CHUNK_SIZE = 500
+
+
+async def all_rows(session: AsyncSession, query: Select) -> list:
+    """The query's rows from every shard. Each shard's ids are above the previous shard's, so id order holds."""
+    async def shard_rows(shard_db):
+        return (await shard_db.execute(query)).all()
+
+    return list(chain.from_iterable(await fan_out(session, shard_rows)))
+
+
+async def changed_rows(
+    session: AsyncSession, columns: tuple, model, entity: str, window: tuple, changed: Set[Tuple[str, int]]
+) -> list:
+    """The rows of model with events in the window, ordered by id."""
+    # The default database has the events too, its rows are joined to them there
+    rows = (await session.execute(
+        select(*columns).where(
+            model.id.in_(select(CatalogEvent.entity_id).where(*window, CatalogEvent.entity == entity))
+        ).order_by(model.id)
+    )).all()
+
+    ids_by_shard: Dict[int, List[int]] = defaultdict(list)
+    for changed_entity, id in sorted(changed):
+        if changed_entity == entity and shards.for_id(id):
+            ids_by_shard[shards.for_id(id)].append(id)
+    for shard, ids in sorted(ids_by_shard.items()):
+        async with shard_session(shard, session) as shard_db:
+            for start in range(0, len(ids), SHARD_IDS_CHUNK_SIZE):
+                chunk = ids[start:start + SHARD_IDS_CHUNK_SIZE]
+                rows += (await shard_db.execute(
+                    select(*columns).where(model.id.in_(chunk)).order_by(model.id)
+                )).all()
+    return rows
+
+
+@router.get('/changes', response_model=CatalogChanges)
+async def get_changes(since: Optional[int] = Query(None, ge=0), session: AsyncSession = Depends(get_session)):
+    """
+    Sports and teams created or updated, and the ids of those deleted, after the `since` cursor. Without `since`
+    everything is returned. Apply the deletions before the created/updated rows.
+
+    The cursor is the id of the last catalog_event covered. The write routes record an event in the same transaction
+    as each change and sqlite hands out the ids under its write lock, so they follow commit order: a change committed
+    after a call always has a larger id than that call's cursor. The cursor is read before the rows, so a change
+    committing in between may be returned again on the next call, never skipped. The events of every shard are in the
+    default database, committed after the change (see src/db/shards.py), so that holds for the sharded leagues too.
+    """
+    cursor = (await session.execute(select(func.coalesce(func.max(CatalogEvent.id), 0)))).scalar()
+
+    if since is None:
+        sports = await all_rows(session, select(*SPORT_COLUMNS).order_by(Sport.id))
+        teams = await all_rows(session, select(*TEAM_COLUMNS).order_by(Team.id))
+        deleted = (await session.execute(select(Tombstone.entity, Tombstone.entity_id))).all()
+        return CatalogChanges(
+            cursor=cursor,
+            sports=sports,
+            teams=teams,
+            deleted=DeletedIds(
+                sports=[row.entity_id for row in deleted if row.entity == SPORT_ENTITY],
+                teams=[row.entity_id for row in deleted if row.entity == TEAM_ENTITY],
+            ),
+        )
+
+    if cursor <= since:
+        return CatalogChanges(cursor=since)
+
+    # Events are pruned after CHANGE_EVENTS_RETENTION_HOURS, the newest is always kept so ids keep increasing.
+    first_id = (await session.execute(select(func.min(CatalogEvent.id)))).scalar()
+    if since < first_id - 1:
+        raise HTTPGone(f'Changes after {since} are no longer kept, start over without since')
+
+    window = (CatalogEvent.id > since, CatalogEvent.id <= cursor)
+    changed = set((await session.execute(select(CatalogEvent.entity, CatalogEvent.entity_id).where(*window))).all())
+
+    sports = await changed_rows(session, SPORT_COLUMNS, Sport, SPORT_ENTITY, window, changed)
+    teams = await changed_rows(session, TEAM_COLUMNS, Team, TEAM_ENTITY, window, changed)
+
+    # Changed and now gone. An id deleted and created again is a changed row.
+    found = {(SPORT_ENTITY, row.id) for row in sports} | {(TEAM_ENTITY, row.id) for row in teams}
+    gone = changed - found
+
+    return CatalogChanges(
+        cursor=cursor,
+        sports=sports,
+        teams=teams,
+        deleted=DeletedIds(
+            sports=sorted(entity_id for entity, entity_id in gone if entity == SPORT_ENTITY),
+            teams=sorted(entity_id for entity, entity_id in gone if entity == TEAM_ENTITY),
+        ),
+    )
@@ -0,0 +1,95 @@
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from src.db.admission import Overloaded
+from src.db.db import admission, get_engine
+from src.db.models.event import CatalogEvent
+from src.events import CHANGE_EVENTS_REPLAY_LIMIT, ChangeBroker, ChangeEvent, Subscription, events_after
+from src.response_exception import HTTPGone, HTTPServiceUnavailable
+
+# Comment line sent when there have been no events for this long, keeps proxies from timing out the connection.
+KEEPALIVE_SECONDS = 15
+# How long clients wait before reconnecting after the stream drops.
+RETRY_MILLISECONDS = 3000
+
+router = APIRouter()
+
+
+async def read_events(last_id: int) -> List[ChangeEvent]:
+    """A page of the events after last_id."""
+    # Not get_session, that would hold its connection and admission slot for the life of the stream.
+    async with admission.slot(), get_engine().connect() as conn:
+        return await events_after(conn, last_id, CHANGE_EVENTS_REPLAY_LIMIT)
+
+
+async def event_stream(
+    broker: ChangeBroker, subscription: Subscription, replay: List[ChangeEvent], keepalive: float = KEEPALIVE_SECONDS
+) -> AsyncIterator[str]:
+    """
+    The replay, the first page of the events a reconnecting client missed, then the events published to subscription.
+    A full page is followed by the next, until a short one shows the replay has caught up with the events the
+    subscription gets from the broker.
+    """
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+
+        last_id = 0
+        while replay:
+            for event in replay:
+                yield event.sse()
+                last_id = event.id
+            if len(replay) < CHANGE_EVENTS_REPLAY_LIMIT:
+                break
+            try:
+                replay = await read_events(last_id)
+            except Overloaded:
+                # The client reconnects with the id of the last event it got and carries on from there.
+                return
+
+        while not (subscription.closed and subscription.queue.empty()):
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            # Events published while the replay was read are in both.
+            if event.id > last_id:
+                yield event.sse()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@router.get('/events', response_class=StreamingResponse)
+async def catalog_events(request: Request, last_event_id: Optional[int] = Header(None)):
+    """
+    Server-sent events stream of catalog changes. Each event is `created`, `updated` or `deleted` with data
+    {"entity": "sport" | "team", "id": <id>}. Reconnecting with Last-Event-ID replays the events missed since, or is a
+    410 if some of them are no longer kept, the client has to resync from GET /changes.
+    """
+    broker: ChangeBroker = request.app.state.change_broker
+    subscription = broker.subscribe()
+
+    replay = []
+    if last_event_id is not None:
+        try:
+            async with admission.slot(), get_engine().connect() as conn:
+                first_id = (await conn.execute(select(func.min(CatalogEvent.id)))).scalar()
+                replay = await events_after(conn, last_event_id, CHANGE_EVENTS_REPLAY_LIMIT)
+        except Overloaded:
+            broker.unsubscribe(subscription)
+            raise HTTPServiceUnavailable('Server busy', headers={'Retry-After': '1'})
+        # Pruned after CHANGE_EVENTS_RETENTION_HOURS, the newest event is always kept
+        if first_id is not None and last_event_id < first_id - 1:
+            broker.unsubscribe(subscription)
+            raise HTTPGone(f'Events after {last_event_id} are no longer kept, resync from /changes')
+
+    return StreamingResponse(
+        event_stream(broker, subscription, replay),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
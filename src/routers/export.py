@@ -0,0 +1,96 @@
+"""
+Streaming exports of the catalog.
+
+The newline delimited json exports have one json object per line. Rows are read from a server side cursor in chunks
+and written to the response as they arrive, so memory use stays constant and the first bytes go out before the whole
+catalog is read, however big it gets. The columnar (Arrow / Parquet) exports are protected, see src/db/columnar.py.
+
+With DATABASE_SHARDS the shards are read one after the other, each shard's ids are above the previous shard's so the
+exports stay in id order.
+"""
+import json
+import os
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from src.db.columnar import ColumnarFormat, MEDIA_TYPES, stream_table
+from src.db.db import get_session
+from src.db.shards import shard_sessions
+from src.db.models.sport import Sport
+from src.db.models.team import Team
+from src.deadline import DeadlineRoute
+from src.dependencies import protect_route
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 500))
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+# Tells nginx to pass the chunks on as they come rather than buffering the whole response.
+STREAMING_HEADERS = {'X-Accel-Buffering': 'no'}
+
+router = APIRouter(prefix='/export', route_class=DeadlineRoute)
+
+
+def sport_line(row) -> str:
+    return json.dumps({'name': row.name, 'league': row.league, 'id': row.id}) + '\n'
+
+
+def team_line(row) -> str:
+    team = {'name': row.name, 'city': row.city, 'sport_id': row.sport_id, 'id': row.id, 'sport': None}
+    if row.sport_name is not None:
+        team['sport'] = {'name': row.sport_name, 'league': row.sport_league, 'id': row.sport_id}
+    return json.dumps(team) + '\n'
+
+
+async def stream_lines(session: AsyncSession, query: Select, to_line) -> AsyncIterator[str]:
+    async for shard_db in shard_sessions(session):
+        result = await shard_db.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        async for rows in result.partitions(EXPORT_CHUNK_SIZE):
+            yield ''.join(to_line(row) for row in rows)
+
+
+@router.get('/sports.ndjson', response_class=StreamingResponse)
+async def export_sports(session: AsyncSession = Depends(get_session)):
+    """Every sport as a SportRead json object per line, ordered by id."""
+    query = select(Sport.id, Sport.name, Sport.league).order_by(Sport.id)
+    return StreamingResponse(
+        stream_lines(session, query, sport_line), media_type=NDJSON_MEDIA_TYPE, headers=STREAMING_HEADERS
+    )
+
+
+@router.get('/teams.ndjson', response_class=StreamingResponse)
+async def export_teams(session: AsyncSession = Depends(get_session)):
+    """Every team as a TeamReadWithSport json object per line, ordered by id. sport is null for teams without one."""
+    query = (
+        select(
+            Team.id, Team.name, Team.city, Team.sport_id,
+            Sport.name.label('sport_name'), Sport.league.label('sport_league'),
+        )
+        .join(Sport, Team.sport_id == Sport.id, isouter=True)
+        .order_by(Team.id)
+    )
+    return StreamingResponse(
+        stream_lines(session, query, team_line), media_type=NDJSON_MEDIA_TYPE, headers=STREAMING_HEADERS
+    )
+
+
+def columnar_response(session: AsyncSession, table: str, format: ColumnarFormat) -> StreamingResponse:
+    headers = {**STREAMING_HEADERS, 'Content-Disposition': f'attachment; filename="{table}.{format.value}"'}
+    return StreamingResponse(
+        stream_table(shard_sessions(session), table, format), media_type=MEDIA_TYPES[format], headers=headers
+    )
+
+
+@router.get('/sports.{format}', response_class=StreamingResponse, dependencies=[Depends(protect_route)])
+async def export_sports_columnar(format: ColumnarFormat, session: AsyncSession = Depends(get_session)):
+    """The sport table as an Arrow IPC stream or Parquet file, columns as SportRead."""
+    return columnar_response(session, 'sport', format)
+
+
+@router.get('/teams.{format}', response_class=StreamingResponse, dependencies=[Depends(protect_route)])
+async def export_teams_columnar(format: ColumnarFormat, session: AsyncSession = Depends(get_session)):
+    """The team table as an Arrow IPC stream or Parquet file, columns as TeamRead."""
+    return columnar_response(session, 'team', format)
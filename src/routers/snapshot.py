@@ -0,0 +1,114 @@
+"""
+Catalog GET routes answered from the in-memory CatalogSnapshot instead of the db.
+
+Included ahead of the db backed routes in src.main when CATALOG_SNAPSHOT is on, so these match first for GETs and the
+write routes still go to the db. Responses, ETags included, are the same as the db backed routes.
+"""
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import JSONResponse
+
+from src.ask import ask_response, sentiment_weights
+from src.db.models.related import SportReadWithTeams
+from src.db.models.team import Team, TeamReadWithSport
+from src.db.schema.answer import AnswerChoices, SENTIMENT_CHOICES_CALLABLE_MAP, Sentiment, SentimentWeights
+from src.db.schema.league import LeagueEnum
+from src.db.snapshot import CatalogSnapshot, get_current_snapshot
+from src.etag import etag_json_response
+from src.response_exception import HTTPExceptionNotFound, HTTPServiceUnavailable
+
+router = APIRouter()
+
+
+async def get_snapshot() -> AsyncIterator[CatalogSnapshot]:
+    snapshot = get_current_snapshot()
+    if snapshot is None:
+        raise HTTPServiceUnavailable('Catalog snapshot not loaded')
+    # Until the response is sent, a reload in the meantime doesn't unmap an artifact still being read
+    with snapshot.reading():
+        yield snapshot
+
+
+@router.get('/sports', response_model=List[SportReadWithTeams])
+async def get_sports(snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    return Response(content=snapshot.sports_json, media_type='application/json')
+
+
+@router.get('/sports/{sport_id}', response_model=SportReadWithTeams)
+async def get_sport(sport_id: int, request: Request, snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    sport = snapshot.sport(sport_id)
+
+    if sport is None:
+        raise HTTPExceptionNotFound(f'No sport found with id={sport_id}')
+
+    return etag_json_response(request, sport.dict_with_teams())
+
+
+@router.get('/teams', response_model=List[TeamReadWithSport])
+async def get_teams(snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    return Response(content=snapshot.teams_json, media_type='application/json')
+
+
+@router.get('/teams/{team_id}', response_model=TeamReadWithSport)
+async def get_team(team_id: int, request: Request, snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    team = snapshot.team(team_id)
+
+    if team is None or team.sport is None:
+        raise HTTPExceptionNotFound(f'No team found with id={team_id}')
+
+    return etag_json_response(request, team.dict_with_sport())
+
+
+@router.get('/teams/name/{team_name}', response_model=List[Team])
+async def get_team_by_name(team_name: str, snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    teams = snapshot.teams_by_name(team_name.strip().lower())
+
+    if not teams:
+        raise HTTPExceptionNotFound(f'No teams found with name={team_name}')
+
+    return JSONResponse([team.dict() for team in teams])
+
+
+@router.get('/teams/{team_id}/ask', response_model=Dict)
+async def team_will_they_win(team_id: int, sentiment: Optional[Sentiment] = None,
+                             snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    team = snapshot.team(team_id)
+
+    if team is None:
+        raise HTTPExceptionNotFound(f'No team found with id={team_id}')
+
+    answer = SENTIMENT_CHOICES_CALLABLE_MAP.get(sentiment, AnswerChoices.any)()
+
+    return {'team': team.dict(), 'answer': answer, 'requested_sentiment': sentiment}
+
+
+@router.get('/leagues/{league}/teams', response_model=List[Team])
+async def get_league_teams(league: LeagueEnum, request: Request, snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    sport = snapshot.league(league)
+
+    if sport is None:
+        raise HTTPExceptionNotFound(f'No sport found with league={league.value}')
+
+    return etag_json_response(request, [team.dict() for team in sport.teams])
+
+
+@router.get('/leagues/{league}/ask', response_model=List[Dict])
+async def league_will_they_win(league: LeagueEnum, sentiment: Optional[Sentiment] = None,
+                               weights: Optional[SentimentWeights] = Depends(sentiment_weights),
+                               snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    sport = snapshot.league(league)
+
+    if sport is None:
+        raise HTTPExceptionNotFound(f'No sport found with league={league.value}')
+
+    return ask_response(sport.teams, sentiment, weights)
+
+
+@router.get('/ask', response_model=List[Dict])
+async def catalog_will_they_win(sentiment: Optional[Sentiment] = None,
+                                weights: Optional[SentimentWeights] = Depends(sentiment_weights),
+                                snapshot: CatalogSnapshot = Depends(get_snapshot)):
+    """An answer for every team with a sport"""
+    teams = [team for team in snapshot.teams if team.sport is not None]
+    return ask_response(teams, sentiment, weights)
@@ -0,0 +1,50 @@
+"""
+Collapse concurrent identical calls into one.
+
+While a call for a key is in flight, other callers with the same key wait for it and get its result (or exception)
+instead of running their own, so a burst of identical requests costs one query. Nothing is kept once the call
+finishes, this is not a cache, the next call after it runs again.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _LeaderCancelled(Exception):
+    """The call being waited on was cancelled with its caller, the waiters run it themselves."""
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Return the result of fn(*args, **kwargs), or of the call for key already in flight."""
+        while key in self._calls:
+            self.shared += 1
+            try:
+                # Shielded so a waiter's cancellation doesn't cancel the call the others are waiting on.
+                return await asyncio.shield(self._calls[key])
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.calls += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(_LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            # Mark it retrieved, with no waiters asyncio would log it as never retrieved.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
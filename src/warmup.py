@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import configure_mappers
+
+from src.ratelimit import RATE_LIMIT_EXEMPT_CLIENT
+
+logger = logging.getLogger(__name__)
+
+WARMUP_RETRY_SECONDS = 5
+
+# Catalog routes requested once, in process, to run each query and response model. {sport_id} and {team_id} are
+# filled in with the first ids found, routes needing an id are skipped on an empty catalog.
+WARMUP_ROUTES = [
+    '/sports',
+    '/sports/{sport_id}',
+    '/teams',
+    '/teams/{team_id}',
+    '/teams/{team_id}/ask',
+]
+
+async def open_pool_connections(engine: AsyncEngine) -> int:
+    """Check out every connection the pool keeps, so they are opened now rather than on the first requests."""
+    size = engine.pool.size() if hasattr(engine.pool, 'size') else 0
+
+    connections = [await engine.connect() for _ in range(size)]
+    for conn in connections:
+        await conn.execute(text('SELECT 1'))
+    for conn in connections:
+        await conn.close()
+
+    return size
+
+
+async def get_json(client: AsyncClient, path: str):
+    response = await client.get(path)
+    response.raise_for_status()
+    return response.json()
+
+
+async def request_catalog_routes(app: FastAPI) -> None:
+    # From the client the rate limit lets through, every worker warming up at once would use up a shared bucket
+    transport = ASGITransport(app=app, client=RATE_LIMIT_EXEMPT_CLIENT)
+    async with AsyncClient(transport=transport, base_url='http://warmup') as client:
+        sports = await get_json(client, '/sports')
+        teams = await get_json(client, '/teams')
+
+        ids = {}
+        if sports:
+            ids['sport_id'] = sports[0]['id']
+        if teams:
+            ids['team_id'] = teams[0]['id']
+
+        for route in WARMUP_ROUTES:
+            try:
+                path = route.format(**ids)
+            except KeyError:
+                continue
+            response = await client.get(path)
+            response.raise_for_status()
+
+
+async def warmup(app: FastAPI, engine: AsyncEngine) -> None:
+    """
+    Do the work the first requests to a fresh worker would otherwise pay for: configure the sqlalchemy mappers, open
+    the pooled db connections, fill the in-memory caches and run every catalog query and response model once (which
+    also pulls the sqlite pages into the os cache). Sets app.state.ready when done.
+
+    Caches are filled by the async callables in app.state.warmup_hooks, each called with the app and the engine.
+    """
+    app.state.ready = False
+
+    configure_mappers()
+    connections = await open_pool_connections(engine)
+
+    for hook in getattr(app.state, 'warmup_hooks', []):
+        await hook(app, engine)
+
+    await request_catalog_routes(app)
+
+    app.state.ready = True
+    logger.info(f'warmup complete, {connections} db connections open')
+
+
+async def warmup_until_ready(app: FastAPI, engine: AsyncEngine) -> None:
+    """
+    Run warmup. If it fails (e.g. the db is not migrated yet) the worker still starts, not ready, and warmup is retried
+    in the background until it succeeds.
+    """
+    async def retry():
+        while not app.state.ready:
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+            try:
+                await warmup(app, engine)
+            except Exception:
+                logger.exception(f'warmup failed, retrying in {WARMUP_RETRY_SECONDS}s')
+
+    try:
+        await warmup(app, engine)
+    except Exception:
+        logger.exception(f'warmup failed, retrying in {WARMUP_RETRY_SECONDS}s')
+        app.state.warmup_task = asyncio.create_task(retry())
@@ -0,0 +1,15 @@
+import os
+
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    Gunicorn worker class running the app on uvicorn with the event loop and http parser picked explicitly rather
+    than uvicorn's 'auto' detection, so a missing uvloop/httptools fails loudly at boot instead of silently falling
+    back to the slower pure python implementations.
+    """
+    CONFIG_KWARGS = {
+        'loop': os.environ.get('UVICORN_LOOP', 'uvloop'),
+        'http': os.environ.get('UVICORN_HTTP', 'httptools'),
+    }
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from src.db import db
+from src.db.admission import AdmissionQueue, Overloaded
+from src.response_exception import HTTPServiceUnavailable
+
+
+@pytest.mark.asyncio
+class TestAdmissionQueue:
+
+    async def test_admits_up_to_limit(self):
+        admission = AdmissionQueue(limit=2, queue_size=0, timeout=1)
+        await admission.acquire()
+        await admission.acquire()
+
+        with pytest.raises(Overloaded):
+            await admission.acquire()
+
+        assert admission.stats() == {
+            'limit': 2, 'active': 2, 'queued': 0, 'admitted': 2, 'shed_queue_full': 1, 'shed_timeout': 0,
+        }
+
+    async def test_queued_admitted_on_release(self):
+        admission = AdmissionQueue(limit=1, queue_size=5, timeout=1)
+        await admission.acquire()
+
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.queued == 1
+
+        admission.release()
+        await waiter
+        assert admission.active == 1
+        assert admission.queued == 0
+        assert admission.admitted == 2
+
+        admission.release()
+        assert admission.active == 0
+
+    async def test_shed_after_timeout(self):
+        admission = AdmissionQueue(limit=1, queue_size=5, timeout=0.01)
+        await admission.acquire()
+
+        with pytest.raises(Overloaded):
+            await admission.acquire()
+
+        assert admission.shed_timeout == 1
+        assert admission.queued == 0
+
+    async def test_first_in_first_out(self):
+        admission = AdmissionQueue(limit=1, queue_size=5, timeout=1)
+        await admission.acquire()
+        order = []
+
+        async def request(n):
+            async with admission.slot():
+                order.append(n)
+
+        tasks = [asyncio.create_task(request(n)) for n in range(3)]
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*tasks)
+
+        assert order == [0, 1, 2]
+        assert admission.active == 0
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        admission = AdmissionQueue(limit=1, queue_size=5, timeout=1)
+        await admission.acquire()
+
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert admission.queued == 0
+        admission.release()
+        assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_get_session_sheds_with_503(monkeypatch):
+    monkeypatch.setattr(db, 'admission', AdmissionQueue(limit=0, queue_size=0, timeout=0))
+
+    with pytest.raises(HTTPServiceUnavailable) as e:
+        await db.get_session().__anext__()
+
+    assert e.value.headers == {'Retry-After': '1'}
+    assert db.admission.shed_queue_full == 1
+
+
+@pytest.mark.asyncio
+async def test_admission_stats_endpoint(async_client, protected_routes_enabled):
+    response = await async_client.get('/admission')
+    assert response.status_code == 200
+    assert set(response.json()) == {'limit', 'active', 'queued', 'admitted', 'shed_queue_full', 'shed_timeout'}
+
+
+@pytest.mark.asyncio
+async def test_admission_stats_protected(async_client):
+    response = await async_client.get('/admission')
+    assert response.status_code == 401
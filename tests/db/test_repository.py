@@ -0,0 +1,48 @@
+import pytest
+
+from src.db import repository
+from src.db.schema.league import LeagueEnum
+
+
+def test_sports_from_rows():
+    rows = [
+        (1, 'hockey', LeagueEnum.NHL, 1, 3, 'flames', 'calgary'),
+        (1, 'hockey', LeagueEnum.NHL, 1, 4, 'oilers', 'edmonton'),
+        (2, 'football', LeagueEnum.CFL, 2, None, None, None),
+    ]
+    sports = repository.sports_from_rows(rows)
+
+    assert [sport.dict_with_teams() for sport in sports] == [
+        {'name': 'hockey', 'league': LeagueEnum.NHL, 'id': 1, 'teams': [
+            {'name': 'flames', 'city': 'calgary', 'sport_id': 1, 'id': 3},
+            {'name': 'oilers', 'city': 'edmonton', 'sport_id': 1, 'id': 4},
+        ]},
+        {'name': 'football', 'league': LeagueEnum.CFL, 'id': 2, 'teams': []},
+    ]
+    assert [sport.version for sport in sports] == [1, 2]
+
+
+def test_teams_from_rows_share_sport():
+    rows = [
+        (3, 'flames', 'calgary', 1, 1, 'hockey', LeagueEnum.NHL),
+        (4, 'oilers', 'edmonton', 1, 2, 'hockey', LeagueEnum.NHL),
+    ]
+    flames, oilers = repository.teams_from_rows(rows)
+
+    assert flames.sport is oilers.sport
+    assert (flames.version, oilers.version) == (1, 2)
+    assert flames.dict_with_sport() == {
+        'name': 'flames', 'city': 'calgary', 'sport_id': 1, 'id': 3,
+        'sport': {'name': 'hockey', 'league': LeagueEnum.NHL, 'id': 1},
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_sports_matches_orm(db_session, sports_with_teams):
+    sports, sport_teams = sports_with_teams
+
+    records = await repository.get_sports(db_session)
+
+    assert sorted(s.id for s in records) == sorted(s.id for s in sports)
+    for record in records:
+        assert [t.id for t in record.teams] == sorted(t.id for t in sport_teams[record.id])
@@ -0,0 +1,226 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+from conftest import engine
+from src.db.artifact import CatalogArtifact, compile_artifact
+from src.db.schema.league import LeagueEnum
+from src.db.shards import SHARD_ID_BITS, ShardMap, dispose_shard_engines, parse_shards, shards
+from src.db.snapshot import load_snapshot
+from src.events import ChangeBroker
+
+SHARD_DB_NAME = 'willtheywinfastapi-test-shard.db'
+SHARD_DATABASE_URL = f'sqlite+aiosqlite:///{SHARD_DB_NAME}'
+
+
+def test_parse_shards():
+    assert parse_shards('') == {}
+    assert parse_shards('NHL,ahl=sqlite:///hockey.db; MLB=sqlite:///baseball.db') == {
+        LeagueEnum.NHL: 'sqlite:///hockey.db',
+        LeagueEnum.AHL: 'sqlite:///hockey.db',
+        LeagueEnum.MLB: 'sqlite:///baseball.db',
+    }
+
+
+def test_shard_map():
+    shard_map = ShardMap(parse_shards('NHL,AHL=sqlite:///hockey.db;MLB=sqlite:///baseball.db'))
+
+    assert shard_map.enabled
+    assert len(shard_map) == 3
+    assert [shard_map.for_league(league) for league in (LeagueEnum.NHL, LeagueEnum.AHL, LeagueEnum.MLB)] == [1, 1, 2]
+    assert shard_map.for_league(LeagueEnum.NFL) == 0
+    assert shard_map.for_id(5) == 0
+    assert shard_map.for_id((2 << SHARD_ID_BITS) + 5) == 2
+    assert shard_map.for_id(9 << SHARD_ID_BITS) == 0
+    assert not ShardMap({}).enabled
+
+
+@pytest.fixture
+def shard_db():
+    path = Path.cwd().joinpath(SHARD_DB_NAME)
+    if path.exists():
+        path.unlink()
+
+    config = Config('alembic.ini')
+    config.set_main_option('sqlalchemy.url', SHARD_DATABASE_URL)
+    command.upgrade(config, 'head')
+
+    yield
+
+    path.unlink()
+
+
+@pytest.fixture
+async def mlb_shard(db, shard_db, monkeypatch):
+    """The default test db plus a second shard holding MLB."""
+    monkeypatch.setattr(shards, 'urls', [None, SHARD_DATABASE_URL])
+    monkeypatch.setattr(shards, 'league_shards', {LeagueEnum.MLB: 1})
+    yield
+    await dispose_shard_engines()
+
+
+@pytest.mark.asyncio
+class TestShardedRoutes:
+
+    async def test_league_routed_to_shard(self, async_client, mlb_shard, protected_routes_enabled):
+        hockey = (await async_client.post('/sports', json={'name': 'hockey', 'league': 'NHL'})).json()
+        baseball = (await async_client.post('/sports', json={'name': 'baseball', 'league': 'MLB'})).json()
+        assert hockey['id'] == 1
+        assert baseball['id'] == (1 << SHARD_ID_BITS) + 1
+
+        flames = (await async_client.post('/teams', json={'name': 'flames', 'city': 'calgary',
+                                                           'sport_id': hockey['id']})).json()
+        jays = (await async_client.post('/teams', json={'name': 'blue jays', 'city': 'toronto',
+                                                         'sport_id': baseball['id']})).json()
+        assert flames['id'] == 1
+        assert jays['id'] == (1 << SHARD_ID_BITS) + 1
+
+        response = await async_client.get(f"/teams/{jays['id']}")
+        assert response.status_code == 200
+        assert response.json()['sport'] == baseball
+
+        response = await async_client.get(f"/sports/{baseball['id']}")
+        assert [team['id'] for team in response.json()['teams']] == [jays['id']]
+
+        response = await async_client.get(f"/teams/{jays['id']}/ask")
+        assert response.json()['team'] == jays
+
+    async def test_concurrent_creates(self, async_client, mlb_shard, protected_routes_enabled):
+        baseball = (await async_client.post('/sports', json={'name': 'baseball', 'league': 'MLB'})).json()
+
+        responses = await asyncio.gather(*(
+            async_client.post('/teams', json={'name': f'team {i}', 'city': 'toronto', 'sport_id': baseball['id']})
+            for i in range(10)
+        ))
+
+        assert [response.status_code for response in responses] == [201] * 10
+        ids = sorted(response.json()['id'] for response in responses)
+        assert ids == [(1 << SHARD_ID_BITS) + i for i in range(1, 11)]
+
+        response = await async_client.post('/teams', json={'name': 'team 0', 'city': 'toronto',
+                                                            'sport_id': baseball['id']})
+        assert response.status_code == 400
+        assert response.json()['detail'] == (
+            f"IntegrityError creating Team: {{'name': 'team 0', 'city': 'toronto', 'sport_id': {baseball['id']}}}"
+        )
+
+    async def test_catalog_routes_fan_out(self, async_client, mlb_shard, protected_routes_enabled):
+        for sport in ({'name': 'hockey', 'league': 'NHL'}, {'name': 'baseball', 'league': 'MLB'}):
+            sport_id = (await async_client.post('/sports', json=sport)).json()['id']
+            await async_client.post('/teams', json={'name': 'giants', 'city': 'somewhere', 'sport_id': sport_id})
+
+        sports = (await async_client.get('/sports')).json()
+        assert [sport['name'] for sport in sports] == ['hockey', 'baseball']
+        assert all(len(sport['teams']) == 1 for sport in sports)
+
+        teams = (await async_client.get('/teams')).json()
+        assert [team['sport']['name'] for team in teams] == ['hockey', 'baseball']
+
+        teams = (await async_client.get('/teams/name/giants')).json()
+        assert len(teams) == 2
+
+    async def test_moving_between_shards_rejected(self, async_client, mlb_shard, protected_routes_enabled):
+        hockey = (await async_client.post('/sports', json={'name': 'hockey', 'league': 'NHL'})).json()
+        baseball = (await async_client.post('/sports', json={'name': 'baseball', 'league': 'MLB'})).json()
+        team = (await async_client.post('/teams', json={'name': 'flames', 'city': 'calgary',
+                                                         'sport_id': hockey['id']})).json()
+
+        response = await async_client.put(f"/teams/{team['id']}", json={'name': 'flames', 'city': 'calgary',
+                                                                         'sport_id': baseball['id']})
+        assert response.status_code == 400
+
+        response = await async_client.put(f"/sports/{hockey['id']}", json={'name': 'hockey', 'league': 'MLB'})
+        assert response.status_code == 400
+
+    async def test_delete_on_shard(self, async_client, mlb_shard, protected_routes_enabled):
+        baseball = (await async_client.post('/sports', json={'name': 'baseball', 'league': 'MLB'})).json()
+
+        response = await async_client.delete(f"/sports/{baseball['id']}")
+        assert response.status_code == 200
+        assert (await async_client.get(f"/sports/{baseball['id']}")).status_code == 404
+
+    async def test_bulk_update_shard_fails(self, async_client, mlb_shard, protected_routes_enabled):
+        flames, jays = await create_catalog(async_client)
+        mets = (await async_client.post('/teams', json={'name': 'mets', 'city': 'new york',
+                                                         'sport_id': jays['sport_id']})).json()
+
+        # The MLB shard's part breaks the unique constraint, the default database's part is committed before it
+        response = await async_client.patch('/teams', json={'updates': [
+            {'id': flames['id'], 'name': 'flames'},
+            {'id': mets['id'], 'name': jays['name'], 'city': jays['city']},
+        ]})
+        assert response.json() == {'results': [
+            {'id': flames['id'], 'status': 'updated'}, {'id': mets['id'], 'status': 'failed'},
+        ]}
+        assert (await async_client.get(f"/teams/{flames['id']}")).json()['name'] == 'flames'
+        assert (await async_client.get(f"/teams/{mets['id']}")).json()['name'] == 'mets'
+
+
+async def create_catalog(async_client) -> tuple:
+    """A hockey team in the default database and a baseball team in the MLB shard."""
+    teams = []
+    for sport in ({'name': 'hockey', 'league': 'NHL'}, {'name': 'baseball', 'league': 'MLB'}):
+        sport_id = (await async_client.post('/sports', json=sport)).json()['id']
+        teams.append((await async_client.post('/teams', json={'name': 'giants', 'city': sport['name'],
+                                                               'sport_id': sport_id})).json())
+    return tuple(teams)
+
+
+@pytest.mark.asyncio
+class TestShardedChangeFeeds:
+
+    async def test_changes(self, async_client, mlb_shard, protected_routes_enabled):
+        flames, jays = await create_catalog(async_client)
+
+        changes = (await async_client.get('/changes')).json()
+        assert [team['id'] for team in changes['teams']] == [flames['id'], jays['id']]
+        assert [sport['id'] for sport in changes['sports']] == [flames['sport_id'], jays['sport_id']]
+
+        update_data = {'name': 'blue jays', 'city': 'toronto', 'sport_id': jays['sport_id']}
+        await async_client.put(f"/teams/{jays['id']}", json=update_data)
+        response = await async_client.get('/changes', params={'since': changes['cursor']})
+        assert response.json()['teams'] == [{**update_data, 'id': jays['id']}]
+
+        cursor = response.json()['cursor']
+        await async_client.delete(f"/teams/{jays['id']}")
+        response = await async_client.get('/changes', params={'since': cursor})
+        assert response.json()['deleted'] == {'sports': [], 'teams': [jays['id']]}
+        assert (await async_client.get('/changes')).json()['deleted']['teams'] == [jays['id']]
+
+    async def test_events(self, async_client, mlb_shard, protected_routes_enabled):
+        broker = ChangeBroker()
+        async with engine.connect() as conn:
+            await broker.poll_once(conn)
+        subscription = broker.subscribe()
+
+        flames, jays = await create_catalog(async_client)
+        await async_client.request('DELETE', '/teams', json={'ids': [jays['id']]})
+
+        async with engine.connect() as conn:
+            assert await broker.poll_once(conn) == 5
+        events = [subscription.queue.get_nowait() for _ in range(5)]
+        assert [(event.op, event.entity, event.entity_id) for event in events[2:]] == [
+            ('created', 'sport', jays['sport_id']), ('created', 'team', jays['id']), ('deleted', 'team', jays['id']),
+        ]
+
+    async def test_export_teams(self, async_client, mlb_shard, protected_routes_enabled):
+        flames, jays = await create_catalog(async_client)
+
+        response = await async_client.get('/export/teams.ndjson')
+        teams = [json.loads(line) for line in response.text.splitlines()]
+        assert [team['id'] for team in teams] == [flames['id'], jays['id']]
+        assert teams[1]['sport'] == {'name': 'baseball', 'league': 'MLB', 'id': jays['sport_id']}
+
+    async def test_snapshot_and_artifact(self, async_client, mlb_shard, protected_routes_enabled):
+        flames, jays = await create_catalog(async_client)
+
+        snapshot = await load_snapshot(engine)
+        artifact = CatalogArtifact(compile_artifact(snapshot))
+        for catalog in (snapshot, artifact):
+            assert [team.id for team in catalog.teams] == [flames['id'], jays['id']]
+            assert catalog.team(jays['id']).sport.league == LeagueEnum.MLB
+            assert [team.id for team in catalog.sport(jays['sport_id']).teams] == [jays['id']]
@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import engine
+from src.audit import audit_queue
+
+
+@pytest.mark.asyncio
+class TestAuditEndpoint:
+
+    async def test_protected(self, async_client, db):
+        response = await async_client.get('/audit')
+        assert response.status_code == 401
+
+    async def test_write_routes_audited(self, async_client, hockey, audited, protected_routes_enabled):
+        headers = {'X-Forwarded-For': '10.0.0.7'}
+        team = (await async_client.post(
+            '/teams', json={'name': 'flames', 'city': 'cow town', 'sport_id': hockey.id}, headers=headers
+        )).json()
+        await async_client.put(
+            f"/teams/{team['id']}", json={'name': 'flames', 'city': 'calgary', 'sport_id': hockey.id}, headers=headers
+        )
+        await async_client.post('/teams', json={'name': 'oilers', 'city': 'edmonton', 'sport_id': hockey.id})
+
+        # Nothing is written until the queue is flushed
+        response = await async_client.get('/audit')
+        assert response.json()['entries'] == []
+        await audit_queue.flush(engine)
+
+        response = await async_client.get('/audit', params={'entity': 'team', 'entity_id': team['id']})
+        assert response.status_code == 200
+        entries = response.json()['entries']
+        assert [entry['op'] for entry in entries] == ['updated', 'created']
+        assert all(entry['actor'] == '10.0.0.7' for entry in entries)
+        assert entries[0]['before']['city'] == 'cow town'
+        assert entries[0]['after']['city'] == 'calgary'
+
+        response = await async_client.get('/audit')
+        assert len(response.json()['entries']) == 3
+
+    async def test_pages(self, async_client, hockey, audited, protected_routes_enabled):
+        for name in ('a', 'b', 'c'):
+            await async_client.post('/teams', json={'name': name, 'city': 'x', 'sport_id': hockey.id})
+        await audit_queue.flush(engine)
+
+        page = (await async_client.get('/audit', params={'limit': 2})).json()
+        assert [entry['after']['name'] for entry in page['entries']] == ['c', 'b']
+        page = (await async_client.get('/audit', params={'limit': 2, 'before_id': page['next_before_id']})).json()
+        assert [entry['after']['name'] for entry in page['entries']] == ['a']
+        assert page['next_before_id'] is None
+
+    async def test_bad_entity(self, async_client, db, protected_routes_enabled):
+        response = await async_client.get('/audit', params={'entity': 'league'})
+        assert response.status_code == 422
@@ -0,0 +1,198 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import event, select
+
+from conftest import TEST_DB_NAME, engine
+from src.db.models.event import CatalogEvent
+from src.db.models.team import Team
+from src.db.models.tombstone import Tombstone
+
+
+async def team_rows():
+    async with engine.connect() as conn:
+        return {row.id: row for row in await conn.execute(select(Team.id, Team.name, Team.city, Team.sport_id))}
+
+
+async def catalog_events():
+    async with engine.connect() as conn:
+        return (await conn.execute(select(CatalogEvent.entity, CatalogEvent.entity_id, CatalogEvent.op))).all()
+
+
+@pytest.fixture
+def deleted_elsewhere():
+    """Call with a team id to have another worker delete it after the request's SELECT, before its first write."""
+    team_ids = []
+
+    def delete_team(conn, cursor, statement, parameters, context, executemany):
+        if team_ids and not statement.startswith('SELECT'):
+            with sqlite3.connect(TEST_DB_NAME) as other:
+                other.execute('DELETE FROM team WHERE id = ?', (team_ids.pop(),))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', delete_team)
+    yield team_ids.append
+    event.remove(engine.sync_engine, 'before_cursor_execute', delete_team)
+
+
+@pytest.mark.asyncio
+class TestBulkUpdate:
+
+    async def test_protected(self, async_client, db):
+        response = await async_client.patch('/teams', json={'updates': [{'id': 1, 'city': 'x'}]})
+        assert response.status_code == 401
+
+    async def test_update_teams(self, async_client, teams, statements, audited, protected_routes_enabled):
+        ids = [team.id for team in teams]
+        response = await async_client.patch('/teams', json={'updates': [
+            {'id': ids[0], 'city': 'New  Town'},
+            {'id': ids[1], 'city': 'new town'},
+            {'id': ids[2], 'name': 'Renamed'},
+            {'id': 999, 'city': 'nowhere'},
+        ]})
+
+        assert response.status_code == 200
+        assert response.json() == {'results': [
+            {'id': ids[0], 'status': 'updated'},
+            {'id': ids[1], 'status': 'updated'},
+            {'id': ids[2], 'status': 'updated'},
+            {'id': 999, 'status': 'not_found'},
+        ]}
+
+        # One SELECT, one UPDATE per distinct change, the events in one INSERT
+        assert statements == ['SELECT', 'UPDATE', 'UPDATE', 'INSERT']
+
+        rows = await team_rows()
+        assert rows[ids[0]].city == rows[ids[1]].city == 'new town'
+        assert rows[ids[2]].name == 'renamed'
+        assert rows[ids[2]].city == teams[2].city
+        assert [(entry['entity_id'], entry['op']) for entry in audited] == [(id, 'updated') for id in ids[:3]]
+        assert audited[2]['before']['name'] == teams[2].name
+        assert audited[2]['after']['name'] == 'renamed'
+
+    async def test_events_recorded(self, async_client, team, protected_routes_enabled):
+        await async_client.patch('/teams', json={'updates': [{'id': team.id, 'city': 'x'}]})
+
+        assert await catalog_events() == [('team', team.id, 'updated')]
+
+    async def test_unchanged(self, async_client, teams, statements, audited, protected_routes_enabled):
+        response = await async_client.patch('/teams', json={'updates': [
+            {'id': teams[0].id}, {'id': teams[1].id, 'name': teams[1].name.upper(), 'city': teams[1].city},
+        ]})
+
+        assert response.json() == {'results': [
+            {'id': teams[0].id, 'status': 'unchanged'}, {'id': teams[1].id, 'status': 'unchanged'},
+        ]}
+        # Nothing written, no events or audit entries
+        assert statements == ['SELECT']
+        assert await catalog_events() == []
+        assert not audited
+
+    async def test_deleted_before_update(
+        self, async_client, teams, audited, deleted_elsewhere, protected_routes_enabled
+    ):
+        deleted_elsewhere(teams[0].id)
+        response = await async_client.patch('/teams', json={'updates': [
+            {'id': teams[0].id, 'city': 'elsewhere'}, {'id': teams[1].id, 'city': 'elsewhere'},
+        ]})
+
+        assert response.json() == {'results': [
+            {'id': teams[0].id, 'status': 'not_found'}, {'id': teams[1].id, 'status': 'updated'},
+        ]}
+        assert await catalog_events() == [('team', teams[1].id, 'updated')]
+        assert [entry['entity_id'] for entry in audited] == [teams[1].id]
+
+    async def test_stale_if_match(self, async_client, team, protected_routes_enabled):
+        tag = (await async_client.get(f'/teams/{team.id}')).headers['etag']
+        await async_client.patch('/teams', json={'updates': [{'id': team.id, 'city': 'elsewhere'}]})
+
+        # An ETag from before the bulk update no longer matches
+        update_data = dict(name=team.name, city='vancouver', sport_id=team.sport_id)
+        response = await async_client.put(f'/teams/{team.id}', json=update_data, headers={'If-Match': tag})
+        assert response.status_code == 412
+
+    async def test_integrity_error_updates_nothing(self, async_client, teams, audited, protected_routes_enabled):
+        # The first two teams are both hockey teams, giving them the same name and city breaks the unique constraint
+        response = await async_client.patch('/teams', json={'updates': [
+            {'id': teams[0].id, 'name': 'same', 'city': 'same'},
+            {'id': teams[1].id, 'name': 'same', 'city': 'same'},
+            {'id': teams[2].id, 'city': 'elsewhere'},
+        ]})
+        assert response.status_code == 200
+        assert [result['status'] for result in response.json()['results']] == ['failed'] * 3
+        assert (await team_rows())[teams[2].id].city == teams[2].city
+        assert await catalog_events() == []
+        assert not audited
+
+    @pytest.mark.parametrize('updates', [
+        [{'id': 1, 'city': 'a'}, {'id': 1, 'city': 'b'}],
+    ])
+    async def test_duplicate_ids(self, updates, async_client, db, protected_routes_enabled):
+        response = await async_client.patch('/teams', json={'updates': updates})
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('updates', [
+        [],
+        [{'id': 1, 'name': None}],
+        [{'city': 'no id'}],
+    ])
+    async def test_invalid(self, updates, async_client, db, protected_routes_enabled):
+        response = await async_client.patch('/teams', json={'updates': updates})
+        assert response.status_code == 422
+
+    async def test_update_sports(self, async_client, hockey, baseball, protected_routes_enabled):
+        response = await async_client.patch('/sports', json={'updates': [
+            {'id': hockey.id, 'name': 'Ice Hockey'}, {'id': baseball.id, 'league': 'AHL'},
+        ]})
+        assert [result['status'] for result in response.json()['results']] == ['updated', 'updated']
+
+        response = await async_client.get(f'/sports/{hockey.id}')
+        assert response.json()['name'] == 'ice hockey'
+        response = await async_client.get(f'/sports/{baseball.id}')
+        assert response.json()['league'] == 'AHL'
+
+
+@pytest.mark.asyncio
+class TestBulkDelete:
+
+    async def test_delete_teams(self, async_client, teams, statements, audited, protected_routes_enabled):
+        ids = [teams[0].id, 999, teams[1].id, teams[0].id]
+        response = await async_client.request('DELETE', '/teams', json={'ids': ids})
+
+        assert response.status_code == 200
+        assert response.json() == {'results': [
+            {'id': teams[0].id, 'status': 'deleted'},
+            {'id': 999, 'status': 'not_found'},
+            {'id': teams[1].id, 'status': 'deleted'},
+        ]}
+        assert statements == ['SELECT', 'UPDATE', 'DELETE', 'INSERT', 'INSERT']
+        assert set(await team_rows()) == {team.id for team in teams[2:]}
+        assert [entry['op'] for entry in audited] == ['deleted', 'deleted']
+
+        async with engine.connect() as conn:
+            tombstones = (await conn.execute(select(Tombstone.entity_id).order_by(Tombstone.entity_id))).scalars()
+            assert list(tombstones) == sorted([teams[0].id, teams[1].id])
+
+    async def test_deleted_before_delete(
+        self, async_client, teams, audited, deleted_elsewhere, protected_routes_enabled
+    ):
+        deleted_elsewhere(teams[0].id)
+        response = await async_client.request('DELETE', '/teams', json={'ids': [teams[0].id, teams[1].id]})
+
+        assert response.json() == {'results': [
+            {'id': teams[0].id, 'status': 'not_found'}, {'id': teams[1].id, 'status': 'deleted'},
+        ]}
+        assert await catalog_events() == [('team', teams[1].id, 'deleted')]
+        assert [entry['entity_id'] for entry in audited] == [teams[1].id]
+        async with engine.connect() as conn:
+            assert list((await conn.execute(select(Tombstone.entity_id))).scalars()) == [teams[1].id]
+
+    async def test_delete_sports(self, async_client, hockey_with_teams, baseball, protected_routes_enabled):
+        hockey, teams = hockey_with_teams
+        response = await async_client.request('DELETE', '/sports', json={'ids': [hockey.id, baseball.id]})
+
+        assert response.json() == {'results': [
+            {'id': hockey.id, 'status': 'conflict'},
+            {'id': baseball.id, 'status': 'deleted'},
+        ]}
+        assert (await async_client.get(f'/sports/{hockey.id}')).status_code == 200
+        assert (await async_client.get(f'/sports/{baseball.id}')).status_code == 404
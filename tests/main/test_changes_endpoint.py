@@ -0,0 +1,130 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, func, select, update
+
+from src.db.models.event import CatalogEvent, UPDATED
+from src.db.models.team import Team
+from src.db.models.tombstone import TEAM_ENTITY
+from src.events import record_event
+
+
+@pytest.mark.asyncio
+class TestGetChanges:
+
+    async def test_none_exist(self, async_client, db):
+        response = await async_client.get('/changes')
+        assert response.status_code == 200
+        assert response.json() == {'cursor': 0, 'sports': [], 'teams': [], 'deleted': {'sports': [], 'teams': []}}
+
+    async def test_everything_without_since(self, async_client, sports_with_teams):
+        sports, sport_teams = sports_with_teams
+        teams = [team for teams in sport_teams.values() for team in teams]
+
+        response = await async_client.get('/changes')
+        assert response.status_code == 200
+        res_data = response.json()
+
+        assert res_data['cursor'] == 0
+        assert sorted(res_data['sports'], key=lambda s: s['id']) == sorted(
+            [s.dict() for s in sports], key=lambda s: s['id']
+        )
+        assert sorted(res_data['teams'], key=lambda t: t['id']) == sorted(
+            [t.dict() for t in teams], key=lambda t: t['id']
+        )
+
+    async def test_nothing_since_cursor(self, async_client, sports_with_teams):
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        response = await async_client.get('/changes', params={'since': cursor})
+        assert response.status_code == 200
+        assert response.json() == {
+            'cursor': cursor, 'sports': [], 'teams': [], 'deleted': {'sports': [], 'teams': []},
+        }
+
+    async def test_updated_since_cursor(self, async_client, db_session, teams):
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        team = teams[0]
+        team.city = 'somewhere else'
+        db_session.add(team)
+        record_event(db_session, UPDATED, TEAM_ENTITY, team.id)
+        await db_session.commit()
+
+        response = await async_client.get('/changes', params={'since': cursor})
+        res_data = response.json()
+        assert res_data['cursor'] > cursor
+        assert res_data['sports'] == []
+        assert res_data['teams'] == [team.dict()]
+
+    async def test_updated_by_put_route(self, async_client, team, protected_routes_enabled):
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        update_data = dict(name='Knuckleheads', city='Cow town', sport_id=team.sport_id)
+        response = await async_client.put(f'/teams/{team.id}', json=update_data)
+        assert response.status_code == 200
+
+        res_data = (await async_client.get('/changes', params={'since': cursor})).json()
+        assert [t['id'] for t in res_data['teams']] == [team.id]
+        assert res_data['teams'][0]['city'] == 'cow town'
+
+    async def test_created_by_post_route(self, async_client, hockey, protected_routes_enabled):
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        response = await async_client.post('/teams', json=dict(name='Flames', city='Cow town', sport_id=hockey.id))
+        assert response.status_code == 201
+
+        res_data = (await async_client.get('/changes', params={'since': cursor})).json()
+        assert res_data['teams'] == [response.json()]
+
+    async def test_deleted_by_delete_routes(self, async_client, teams, football, protected_routes_enabled):
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        assert (await async_client.delete(f'/teams/{teams[0].id}')).status_code == 200
+        assert (await async_client.delete(f'/sports/{football.id}')).status_code == 200
+
+        res_data = (await async_client.get('/changes', params={'since': cursor})).json()
+        assert res_data['cursor'] > cursor
+        assert res_data['deleted'] == {'sports': [football.id], 'teams': [teams[0].id]}
+        assert res_data['teams'] == []
+        assert res_data['sports'] == []
+
+    async def test_change_with_earlier_timestamp(self, async_client, db_session, teams):
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        # Committed after the call above, by a worker whose clock is behind
+        await db_session.execute(
+            update(Team).where(Team.id == teams[0].id).values(city='elsewhere', updated_at=datetime(2000, 1, 1))
+        )
+        record_event(db_session, UPDATED, TEAM_ENTITY, teams[0].id)
+        await db_session.commit()
+
+        res_data = (await async_client.get('/changes', params={'since': cursor})).json()
+        assert [(t['id'], t['city']) for t in res_data['teams']] == [(teams[0].id, 'elsewhere')]
+
+    async def test_deleted_and_changed_in_one_window(self, async_client, hockey, protected_routes_enabled):
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        flames = (await async_client.post('/teams', json=dict(name='Flames', city='Cow town', sport_id=hockey.id))).json()
+        oilers = (await async_client.post('/teams', json=dict(name='Oilers', city='Edmonton', sport_id=hockey.id))).json()
+        await async_client.put(f"/teams/{oilers['id']}", json=dict(name='Oilers', city='Edm', sport_id=hockey.id))
+        await async_client.delete(f"/teams/{flames['id']}")
+
+        res_data = (await async_client.get('/changes', params={'since': cursor})).json()
+        assert res_data['teams'] == [dict(oilers, city='edm')]
+        assert res_data['deleted'] == {'sports': [], 'teams': [flames['id']]}
+
+    async def test_pruned_since_gone(self, async_client, db_session, hockey, protected_routes_enabled):
+        for name in ('a', 'b', 'c'):
+            await async_client.post('/teams', json=dict(name=name, city='x', sport_id=hockey.id))
+        cursor = (await async_client.get('/changes')).json()['cursor']
+
+        # Pruning expired events keeps the newest
+        await db_session.execute(delete(CatalogEvent).where(
+            CatalogEvent.id < select(func.max(CatalogEvent.id)).scalar_subquery()
+        ).execution_options(synchronize_session=False))
+        await db_session.commit()
+
+        assert (await async_client.get('/changes', params={'since': 0})).status_code == 410
+        assert (await async_client.get('/changes', params={'since': cursor - 1})).status_code == 200
+        assert (await async_client.get('/changes', params={'since': cursor})).json()['cursor'] == cursor
@@ -0,0 +1,60 @@
+import pytest
+
+from src.daily import DAILY_PREDICTIONS_MAX_AGE, DailyPredictions, local_now
+
+
+@pytest.fixture(autouse=True)
+def daily_predictions(app):
+    app.state.daily_predictions = DailyPredictions()
+    return app.state.daily_predictions
+
+
+@pytest.mark.asyncio
+class TestDailyPrediction:
+
+    async def test_daily_prediction(self, async_client, team):
+        response = await async_client.get(f'/teams/{team.id}/ask/daily', params={'sentiment': 'positive'})
+        assert response.status_code == 200
+        res_data = response.json()
+        assert res_data['team'] == team.dict()
+        assert res_data['answer']['sentiment'] == 'positive'
+        assert res_data['requested_sentiment'] == 'positive'
+        assert res_data['date'] == local_now().date().isoformat()
+
+        again = await async_client.get(f'/teams/{team.id}/ask/daily', params={'sentiment': 'positive'})
+        assert again.content == response.content
+
+    async def test_cache_headers(self, async_client, team):
+        response = await async_client.get(f'/teams/{team.id}/ask/daily')
+        cache_control = response.headers['cache-control']
+        assert cache_control.startswith('public, max-age=')
+        assert 0 < int(cache_control.split('=')[1]) <= DAILY_PREDICTIONS_MAX_AGE
+
+        etag = response.headers['etag']
+        response = await async_client.get(f'/teams/{team.id}/ask/daily', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert response.headers['cache-control'].startswith('public, max-age=')
+
+    async def test_revalidated_after_edit(self, async_client, team, daily_predictions):
+        etag = (await async_client.get(f'/teams/{team.id}/ask/daily')).headers['etag']
+
+        # The team renamed, a cache revalidating its expired entry gets the new response
+        daily_predictions.put(local_now().date(), team.id, None, b'{"renamed":true}')
+        response = await async_client.get(f'/teams/{team.id}/ask/daily', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json() == {'renamed': True}
+        assert response.headers['etag'] != etag
+
+    async def test_not_found(self, async_client, db):
+        response = await async_client.get('/teams/999/ask/daily')
+        assert response.status_code == 404
+
+    async def test_served_from_predictions(self, async_client, team, daily_predictions):
+        day = local_now().date()
+        response = await async_client.get(f'/teams/{team.id}/ask/daily')
+        assert daily_predictions.get(day, team.id, None) == response.content
+
+        daily_predictions.put(day, team.id, None, b'{"cached":true}')
+        response = await async_client.get(f'/teams/{team.id}/ask/daily')
+        assert response.json() == {'cached': True}
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+from sqlalchemy import delete
+
+from conftest import engine
+from src.db.models.event import UPDATED, CatalogEvent
+from src.db.models.tombstone import TEAM_ENTITY
+from src.events import ChangeBroker, ChangeEvent, events_after, record_events
+from src.routers import events as events_router
+from src.routers.events import event_stream
+
+
+def parse(message: str) -> dict:
+    fields = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+@pytest.mark.asyncio
+class TestRecordedEvents:
+
+    async def test_create_update_delete_recorded(self, async_client, db_session, hockey, protected_routes_enabled):
+        response = await async_client.post('/teams', json=dict(name='flames', city='calgary', sport_id=hockey.id))
+        team_id = response.json()['id']
+        await async_client.put(f'/teams/{team_id}', json=dict(name='flames', city='cowtown', sport_id=hockey.id))
+        await async_client.delete(f'/teams/{team_id}')
+
+        events = await events_after(db_session, 0, 100)
+        assert [(e.op, e.entity, e.entity_id) for e in events] == [
+            ('created', 'team', team_id), ('updated', 'team', team_id), ('deleted', 'team', team_id),
+        ]
+
+    async def test_failed_create_not_recorded(self, async_client, db_session, hockey, protected_routes_enabled):
+        response = await async_client.post('/sports', json=dict(name=hockey.name, league=hockey.league))
+        assert response.status_code == 400
+
+        assert await events_after(db_session, 0, 100) == []
+
+    async def test_unauthorized_not_recorded(self, async_client, db_session, hockey):
+        response = await async_client.delete(f'/sports/{hockey.id}')
+        assert response.status_code == 401
+
+        assert await events_after(db_session, 0, 100) == []
+
+
+@pytest.mark.asyncio
+class TestChangeBroker:
+
+    async def test_poll_publishes_new_events(self, async_client, db, protected_routes_enabled):
+        broker = ChangeBroker()
+        async with engine.connect() as conn:
+            # The first poll only finds where to start from.
+            assert await broker.poll_once(conn) == 0
+
+        subscriptions = [broker.subscribe() for _ in range(3)]
+        response = await async_client.post('/sports', json=dict(name='hockey', league='NHL'))
+        sport_id = response.json()['id']
+
+        async with engine.connect() as conn:
+            assert await broker.poll_once(conn) == 1
+            assert await broker.poll_once(conn) == 0
+
+        for subscription in subscriptions:
+            event = subscription.queue.get_nowait()
+            assert (event.op, event.entity, event.entity_id) == ('created', 'sport', sport_id)
+            assert subscription.queue.empty()
+
+    async def test_slow_subscriber_dropped(self):
+        broker = ChangeBroker(queue_size=2)
+        slow = broker.subscribe()
+        fast = broker.subscribe()
+
+        for i in range(1, 4):
+            broker.publish(ChangeEvent(i, 'team', i, 'updated'))
+            fast.queue.get_nowait()
+
+        assert slow.closed
+        assert slow not in broker.subscriptions
+        assert fast in broker.subscriptions
+        assert broker.dropped == 1
+
+
+@pytest.mark.asyncio
+class TestEventStream:
+
+    async def test_replay_then_live(self):
+        broker = ChangeBroker()
+        subscription = broker.subscribe()
+        replay = [ChangeEvent(1, 'sport', 1, 'created'), ChangeEvent(2, 'team', 5, 'created')]
+        # Published while the replay was being read, must not be sent twice.
+        broker.publish(ChangeEvent(2, 'team', 5, 'created'))
+        broker.publish(ChangeEvent(3, 'team', 5, 'deleted'))
+
+        stream = event_stream(broker, subscription, replay)
+        assert (await stream.__anext__()).startswith('retry: ')
+        messages = [parse(await stream.__anext__()) for _ in range(3)]
+        await stream.aclose()
+
+        assert [(m['id'], m['event'], m['data']) for m in messages] == [
+            ('1', 'created', {'entity': 'sport', 'id': 1}),
+            ('2', 'created', {'entity': 'team', 'id': 5}),
+            ('3', 'deleted', {'entity': 'team', 'id': 5}),
+        ]
+        assert subscription not in broker.subscriptions
+
+    async def test_keepalive(self):
+        broker = ChangeBroker()
+        stream = event_stream(broker, broker.subscribe(), [], keepalive=0.01)
+        await stream.__anext__()
+        assert await stream.__anext__() == ': keepalive\n\n'
+        await stream.aclose()
+
+    async def test_ends_when_dropped(self):
+        broker = ChangeBroker(queue_size=1)
+        subscription = broker.subscribe()
+        broker.publish(ChangeEvent(1, 'sport', 1, 'created'))
+        broker.publish(ChangeEvent(2, 'sport', 1, 'updated'))
+
+        messages = [message async for message in event_stream(broker, subscription, [])]
+        assert len(messages) == 2
+        assert parse(messages[1])['id'] == '1'
+
+    async def test_replay_pages_until_caught_up(self, db, db_session, monkeypatch):
+        monkeypatch.setattr(events_router, 'CHANGE_EVENTS_REPLAY_LIMIT', 2)
+        monkeypatch.setattr(events_router, 'get_engine', lambda: engine)
+        await record_events(db_session, UPDATED, TEAM_ENTITY, [1, 2, 3, 4, 5])
+        await db_session.commit()
+
+        broker = ChangeBroker()
+        subscription = broker.subscribe()
+        broker.publish(ChangeEvent(6, 'team', 6, 'created'))
+
+        stream = event_stream(broker, subscription, await events_router.read_events(0))
+        await stream.__anext__()
+        messages = [parse(await stream.__anext__()) for _ in range(6)]
+        await stream.aclose()
+
+        # More missed events than one page holds, none of them skipped before the live ones
+        assert [m['id'] for m in messages] == ['1', '2', '3', '4', '5', '6']
+
+    async def test_pruned_replay_gone(self, async_client, db, db_session, monkeypatch):
+        monkeypatch.setattr(events_router, 'get_engine', lambda: engine)
+        await record_events(db_session, UPDATED, TEAM_ENTITY, [1, 2, 3])
+        await db_session.execute(delete(CatalogEvent).where(CatalogEvent.id < 3))
+        await db_session.commit()
+
+        response = await async_client.get('/events', headers={'Last-Event-ID': '1'})
+        assert response.status_code == 410
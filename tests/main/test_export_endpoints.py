@@ -0,0 +1,101 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.db import columnar
+from src.routers import export
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def read_table(content, format):
+    if format == 'arrow':
+        return pa.ipc.open_stream(content).read_all()
+    return pq.read_table(pa.BufferReader(content))
+
+
+@pytest.mark.asyncio
+class TestExportSports:
+
+    async def test_none_exist(self, async_client, db):
+        response = await async_client.get('/export/sports.ndjson')
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        assert response.text == ''
+
+    async def test_sports(self, async_client, sports):
+        response = await async_client.get('/export/sports.ndjson')
+        assert response.status_code == 200
+        assert ndjson(response) == [sport.dict() for sport in sorted(sports, key=lambda s: s.id)]
+
+
+@pytest.mark.asyncio
+class TestExportTeams:
+
+    async def test_none_exist(self, async_client, db):
+        response = await async_client.get('/export/teams.ndjson')
+        assert response.status_code == 200
+        assert response.text == ''
+
+    async def test_same_as_get_teams(self, async_client, teams):
+        response = await async_client.get('/export/teams.ndjson')
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+
+        teams_response = await async_client.get('/teams')
+        assert ndjson(response) == sorted(teams_response.json(), key=lambda t: t['id'])
+
+    async def test_streamed_in_chunks(self, async_client, teams, monkeypatch):
+        monkeypatch.setattr(export, 'EXPORT_CHUNK_SIZE', 1)
+
+        lines = []
+        async with async_client.stream('GET', '/export/teams.ndjson') as response:
+            async for line in response.aiter_lines():
+                lines.append(json.loads(line))
+
+        assert [team['id'] for team in lines] == sorted(team.id for team in teams)
+
+
+@pytest.mark.asyncio
+class TestExportColumnar:
+
+    @pytest.mark.parametrize('route', [
+        '/export/sports.arrow', '/export/sports.parquet', '/export/teams.arrow', '/export/teams.parquet',
+    ])
+    async def test_protected(self, route, async_client, db):
+        response = await async_client.get(route)
+        assert response.status_code == 401
+
+    async def test_unknown_format(self, async_client, db, protected_routes_enabled):
+        response = await async_client.get('/export/teams.csv')
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize('format', ['arrow', 'parquet'])
+    async def test_sports(self, format, async_client, sports, protected_routes_enabled):
+        response = await async_client.get(f'/export/sports.{format}')
+        assert response.status_code == 200
+        assert f'sport.{format}' in response.headers['content-disposition']
+
+        table = read_table(response.content, format)
+        assert table.column_names == ['name', 'league', 'id']
+        assert table.to_pylist() == [sport.dict() for sport in sorted(sports, key=lambda s: s.id)]
+
+    @pytest.mark.parametrize('format', ['arrow', 'parquet'])
+    async def test_teams(self, format, async_client, teams, protected_routes_enabled, monkeypatch):
+        monkeypatch.setattr(columnar, 'COLUMNAR_BATCH_SIZE', 3)
+
+        response = await async_client.get(f'/export/teams.{format}')
+        assert response.status_code == 200
+
+        table = read_table(response.content, format)
+        assert table.column_names == ['name', 'city', 'sport_id', 'id']
+        assert table.to_pylist() == [team.dict() for team in sorted(teams, key=lambda t: t.id)]
+
+    async def test_empty(self, async_client, db, protected_routes_enabled):
+        response = await async_client.get('/export/teams.arrow')
+        assert response.status_code == 200
+        assert read_table(response.content, 'arrow').num_rows == 0
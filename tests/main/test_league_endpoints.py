@@ -0,0 +1,118 @@
+import pytest
+
+from src import ask
+from src.db.models.team import Team, TeamCreate
+
+
+@pytest.mark.asyncio
+class TestLeagueTeams:
+
+    async def test_league_teams(self, async_client, sports_with_teams):
+        sports, sport_teams = sports_with_teams
+        hockey = sports[0]
+
+        response = await async_client.get('/leagues/NHL/teams')
+        assert response.status_code == 200
+        assert response.json() == [team.dict() for team in sport_teams[hockey.id]]
+        assert response.headers['etag']
+
+        response = await async_client.get('/leagues/NFL/teams')
+        assert response.status_code == 200
+        assert response.json() == []
+
+    async def test_league_not_found(self, async_client, sports_with_teams):
+        response = await async_client.get('/leagues/CFL/teams')
+        assert response.status_code == 404
+
+        response = await async_client.get('/leagues/XFL/teams')
+        assert response.status_code == 422
+
+    async def test_not_modified(self, async_client, sports_with_teams):
+        etag = (await async_client.get('/leagues/NHL/teams')).headers['etag']
+
+        response = await async_client.get('/leagues/NHL/teams', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert response.content == b''
+
+        response = await async_client.get('/leagues/NHL/teams', headers={'If-None-Match': f'"other", W/{etag}'})
+        assert response.status_code == 304
+
+    async def test_etag_per_league(self, async_client, db_session, sports_with_teams):
+        sports, _ = sports_with_teams
+        hockey_etag = (await async_client.get('/leagues/NHL/teams')).headers['etag']
+        baseball_etag = (await async_client.get('/leagues/MLB/teams')).headers['etag']
+        assert hockey_etag != baseball_etag
+
+        db_session.add(Team(**TeamCreate(name='Oilers', city='Deadmonton', sport_id=sports[0].id).dict()))
+        await db_session.commit()
+
+        response = await async_client.get('/leagues/NHL/teams', headers={'If-None-Match': hockey_etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] != hockey_etag
+
+        response = await async_client.get('/leagues/MLB/teams', headers={'If-None-Match': baseball_etag})
+        assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+class TestLeagueAsk:
+
+    async def test_ask(self, async_client, sports_with_teams):
+        sports, sport_teams = sports_with_teams
+
+        response = await async_client.get('/leagues/NHL/ask', params={'sentiment': 'negative'})
+        assert response.status_code == 200
+        res_data = response.json()
+        assert [answer['team'] for answer in res_data] == [team.dict() for team in sport_teams[sports[0].id]]
+        assert all(answer['answer']['sentiment'] == 'negative' for answer in res_data)
+        assert all(answer['requested_sentiment'] == 'negative' for answer in res_data)
+
+    async def test_ask_league_not_found(self, async_client, sports_with_teams):
+        response = await async_client.get('/leagues/CFL/ask')
+        assert response.status_code == 404
+
+    async def test_ask_weights(self, async_client, sports_with_teams):
+        response = await async_client.get('/leagues/NHL/ask', params={'neutral': 0, 'positive': 0})
+        assert response.status_code == 200
+        res_data = response.json()
+        assert len(res_data) == 2
+        assert all(answer['answer']['sentiment'] == 'negative' for answer in res_data)
+        assert all(answer['requested_sentiment'] is None for answer in res_data)
+
+    @pytest.mark.parametrize('params', [
+        {'negative': 0, 'neutral': 0, 'positive': 0},
+        {'sentiment': 'positive', 'negative': 1},
+    ])
+    async def test_ask_bad_weights(self, params, async_client, sports_with_teams):
+        response = await async_client.get('/leagues/NHL/ask', params=params)
+        assert response.status_code == 400
+
+    async def test_ask_negative_weight(self, async_client, sports_with_teams):
+        response = await async_client.get('/leagues/NHL/ask', params={'negative': -1})
+        assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+class TestCatalogAsk:
+
+    async def test_ask_every_team(self, async_client, sports_with_teams):
+        sports, sport_teams = sports_with_teams
+        teams = sorted((team for teams in sport_teams.values() for team in teams), key=lambda team: team.id)
+
+        response = await async_client.get('/ask', params={'sentiment': 'positive'})
+        assert response.status_code == 200
+        res_data = response.json()
+        assert [answer['team'] for answer in res_data] == [team.dict() for team in teams]
+        assert all(answer['answer']['sentiment'] == 'positive' for answer in res_data)
+
+    async def test_ask_empty_catalog(self, async_client, db):
+        response = await async_client.get('/ask')
+        assert response.status_code == 200
+        assert response.json() == []
+
+    async def test_ask_in_chunks(self, async_client, sports_with_teams, monkeypatch):
+        monkeypatch.setattr(ask, 'ASK_CHUNK_SIZE', 3)
+
+        response = await async_client.get('/ask')
+        assert len(response.json()) == 4
@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+from conftest import TEST_DB_NAME, engine
+from src.daily import DailyPredictions
+from src.db.models.event import UPDATED
+from src.db.models.tombstone import TEAM_ENTITY
+from src.events import record_event
+
+
+@pytest.fixture
+def selects():
+    """The SELECT statements run during the test, with their parameters."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT'):
+            executed.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def query_plan(statement: str, parameters) -> list:
+    with sqlite3.connect(TEST_DB_NAME) as conn:
+        return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+def scanned_tables(plan: list) -> set:
+    """The tables the plan reads in full, from its 'SCAN <table> ...' steps ('SCAN TABLE <table>' before sqlite 3.36)."""
+    words = [step.split() for step in plan if step.startswith('SCAN ') and 'CONSTANT ROW' not in step]
+    return {step[2] if step[1] == 'TABLE' else step[1] for step in words}
+
+
+# Each route and the tables it may scan. Only the routes returning a whole table may, and only that table.
+ROUTES = [
+    ('GET', '/sports', {'sport'}),
+    ('GET', '/sports/{sport_id}', set()),
+    ('GET', '/teams', {'team'}),
+    ('GET', '/teams/{team_id}', set()),
+    ('GET', '/teams/name/knuckleheads', set()),
+    ('GET', '/teams/{team_id}/ask', set()),
+    ('GET', '/teams/{team_id}/ask/daily', set()),
+    ('GET', '/leagues/NHL/teams', set()),
+    ('GET', '/leagues/NHL/ask', set()),
+    ('GET', '/ask', {'team'}),
+    ('GET', '/changes', {'sport', 'team', 'tombstone'}),
+    ('GET', '/changes?since=0', set()),
+    ('GET', '/audit', {'audit_log'}),
+    ('GET', '/audit?entity=team&entity_id={team_id}', set()),
+    ('GET', '/audit?actor=127.0.0.1', set()),
+    ('GET', '/export/sports.ndjson', {'sport'}),
+    ('GET', '/export/teams.ndjson', {'team'}),
+    ('PUT', '/teams/{team_id}', set()),
+    ('PATCH', '/teams', set()),
+    ('DELETE', '/sports', set()),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('method,url,may_scan', ROUTES)
+async def test_no_full_scans(
+    method, url, may_scan, app, async_client, db_session, hockey_with_teams, protected_routes_enabled, selects
+):
+    # Nothing cached from earlier tests, so every route queries
+    app.state.daily_predictions = DailyPredictions()
+    hockey, teams = hockey_with_teams
+    team = teams[0]
+    # A change for /changes to report
+    record_event(db_session, UPDATED, TEAM_ENTITY, team.id)
+    await db_session.commit()
+    bodies = {
+        'PUT': {'name': 'knuckleheads', 'city': 'elsewhere', 'sport_id': hockey.id},
+        'PATCH': {'updates': [{'id': team.id, 'city': 'elsewhere'}]},
+        'DELETE': {'ids': [hockey.id]},
+    }
+
+    response = await async_client.request(
+        method, url.format(sport_id=hockey.id, team_id=team.id), json=bodies.get(method)
+    )
+    assert response.status_code == 200, response.text
+    assert selects
+
+    for statement, parameters in selects:
+        plan = query_plan(statement, parameters)
+        assert scanned_tables(plan) <= may_scan, f'{statement}\n{plan}'
+        assert not any('TEMP B-TREE' in step for step in plan), f'{statement}\n{plan}'
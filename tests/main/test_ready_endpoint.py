@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import engine
+from src.warmup import warmup
+
+
+@pytest.mark.asyncio
+class TestReady:
+
+    async def test_not_ready_before_warmup(self, app, async_client):
+        app.state.ready = False
+        response = await async_client.get('/ready')
+        assert response.status_code == 503
+        assert response.json() == {'detail': 'Warming up'}
+
+    async def test_ping_ok_before_warmup(self, app, async_client):
+        app.state.ready = False
+        response = await async_client.get('/ping')
+        assert response.status_code == 200
+
+    async def test_ready_after_warmup_empty_db(self, app, async_client, db):
+        app.state.ready = False
+        await warmup(app, engine)
+
+        response = await async_client.get('/ready')
+        assert response.status_code == 200
+        assert response.json() == {'ready': True}
+
+    async def test_ready_after_warmup(self, app, async_client, sports_with_teams):
+        app.state.ready = False
+        await warmup(app, engine)
+
+        response = await async_client.get('/ready')
+        assert response.status_code == 200
+        assert response.json() == {'ready': True}
+
+    async def test_warmup_failure_not_ready(self, app, async_client):
+        app.state.ready = False
+        # no db fixture, so there are no tables to query
+        with pytest.raises(Exception):
+            await warmup(app, engine)
+
+        response = await async_client.get('/ready')
+        assert response.status_code == 503
@@ -0,0 +1,176 @@
+import pytest
+from httpx import AsyncClient
+
+from conftest import engine, override_get_session
+from src.db.artifact import CatalogArtifact, load_artifact, write_artifact
+from src.db.db import get_session
+from src.db.models.team import Team, TeamCreate
+from src.db.snapshot import get_current_snapshot, load_snapshot, reload_snapshot, set_current_snapshot
+from src.main import create_app
+
+
+@pytest.fixture
+async def snapshot_client():
+    app = create_app(catalog_snapshot=True)
+    app.dependency_overrides[get_session] = override_get_session
+    async with AsyncClient(app=app, base_url='http://') as client:
+        yield client
+    set_current_snapshot(None)
+
+
+@pytest.fixture
+def artifact_path(tmp_path):
+    return str(tmp_path.joinpath('catalog.bin'))
+
+
+@pytest.fixture
+async def artifact_client(artifact_path):
+    app = create_app(catalog_artifact=artifact_path)
+    app.dependency_overrides[get_session] = override_get_session
+    async with AsyncClient(app=app, base_url='http://') as client:
+        yield client
+    set_current_snapshot(None)
+
+
+async def build_and_load_artifact(path):
+    write_artifact(await load_snapshot(engine), path)
+    await load_artifact(path)
+
+
+def sort_by_id(data):
+    if isinstance(data, list):
+        data.sort(key=lambda d: d['id'])
+        for d in data:
+            if 'teams' in d:
+                d['teams'].sort(key=lambda t: t['id'])
+    return data
+
+
+@pytest.mark.asyncio
+class TestSnapshotEndpoints:
+
+    async def test_not_loaded(self, snapshot_client):
+        response = await snapshot_client.get('/sports')
+        assert response.status_code == 503
+
+    @pytest.mark.parametrize('route', [
+        '/sports',
+        '/sports/{sport_id}',
+        '/sports/999',
+        '/teams',
+        '/teams/{team_id}',
+        '/teams/999',
+        '/teams/name/flames',
+        '/teams/name/%20FLAMES%20',
+        '/teams/name/nope',
+        '/leagues/NHL/teams',
+        '/leagues/NFL/teams',
+        '/leagues/CFL/teams',
+    ])
+    async def test_same_as_db(self, route, snapshot_client, async_client, sports_with_teams):
+        sports, sport_teams = sports_with_teams
+        await reload_snapshot(engine)
+
+        path = route.format(sport_id=sports[0].id, team_id=sport_teams[sports[0].id][0].id)
+        db_response = await async_client.get(path)
+        snapshot_response = await snapshot_client.get(path)
+
+        assert snapshot_response.status_code == db_response.status_code
+        assert sort_by_id(snapshot_response.json()) == sort_by_id(db_response.json())
+        assert snapshot_response.headers.get('etag') == db_response.headers.get('etag')
+
+    async def test_ask(self, snapshot_client, team):
+        await reload_snapshot(engine)
+
+        response = await snapshot_client.get(f'/teams/{team.id}/ask', params={'sentiment': 'positive'})
+        assert response.status_code == 200
+        res_data = response.json()
+        assert res_data['team'] == team.dict()
+        assert res_data['answer']['sentiment'] == 'positive'
+
+    async def test_ask_catalog(self, snapshot_client, sports_with_teams):
+        await reload_snapshot(engine)
+
+        response = await snapshot_client.get('/ask', params={'sentiment': 'neutral'})
+        assert response.status_code == 200
+        res_data = response.json()
+        assert len(res_data) == 4
+        assert all(answer['answer']['sentiment'] == 'neutral' for answer in res_data)
+
+        response = await snapshot_client.get('/leagues/NHL/ask')
+        assert len(response.json()) == 2
+
+    async def test_reload_swaps_snapshot(self, snapshot_client, db_session, team):
+        await reload_snapshot(engine)
+        before = get_current_snapshot()
+
+        new_team = Team(**TeamCreate(name='Flames', city='Cow town', sport_id=team.sport_id).dict())
+        db_session.add(new_team)
+        await db_session.commit()
+
+        response = await snapshot_client.get('/teams/name/flames')
+        assert response.status_code == 404
+
+        await reload_snapshot(engine)
+        assert get_current_snapshot() is not before
+        assert before.teams_by_name('flames') == ()
+
+        response = await snapshot_client.get('/teams/name/flames')
+        assert response.status_code == 200
+        assert [t['id'] for t in response.json()] == [new_team.id]
+
+
+@pytest.mark.asyncio
+class TestArtifactEndpoints:
+
+    @pytest.mark.parametrize('route', [
+        '/sports',
+        '/sports/{sport_id}',
+        '/sports/999',
+        '/teams',
+        '/teams/{team_id}',
+        '/teams/999',
+        '/teams/name/flames',
+        '/teams/name/taranta',
+        '/teams/name/%20FLAMES%20',
+        '/leagues/NHL/teams',
+        '/leagues/NFL/teams',
+        '/leagues/CFL/teams',
+    ])
+    async def test_same_as_db(self, route, artifact_client, artifact_path, async_client, sports_with_teams):
+        sports, sport_teams = sports_with_teams
+        await build_and_load_artifact(artifact_path)
+        assert isinstance(get_current_snapshot(), CatalogArtifact)
+
+        path = route.format(sport_id=sports[0].id, team_id=sport_teams[sports[0].id][0].id)
+        db_response = await async_client.get(path)
+        artifact_response = await artifact_client.get(path)
+
+        assert artifact_response.status_code == db_response.status_code
+        assert sort_by_id(artifact_response.json()) == sort_by_id(db_response.json())
+        assert artifact_response.headers.get('etag') == db_response.headers.get('etag')
+
+    async def test_empty_catalog(self, artifact_client, artifact_path, db):
+        await build_and_load_artifact(artifact_path)
+
+        assert (await artifact_client.get('/sports')).json() == []
+        assert (await artifact_client.get('/teams')).json() == []
+        assert (await artifact_client.get('/teams/1')).status_code == 404
+        assert (await artifact_client.get('/teams/name/flames')).status_code == 404
+
+    async def test_reload_unmaps_previous(self, artifact_client, artifact_path, team):
+        await build_and_load_artifact(artifact_path)
+        first = get_current_snapshot()
+
+        # A request still reading the first artifact keeps it mapped through the reload
+        with first.reading():
+            await build_and_load_artifact(artifact_path)
+            assert first.team(team.id).name == team.name
+        with pytest.raises(ValueError):
+            first.team(team.id)
+
+        second = get_current_snapshot()
+        await build_and_load_artifact(artifact_path)
+        with pytest.raises(ValueError):
+            second.team(team.id)
+        assert (await artifact_client.get(f'/teams/{team.id}')).status_code == 200
@@ -1,7 +1,11 @@
 from typing import Dict, List
 
+import sqlite3
+
 import pytest
+from sqlalchemy import event
 
+from conftest import TEST_DB_NAME, engine
 from src.db.models.sport import Sport
 from src.db.schema.league import LeagueEnum
 
@@ -117,6 +121,14 @@ class TestCreateSport():
         # assert res_data.pop('id')
         # assert res_data == {'name': sport_dict['name'].lower(), 'league': sport_dict['league']}
 
+    async def test_create_queries(self, async_client, db, statements, protected_routes_enabled):
+        response = await async_client.post('/sports', json=dict(name='Hockey', league=LeagueEnum.NHL))
+
+        assert response.status_code == 201
+        assert response.json() == dict(id=1, name='hockey', league=LeagueEnum.NHL)
+        # The sport and its change event, the sport isn't read back
+        assert statements == ['INSERT', 'INSERT']
+
 
 @pytest.mark.asyncio
 class TestGetSport():
@@ -281,6 +293,71 @@ class TestUpdateSport():
         # assert response.status_code == 200
         # assert response.json() == expected_data
 
+    async def test_update_queries(self, async_client, hockey, statements, protected_routes_enabled):
+        response = await async_client.put(f'/sports/{hockey.id}', json=dict(name='Ice Hockey', league=LeagueEnum.NHL))
+
+        assert response.status_code == 200
+        assert response.json() == dict(id=hockey.id, name='ice hockey', league=LeagueEnum.NHL)
+        # Loading the sport, its change event and the update, the sport isn't read back
+        assert statements == ['SELECT', 'INSERT', 'UPDATE']
+
+    async def test_if_match(self, async_client, hockey, protected_routes_enabled):
+        tag = (await async_client.get(f'/sports/{hockey.id}')).headers['etag']
+
+        update_data = dict(name='Ice Hockey', league=LeagueEnum.NHL)
+        response = await async_client.put(f'/sports/{hockey.id}', json=update_data, headers={'If-Match': tag})
+        assert response.status_code == 200
+        assert (await async_client.get(f'/sports/{hockey.id}')).headers['etag'] != tag
+
+        # The ETag from before the update is stale
+        response = await async_client.put(f'/sports/{hockey.id}', json=dict(name='Hockey', league=LeagueEnum.NHL),
+                                          headers={'If-Match': tag})
+        assert response.status_code == 412
+        assert response.json() == {'detail': f'Sport id={hockey.id} has changed since the ETag in If-Match'}
+        assert (await async_client.get(f'/sports/{hockey.id}')).json()['name'] == 'ice hockey'
+
+        response = await async_client.put(f'/sports/{hockey.id}', json=dict(name='Hockey', league=LeagueEnum.NHL),
+                                          headers={'If-Match': '*'})
+        assert response.status_code == 200
+
+    async def test_if_match_teams_changed(self, async_client, hockey_with_teams, protected_routes_enabled):
+        hockey, teams = hockey_with_teams
+        tag = (await async_client.get(f'/sports/{hockey.id}')).headers['etag']
+
+        # Only a team changes, the sport's row version stays the same but the response it gave the ETag of doesn't
+        team_data = dict(name='renamed', city=teams[0].city, sport_id=hockey.id)
+        assert (await async_client.put(f'/teams/{teams[0].id}', json=team_data)).status_code == 200
+        response = await async_client.get(f'/sports/{hockey.id}', headers={'If-None-Match': tag})
+        assert response.status_code == 200
+        current_tag = response.headers['etag']
+
+        update_data = dict(name='Ice Hockey', league=LeagueEnum.NHL)
+        response = await async_client.put(f'/sports/{hockey.id}', json=update_data, headers={'If-Match': tag})
+        assert response.status_code == 412
+
+        response = await async_client.put(f'/sports/{hockey.id}', json=update_data, headers={'If-Match': current_tag})
+        assert response.status_code == 200
+
+    async def test_concurrent_update(self, async_client, hockey, protected_routes_enabled):
+        updated = []
+
+        def update_elsewhere(conn, cursor, statement, parameters, context, executemany):
+            # Another worker updates the sport after this request loaded it, before it writes
+            if not updated and not statement.startswith('SELECT'):
+                updated.append(statement)
+                with sqlite3.connect(TEST_DB_NAME) as other:
+                    other.execute("UPDATE sport SET name = 'other', version = version + 1")
+
+        event.listen(engine.sync_engine, 'before_cursor_execute', update_elsewhere)
+        try:
+            response = await async_client.put(f'/sports/{hockey.id}', json=dict(name='Ice Hockey', league=LeagueEnum.NHL))
+        finally:
+            event.remove(engine.sync_engine, 'before_cursor_execute', update_elsewhere)
+
+        assert response.status_code == 412
+        assert response.json() == {'detail': f'Sport id={hockey.id} was changed by another request'}
+        assert (await async_client.get(f'/sports/{hockey.id}')).json()['name'] == 'other'
+
 
 @pytest.mark.asyncio
 class TestDeleteSport():
@@ -1,9 +1,13 @@
+import asyncio
 from typing import Dict, List
 
 import pytest
 
+from sqlalchemy import event
 from sqlmodel import select
 
+from conftest import engine
+
 from src.db.models.team import Team
 from src.db.models.sport import Sport, SportCreate
 from src.db.schema.answer import Answer, AnswerChoices, Sentiment
@@ -141,6 +145,16 @@ class TestCreateTeam():
         # assert res_data.pop('sport_id') == team_dict.pop('sport_id')
         # assert res_data == {k: v.lower() for k, v in team_dict.items()}
 
+    async def test_create_queries(self, async_client, hockey, statements, protected_routes_enabled):
+        response = await async_client.post('/teams', json=dict(name='Canucks', city='Vancouver', sport_id=hockey.id))
+
+        assert response.status_code == 201
+        res_data = response.json()
+        assert res_data.pop('id')
+        assert res_data == dict(name='canucks', city='vancouver', sport_id=hockey.id)
+        # The team and its change event, the team isn't read back
+        assert statements == ['INSERT', 'INSERT']
+
 
 @pytest.mark.asyncio
 class TestGetTeam():
@@ -227,6 +241,25 @@ class TestGetTeams:
 
         assert response.json() == teams_list
 
+    async def test_concurrent_requests_share_query(self, async_client, teams):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, 'before_cursor_execute', count)
+        try:
+            expected = (await async_client.get('/teams')).json()
+            single_request_statements = len(statements)
+            statements.clear()
+
+            responses = await asyncio.gather(*(async_client.get('/teams') for _ in range(10)))
+        finally:
+            event.remove(engine.sync_engine, 'before_cursor_execute', count)
+
+        assert all(response.json() == expected for response in responses)
+        assert len(statements) == single_request_statements
+
 
 @pytest.mark.asyncio
 class TestUpdateTeam():
@@ -321,6 +354,32 @@ class TestUpdateTeam():
         # assert response.status_code == 200
         # assert response.json() == expected_data
 
+    async def test_update_queries(self, async_client, team, statements, protected_routes_enabled):
+        update_data = dict(name='Canucks', city='Vancouver', sport_id=team.sport_id)
+        response = await async_client.put(f'/teams/{team.id}', json=update_data)
+
+        assert response.status_code == 200
+        assert response.json() == dict(id=team.id, name='canucks', city='vancouver', sport_id=team.sport_id)
+        # Loading the team, its change event and the update, the team isn't read back
+        assert statements == ['SELECT', 'INSERT', 'UPDATE']
+
+    async def test_if_match(self, async_client, team, protected_routes_enabled):
+        tag = (await async_client.get(f'/teams/{team.id}')).headers['etag']
+
+        update_data = dict(name='Canucks', city='Vancouver', sport_id=team.sport_id)
+        response = await async_client.put(f'/teams/{team.id}', json=update_data, headers={'If-Match': tag})
+        assert response.status_code == 200
+        current_tag = (await async_client.get(f'/teams/{team.id}')).headers['etag']
+        assert current_tag != tag
+
+        # The ETag from before the update is stale, and a weak one never matches
+        for stale in (tag, f'W/{current_tag}'):
+            response = await async_client.put(f'/teams/{team.id}', json=dict(update_data, city='Victoria'),
+                                              headers={'If-Match': stale})
+            assert response.status_code == 412
+            assert response.json() == {'detail': f'Team id={team.id} has changed since the ETag in If-Match'}
+        assert (await async_client.get(f'/teams/{team.id}')).json()['city'] == 'vancouver'
+
 
 @pytest.mark.asyncio
 class TestDeleteTeam():
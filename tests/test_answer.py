@@ -1,6 +1,6 @@
 import pytest
 
-from src.db.schema.answer import Answer, AnswerChoices, Sentiment
+from src.db.schema.answer import Answer, AnswerChoices, SENTIMENT_WEIGHTS, Sentiment, SentimentWeights
 
 
 class TestAnswerChoices():
@@ -65,3 +65,37 @@ class TestAnswerChoices():
         answer = AnswerChoices.any()
         assert answer in AnswerChoices.ANSWERS_ANY
         assert answer.text in AnswerChoices._PHRASES_ANY
+
+    def test_any_weighted(self):
+        answer = AnswerChoices.any(SentimentWeights(negative=0, neutral=0, positive=1))
+        assert answer in AnswerChoices.ANSWERS_POSITIVE
+
+
+class TestDraw():
+
+    def test_draw(self):
+        answers = AnswerChoices.draw(50)
+        assert len(answers) == 50
+        assert all(answer in AnswerChoices.ANSWERS_ANY for answer in answers)
+
+    @pytest.mark.parametrize('sentiment', list(Sentiment))
+    def test_draw_sentiment(self, sentiment):
+        answers = AnswerChoices.draw(200, SENTIMENT_WEIGHTS[sentiment])
+        assert {answer.sentiment for answer in answers} == {sentiment}
+
+    def test_draw_weights_are_sentiment_shares(self):
+        answers = AnswerChoices.draw(20000, SentimentWeights(negative=1, neutral=0, positive=3))
+        positive = sum(answer.sentiment == Sentiment.POSITIVE for answer in answers)
+
+        assert all(answer.sentiment != Sentiment.NEUTRAL for answer in answers)
+        assert 0.7 < positive / len(answers) < 0.8
+
+    def test_draw_population(self):
+        texts = [answer.text for answer in AnswerChoices.ANSWERS_ANY]
+        drawn = AnswerChoices.draw(100, SENTIMENT_WEIGHTS[Sentiment.NEUTRAL], population=texts)
+        assert set(drawn) <= set(AnswerChoices._PHRASES_NEUTRAL)
+
+    @pytest.mark.parametrize('weights', [SentimentWeights(0, 0, 0), SentimentWeights(-1, 1, 1)])
+    def test_bad_weights(self, weights):
+        with pytest.raises(ValueError):
+            AnswerChoices.draw(1, weights)
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import select
+
+from conftest import engine
+from src.audit import AuditQueue, actor
+from src.db.models.audit import AuditLog
+from src.db.models.sport import Sport
+from src.db.models.team import Team, TeamCreate
+from src.db.schema.league import LeagueEnum
+
+
+@pytest.mark.asyncio
+class TestCapture:
+
+    async def test_create(self, db, db_session, audited):
+        token = actor.set('10.0.0.1')
+        try:
+            sport = Sport(name='hockey', league=LeagueEnum.NHL)
+            db_session.add(sport)
+            await db_session.flush()
+            assert not audited
+            await db_session.commit()
+        finally:
+            actor.reset(token)
+
+        [entry] = audited
+        assert entry['entity'] == 'sport'
+        assert entry['entity_id'] == sport.id
+        assert entry['op'] == 'created'
+        assert entry['actor'] == '10.0.0.1'
+        assert entry['before'] is None
+        assert entry['after'] == {'name': 'hockey', 'league': 'NHL', 'id': sport.id}
+
+    async def test_update(self, db_session, team, audited):
+        team.city = 'calgary'
+        db_session.add(team)
+        await db_session.commit()
+
+        [entry] = audited
+        assert entry['op'] == 'updated'
+        assert entry['before']['city'] == 'rain city'
+        assert entry['after']['city'] == 'calgary'
+        assert entry['before']['name'] == entry['after']['name'] == team.name
+        assert entry['actor'] is None
+
+    async def test_delete(self, db_session, team, audited):
+        await db_session.delete(team)
+        await db_session.commit()
+
+        [entry] = audited
+        assert entry['op'] == 'deleted'
+        assert entry['before']['id'] == team.id
+        assert entry['after'] is None
+
+    async def test_rollback_discards(self, db_session, hockey, audited):
+        db_session.add(Team(**TeamCreate(name='oilers', city='edmonton', sport_id=hockey.id).dict()))
+        await db_session.flush()
+        await db_session.rollback()
+
+        await db_session.commit()
+        assert not audited
+
+
+@pytest.mark.asyncio
+class TestAuditQueue:
+
+    async def test_flush_in_batches(self, db):
+        queue = AuditQueue()
+        queue.put([
+            {'entity': 'team', 'entity_id': n, 'op': 'created', 'actor': None, 'before': None, 'after': {'id': n}}
+            for n in range(5)
+        ])
+
+        assert await queue.flush(engine, batch_size=2) == 5
+        assert queue.written == 5
+        assert not queue.entries
+
+        async with engine.connect() as conn:
+            rows = (await conn.execute(select(AuditLog.entity_id, AuditLog.after).order_by(AuditLog.id))).all()
+        assert rows == [(n, {'id': n}) for n in range(5)]
+
+    async def test_full_queue_drops_oldest(self):
+        queue = AuditQueue(maxlen=3)
+        queue.put([{'entity_id': n} for n in range(5)])
+
+        assert queue.dropped == 2
+        assert [entry['entity_id'] for entry in queue.entries] == [2, 3, 4]
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from conftest import engine
+from src.daily import (
+    DAILY_PREDICTIONS_MAX_AGE, DailyPredictions, SENTIMENTS, cache_max_age, render_prediction, seconds_until_midnight,
+)
+from src.db.models.event import UPDATED
+from src.db.models.tombstone import SPORT_ENTITY, TEAM_ENTITY
+from src.db.schema.answer import AnswerChoices, Sentiment
+from src.events import ChangeBroker, ChangeEvent
+
+DAY = date(2026, 10, 19)
+TEAM = {'name': 'flames', 'city': 'cow town', 'sport_id': 1, 'id': 1}
+
+
+@pytest.mark.parametrize('at,seconds', [
+    (datetime(2026, 10, 19, 0, 0, tzinfo=timezone.utc), 24 * 3600),
+    (datetime(2026, 10, 19, 23, 59, 30, tzinfo=timezone.utc), 30),
+    (datetime(2026, 10, 19, 23, 59, 59, 500000, tzinfo=timezone.utc), 1),
+    # The clocks go back an hour that night, the day is 25 hours long
+    (datetime(2026, 11, 1, 0, 0, tzinfo=ZoneInfo('America/Vancouver')), 25 * 3600),
+])
+def test_seconds_until_midnight(at, seconds):
+    assert seconds_until_midnight(at) == seconds
+
+
+def test_cache_max_age():
+    assert cache_max_age(datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)) == DAILY_PREDICTIONS_MAX_AGE
+    # Never cached past midnight, when the answer changes
+    assert cache_max_age(datetime(2026, 10, 19, 23, 59, 59, tzinfo=timezone.utc)) == 1
+
+
+class TestDailyAnswer:
+
+    @pytest.mark.parametrize('sentiment', SENTIMENTS)
+    def test_deterministic(self, sentiment):
+        assert AnswerChoices.daily(1, DAY, sentiment) == AnswerChoices.daily(1, DAY, sentiment)
+
+    @pytest.mark.parametrize('sentiment', list(Sentiment))
+    def test_sentiment(self, sentiment):
+        assert all(AnswerChoices.daily(team_id, DAY, sentiment).sentiment == sentiment for team_id in range(50))
+
+    def test_varies_by_team_and_day(self):
+        answers = {AnswerChoices.daily(team_id, DAY).text for team_id in range(100)}
+        assert len(answers) > 5
+        answers = {AnswerChoices.daily(1, date(2026, 10, day)).text for day in range(1, 31)}
+        assert len(answers) > 5
+
+
+class TestDailyPredictions:
+
+    def test_put_get(self):
+        predictions = DailyPredictions()
+        assert predictions.get(DAY, 1, None) is None
+
+        predictions.put(DAY, 1, None, b'body')
+        assert predictions.get(DAY, 1, None) == b'body'
+        assert predictions.get(DAY, 1, Sentiment.POSITIVE) is None
+        assert predictions.get(date(2026, 10, 20), 1, None) is None
+
+        # The next day starts over
+        predictions.put(date(2026, 10, 20), 2, None, b'next')
+        assert len(predictions) == 1
+
+    def test_precompute(self):
+        predictions = DailyPredictions()
+        predictions.precompute(DAY, [TEAM, {**TEAM, 'id': 2}])
+
+        assert len(predictions) == 2 * len(SENTIMENTS)
+        assert predictions.get(DAY, 1, Sentiment.NEGATIVE) == render_prediction(TEAM, DAY, Sentiment.NEGATIVE)
+
+        predictions.discard(1)
+        assert predictions.get(DAY, 1, Sentiment.NEGATIVE) is None
+        assert predictions.get(DAY, 2, Sentiment.NEGATIVE) is not None
+
+    @pytest.mark.asyncio
+    async def test_precompute_from_db(self, team):
+        predictions = DailyPredictions()
+        await predictions.precompute_from_db(engine, DAY)
+
+        assert len(predictions) == len(SENTIMENTS)
+        assert json.loads(predictions.get(DAY, team.id, None)) == json.loads(render_prediction(team.dict(), DAY, None))
+
+    @pytest.mark.asyncio
+    async def test_invalidate_on_changes(self):
+        broker = ChangeBroker()
+        predictions = DailyPredictions()
+        predictions.precompute(DAY, [TEAM])
+        task = asyncio.create_task(predictions.invalidate_on_changes(broker))
+        await asyncio.sleep(0)
+
+        broker.publish(ChangeEvent(1, SPORT_ENTITY, 1, UPDATED))
+        await asyncio.sleep(0)
+        assert predictions.get(DAY, 1, None) is not None
+
+        broker.publish(ChangeEvent(2, TEAM_ENTITY, 1, UPDATED))
+        await asyncio.sleep(0)
+        assert predictions.get(DAY, 1, None) is None
+
+        task.cancel()
+        await asyncio.sleep(0)
+        assert not broker.subscriptions
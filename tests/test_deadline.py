@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, Request
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from src import deadline
+from src.db.db import create_async_db_engine, get_session_with_engine
+from src.db.interrupt import track_session
+from src.deadline import CLIENT_CLOSED_REQUEST, DeadlineRoute, parse_deadlines, run_with_deadline
+
+# Takes well over the deadlines used here
+SLOW_QUERY = text(
+    'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) SELECT count(*) FROM c'
+)
+
+
+@pytest.fixture
+async def slow_engine(tmp_path):
+    engine = create_async_db_engine(f'sqlite+aiosqlite:///{tmp_path.joinpath("slow.db")}', pool_size=1)
+    yield engine
+    await engine.dispose()
+
+
+def slow_app(engine):
+    async def tracked_session():
+        session = get_session_with_engine(engine)
+        track_session(session)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    router = APIRouter(route_class=DeadlineRoute)
+
+    @router.get('/slow')
+    async def slow(session=Depends(tracked_session)):
+        return {'count': (await session.execute(SLOW_QUERY)).scalar()}
+
+    @router.get('/fast')
+    async def fast(session=Depends(tracked_session)):
+        return {'one': (await session.execute(text('SELECT 1'))).scalar()}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def test_parse_deadlines():
+    assert parse_deadlines('') == {}
+    assert parse_deadlines('/teams=2, /teams/{team_id}=0.5') == {'/teams': 2.0, '/teams/{team_id}': 0.5}
+
+
+@pytest.mark.asyncio
+class TestDeadlineRoute:
+
+    async def test_within_deadline(self, slow_engine, monkeypatch):
+        monkeypatch.setitem(deadline.ROUTE_DEADLINES, '/fast', 1)
+
+        async with AsyncClient(app=slow_app(slow_engine), base_url='http://') as client:
+            response = await client.get('/fast')
+
+        assert response.status_code == 200
+        assert response.json() == {'one': 1}
+
+    async def test_deadline_interrupts_query(self, slow_engine, monkeypatch):
+        monkeypatch.setitem(deadline.ROUTE_DEADLINES, '/slow', 0.2)
+
+        async with AsyncClient(app=slow_app(slow_engine), base_url='http://') as client:
+            start = time.perf_counter()
+            response = await client.get('/slow')
+            elapsed = time.perf_counter() - start
+
+            assert response.status_code == 504
+            assert elapsed < 2
+            # The pool's only connection is back and usable.
+            assert slow_engine.pool.checkedout() == 0
+            assert (await client.get('/fast')).json() == {'one': 1}
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_handler(slow_engine):
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.1)
+        return {'type': 'http.disconnect'}
+
+    session = get_session_with_engine(slow_engine)
+
+    async def handler(request):
+        track_session(session)
+        await session.execute(SLOW_QUERY)
+
+    request = Request({'type': 'http', 'method': 'GET', 'path': '/slow', 'headers': [], 'query_string': b''}, receive)
+    start = time.perf_counter()
+    response = await run_with_deadline(request, handler, None)
+
+    assert response.status_code == CLIENT_CLOSED_REQUEST
+    assert time.perf_counter() - start < 2
+    await session.close()
+    assert slow_engine.pool.checkedout() == 0
@@ -0,0 +1,176 @@
+import asyncio
+import sqlite3
+
+import pytest
+from httpx import AsyncClient
+from starlette.responses import PlainTextResponse
+
+from conftest import engine, override_get_session
+from src.db.db import get_session, get_session_with_engine
+from src.main import create_app
+from src.ratelimit import RateLimitMiddleware, SqliteTokenBuckets, TokenBuckets, client_key
+from src.warmup import request_catalog_routes
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def buckets_and_clock(request, tmp_path):
+    clock = Clock()
+    if request.param == 'memory':
+        return TokenBuckets(rate=2, burst=3, clock=clock), clock
+    return SqliteTokenBuckets(str(tmp_path.joinpath('buckets.db')), rate=2, burst=3, clock=clock), clock
+
+
+class TestTokenBuckets:
+
+    def test_burst_then_limited(self, buckets_and_clock):
+        buckets, clock = buckets_and_clock
+
+        assert [buckets.take('a') for _ in range(3)] == [0, 0, 0]
+        assert buckets.take('a') == pytest.approx(0.5)
+        # other clients have their own bucket
+        assert buckets.take('b') == 0
+
+    def test_refills(self, buckets_and_clock):
+        buckets, clock = buckets_and_clock
+        for _ in range(3):
+            buckets.take('a')
+
+        clock.now += 0.5
+        assert buckets.take('a') == 0
+        assert buckets.take('a') > 0
+
+        clock.now += 10
+        assert [buckets.take('a') for _ in range(3)] == [0, 0, 0]
+
+    def test_rejected_takes_no_token(self, buckets_and_clock):
+        buckets, clock = buckets_and_clock
+        for _ in range(5):
+            buckets.take('a')
+
+        clock.now += 0.5
+        assert buckets.take('a') == 0
+
+    def test_idle_buckets_swept(self):
+        clock = Clock()
+        buckets = TokenBuckets(rate=2, burst=3, clock=clock)
+        buckets.take('a')
+        buckets.take('b')
+        assert len(buckets) == 2
+
+        clock.now += 2
+        buckets.take('c')
+        assert len(buckets) == 1
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        path = str(tmp_path.joinpath('buckets.db'))
+        clock = Clock()
+        worker_1 = SqliteTokenBuckets(path, rate=2, burst=3, clock=clock)
+        worker_2 = SqliteTokenBuckets(path, rate=2, burst=3, clock=clock)
+
+        assert [worker_1.take('a'), worker_2.take('a'), worker_1.take('a')] == [0, 0, 0]
+        assert worker_2.take('a') > 0
+
+
+@pytest.fixture
+async def locked_buckets(tmp_path):
+    """Shared buckets whose db another worker holds the write lock on."""
+    path = str(tmp_path.joinpath('buckets.db'))
+    buckets = SqliteTokenBuckets(path, rate=2, burst=3, timeout=0.2)
+    await buckets.take_async('a')
+
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute('BEGIN IMMEDIATE')
+    yield buckets
+    other_worker.execute('ROLLBACK')
+    other_worker.close()
+
+
+@pytest.mark.asyncio
+class TestSqliteTokenBucketsLocked:
+
+    async def test_lets_request_through_off_the_loop(self, locked_buckets):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        try:
+            assert await locked_buckets.take_async('a') == 0
+        finally:
+            ticker.cancel()
+
+        assert locked_buckets.errors == 1
+        # The loop kept running while the take waited out the lock
+        assert ticks >= 5
+
+    async def test_middleware_admits(self, locked_buckets):
+        app = RateLimitMiddleware(PlainTextResponse('ok'), locked_buckets)
+
+        async with AsyncClient(app=app, base_url='http://') as client:
+            response = await client.get('/teams')
+
+        assert response.status_code == 200
+        assert locked_buckets.errors == 1
+
+
+@pytest.mark.parametrize('headers,key', [
+    ([], '127.0.0.1'),
+    ([(b'x-forwarded-for', b'10.0.0.1')], '10.0.0.1'),
+    # Only the entry nginx appended counts, the client can send anything before it.
+    ([(b'x-forwarded-for', b'1.2.3.4, 10.0.0.1')], '10.0.0.1'),
+])
+def test_client_key(headers, key):
+    assert client_key({'headers': headers, 'client': ('127.0.0.1', 5000)}) == key
+
+
+@pytest.mark.asyncio
+class TestRateLimitMiddleware:
+
+    async def test_limited_before_session(self, team):
+        sessions = 0
+
+        async def counting_get_session():
+            nonlocal sessions
+            sessions += 1
+            async with get_session_with_engine(engine) as session:
+                yield session
+
+        app = create_app(rate_limit=0.01)
+        app.dependency_overrides[get_session] = counting_get_session
+        headers = {'X-Forwarded-For': '10.0.0.1'}
+
+        async with AsyncClient(app=app, base_url='http://') as client:
+            statuses = [(await client.get(f'/teams/{team.id}/ask', headers=headers)).status_code for _ in range(25)]
+            response = await client.get(f'/teams/{team.id}/ask', headers=headers)
+            limited_sessions = sessions
+            other_client = await client.get(f'/teams/{team.id}/ask', headers={'X-Forwarded-For': '10.0.0.2'})
+            ping = await client.get('/ping', headers=headers)
+
+        assert statuses.count(200) == 20
+        assert statuses[20:] == [429] * 5
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
+        assert limited_sessions == 20
+        assert other_client.status_code == 200
+        assert ping.status_code == 200
+
+    async def test_warmup_not_limited(self, sports_with_teams):
+        app = create_app(rate_limit=0.01)
+        app.dependency_overrides[get_session] = override_get_session
+
+        # More requests than the burst, a limited one would fail the warmup
+        for _ in range(4):
+            await request_catalog_routes(app)
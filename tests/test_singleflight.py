@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from src.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+
+    async def test_concurrent_calls_share_one(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def fn(value):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(*(flights.do('key', fn, 'result') for _ in range(10)))
+
+        assert results == ['result'] * 10
+        assert calls == 1
+        assert flights.shared == 9
+        assert not flights.in_flight('key')
+
+    async def test_different_keys_not_shared(self):
+        flights = SingleFlight()
+
+        async def fn(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        assert await asyncio.gather(flights.do(1, fn, 1), flights.do(2, fn, 2)) == [1, 2]
+        assert flights.calls == 2
+        assert flights.shared == 0
+
+    async def test_not_cached_after_call(self):
+        flights = SingleFlight()
+
+        async def fn():
+            return object()
+
+        assert await flights.do('key', fn) is not await flights.do('key', fn)
+        assert flights.calls == 2
+
+    async def test_exception_shared(self):
+        flights = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError('nope')
+
+        results = await asyncio.gather(*(flights.do('key', fn) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flights.calls == 1
+
+    async def test_waiters_run_it_when_caller_cancelled(self):
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def fn(value):
+            started.set()
+            await asyncio.sleep(0.01)
+            return value
+
+        leader = asyncio.create_task(flights.do('key', fn, 'leader'))
+        await started.wait()
+        waiter = asyncio.create_task(flights.do('key', fn, 'waiter'))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await waiter == 'waiter'
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert flights.calls == 2
+
+    async def test_waiter_cancelled_leaves_call_running(self):
+        flights = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        leader = asyncio.create_task(flights.do('key', fn))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.do('key', fn))
+        await asyncio.sleep(0)
+        waiter.cancel()
+
+        assert await leader == 'result'